@@ -0,0 +1,138 @@
+"""
+MessagePackレスポンス
+
+マッチ系エンドポイントで `Accept: application/msgpack` が指定された場合に使う
+コンパクトなバイナリ表現。JSONが既定で、こちらはオプトイン。
+
+JSONとの違い:
+- イベント種別・陣営・勝者は整数（EventType / SIDE_CODES）
+- ユニットのinstance_idはマッチ内の整数ref（差分応答のrefと同じ）
+- unit_spec_id・match_id・deck_idはUUIDの16バイト
+- ユニットとイベントはキーを持たない配列（UNIT_FIELDS / events.PAYLOAD_FIELDSの順）
+- 位置は丸めない
+"""
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import msgpack
+from fastapi import Request, Response
+
+from app.engine.delta import UnitRefs
+from app.engine.events import PAYLOAD_FIELDS, EngineEvent
+from app.schemas.game import GameState
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# 陣営・勝者の整数コード（勝者なしはnil）
+SIDE_CODES = {"player": 0, "ai": 1}
+
+# ユニット配列の要素順
+UNIT_FIELDS = (
+    "ref", "unit_spec_id", "side", "pos", "hp", "cooldown", "name",
+    "max_hp", "atk", "speed", "range", "atk_interval", "battle_sprite_url"
+)
+
+_REF_FIELDS = frozenset({"instance_id", "attacker_id", "target_id"})
+_SIDE_FIELDS = frozenset({"side", "attacker_side", "target_side"})
+
+
+def wants_msgpack(request: Request) -> bool:
+    """AcceptヘッダーでMessagePackが要求されているか"""
+    accept = request.headers.get("accept", "")
+    return MSGPACK_MEDIA_TYPE in accept or "application/x-msgpack" in accept
+
+
+def msgpack_response(content: Dict[str, Any]) -> Response:
+    """MessagePackでエンコードしたレスポンスを作成"""
+    return Response(
+        content=msgpack.packb(content, use_bin_type=True),
+        media_type=MSGPACK_MEDIA_TYPE
+    )
+
+
+def _uuid_bytes(value: Optional[UUID]) -> Optional[bytes]:
+    return None if value is None else value.bytes
+
+
+def encode_unit(unit, refs: UnitRefs) -> List[Any]:
+    """ユニットをUNIT_FIELDS順の配列にする"""
+    stats = unit.stats
+    return [
+        refs.get(unit.instance_id),
+        stats.unit_spec_id.bytes,
+        SIDE_CODES[unit.side],
+        unit.pos,
+        unit.hp,
+        unit.cooldown,
+        stats.name,
+        stats.max_hp,
+        stats.atk,
+        stats.speed,
+        stats.range,
+        stats.atk_interval,
+        stats.battle_sprite_url,
+    ]
+
+
+def encode_event(event: EngineEvent, refs: UnitRefs) -> List[Any]:
+    """
+    イベントを [種別コード, timestamp_ms, payload...] の配列にする
+
+    payloadはPAYLOAD_FIELDSの順。ユニットIDはref、陣営は整数、unit_spec_idは16バイト。
+    """
+    encoded: List[Any] = [int(event.code), event.timestamp_ms]
+    for name, value in zip(PAYLOAD_FIELDS[event.code], event.payload):
+        if value is None:
+            pass
+        elif name in _REF_FIELDS:
+            value = refs.get(value)
+        elif name in _SIDE_FIELDS:
+            value = SIDE_CODES[value]
+        elif name == "unit_spec_id":
+            value = value.bytes
+        encoded.append(value)
+    return encoded
+
+
+def encode_game_state(game_state: GameState, refs: UnitRefs) -> Dict[str, Any]:
+    """GameStateをMessagePack用の辞書にする（キー名はJSONと同じ）"""
+    return {
+        "match_id": game_state.match_id.bytes,
+        "engine_backend": game_state.engine_backend,
+        "tick_ms": game_state.tick_ms,
+        "time_ms": game_state.time_ms,
+        "player_base_hp": game_state.player_base_hp,
+        "ai_base_hp": game_state.ai_base_hp,
+        "player_cost": game_state.player_cost,
+        "ai_cost": game_state.ai_cost,
+        "max_cost": game_state.max_cost,
+        "cost_recovery_per_tick": game_state.cost_recovery_per_tick,
+        "units": [encode_unit(unit, refs) for unit in game_state.units],
+        "winner": SIDE_CODES.get(game_state.winner),
+        "player_deck_id": _uuid_bytes(game_state.player_deck_id),
+        "ai_deck_id": _uuid_bytes(game_state.ai_deck_id),
+        "created_at": game_state.created_at.isoformat(),
+    }
+
+
+def encode_delta(delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    差分（engine.delta.diff）をMessagePack用にする
+
+    追加ユニットをUNIT_FIELDS順の配列に、勝者を整数にする。
+    """
+    encoded = dict(delta)
+    if "winner" in encoded:
+        encoded["winner"] = SIDE_CODES.get(encoded["winner"])
+    units = dict(delta["units"])
+    units["added"] = [
+        [
+            unit["ref"],
+            UUID(unit["unit_spec_id"]).bytes,
+            SIDE_CODES[unit["side"]],
+            *(unit[name] for name in UNIT_FIELDS[3:]),
+        ]
+        for unit in units["added"]
+    ]
+    encoded["units"] = units
+    return encoded
@@ -51,6 +51,25 @@ class MatchAlreadyFinishedException(HTTPException):
         )
 
 
+class MatchConflictException(HTTPException):
+    """他のワーカーがマッチを同時に更新していて、やり直しても書き込めなかった"""
+    def __init__(self, match_id: str):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Match was modified concurrently, retry the request: {match_id}"
+        )
+
+
+class ServerAtCapacityException(HTTPException):
+    """同時マッチ数・メモリの上限に達している"""
+    def __init__(self, reason: str):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Cannot start match: {reason}",
+            headers={"Retry-After": "5"}
+        )
+
+
 class InvalidDeckException(HTTPException):
     """無効なデッキ"""
     def __init__(self, reason: str):
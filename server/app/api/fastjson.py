@@ -0,0 +1,177 @@
+"""
+JSONレスポンスの高速パス
+
+/match/start・/match/tick・/match/spawn のJSONをorjsonで直接バイト列に組み立てる。
+response_modelによる再検証とUnitInstanceへの変換を省くので、盤面のユニットが多いほど速い。
+
+出力はresponse_modelのmodel_dump_json()とバイト単位で一致する（tests/test_fastjson.py）。
+ユニットのJSONのうちtickで変化しない部分（ID・陣営・名前・ステータス・スプライトURL）は
+ユニットごとに1回だけ作ってRuntimeUnit.json_partsに保持し、tickごとに
+位置・HP・クールダウンだけを埋め込む。
+
+注意: orjsonとpydanticは1e16以上の浮動小数の指数表記だけが異なる（"1e16" / "1e+16"）。
+ゲーム内の値（位置・コスト・ステータス）はすべてこれより十分小さい。
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+import orjson
+from fastapi import Response
+
+from app.engine.events import PAYLOAD_FIELDS, EngineEvent
+from app.schemas.game import GameState
+from app.schemas.unit import RuntimeUnit
+
+# pydanticと同じくUTCは"Z"で表す
+_OPTIONS = orjson.OPT_UTC_Z
+
+# GameStateのフィールドのうちunitsの前後（モデルの定義順）
+_STATE_HEAD_FIELDS = (
+    "match_id", "engine_backend", "tick_ms", "time_ms", "player_base_hp", "ai_base_hp",
+    "player_cost", "ai_cost", "max_cost", "cost_recovery_per_tick"
+)
+_STATE_TAIL_FIELDS = ("winner", "player_deck_id", "ai_deck_id", "created_at")
+
+# Event.dataで小数第2位に丸めるフィールド（EngineEvent.dataと同じ）
+_POS_FIELDS = frozenset({"pos", "from_pos", "to_pos"})
+
+
+def _dumps(value: Any) -> bytes:
+    return orjson.dumps(value, option=_OPTIONS)
+
+
+def json_response(content: bytes) -> Response:
+    """組み立て済みのJSONをそのまま返すレスポンスを作成（response_modelの検証を通らない）"""
+    return Response(content=content, media_type="application/json")
+
+
+def unit_json_parts(unit: RuntimeUnit) -> Tuple[bytes, bytes]:
+    """
+    ユニットのJSONのうち変化しない前半と後半
+
+    前半は `{"instance_id":...,"unit_spec_id":...,"side":...,"pos":`、
+    後半は `,"name":...,"battle_sprite_url":...}`。初回だけ作ってユニットに保持する。
+
+    Args:
+        unit: ユニット
+
+    Returns:
+        (前半, 後半)
+    """
+    parts = unit.json_parts
+    if parts is None:
+        stats = unit.stats
+        head = _dumps({
+            "instance_id": unit.instance_id,
+            "unit_spec_id": stats.unit_spec_id,
+            "side": unit.side,
+        })[:-1] + b',"pos":'
+        tail = b"," + _dumps({
+            "name": stats.name,
+            "max_hp": stats.max_hp,
+            "atk": stats.atk,
+            "speed": stats.speed,
+            "range": stats.range,
+            "atk_interval": stats.atk_interval,
+            "battle_sprite_url": stats.battle_sprite_url,
+        })[1:]
+        parts = unit.json_parts = (head, tail)
+    return parts
+
+
+def encode_unit(unit: Any) -> bytes:
+    """ユニットをUnitInstanceのJSONにする"""
+    if not isinstance(unit, RuntimeUnit):
+        return unit.model_dump_json().encode()
+    head, tail = unit_json_parts(unit)
+    return b"".join((
+        head,
+        _dumps(float(unit.pos)),
+        b',"hp":',
+        b"%d" % unit.hp,
+        b',"cooldown":',
+        _dumps(float(unit.cooldown)),
+        tail,
+    ))
+
+
+def encode_game_state(game_state: GameState) -> bytes:
+    """GameStateをmodel_dump_json()と同じJSONにする"""
+    head = _dumps({field: getattr(game_state, field) for field in _STATE_HEAD_FIELDS})
+    tail = _dumps({field: getattr(game_state, field) for field in _STATE_TAIL_FIELDS})
+    return b"".join((
+        head[:-1],
+        b',"units":[',
+        b",".join([encode_unit(unit) for unit in game_state.units]),
+        b"],",
+        tail[1:],
+    ))
+
+
+def _event_data(event: EngineEvent) -> Dict[str, Any]:
+    # EngineEvent.dataと同じ内容。UUIDはorjsonが文字列化するのでそのまま渡す
+    data: Dict[str, Any] = {}
+    for name, value in zip(PAYLOAD_FIELDS[event.code], event.payload):
+        if value is None:
+            continue
+        if name in _POS_FIELDS:
+            value = round(value, 2)
+        data[name] = value
+    return data
+
+
+def encode_events(events: List[EngineEvent]) -> bytes:
+    """エンジンイベントをEventのリストのJSONにする"""
+    return _dumps([
+        {"type": event.code.name, "timestamp_ms": event.timestamp_ms, "data": _event_data(event)}
+        for event in events
+    ])
+
+
+def _join_fields(fields: List[Tuple[bytes, bytes]]) -> bytes:
+    return b"{" + b",".join(b'"%s":%s' % field for field in fields) + b"}"
+
+
+def encode_start_response(match_id: UUID, game_state: GameState) -> bytes:
+    """MatchStartResponseのJSON"""
+    return _join_fields([
+        (b"match_id", _dumps(match_id)),
+        (b"game_state", encode_game_state(game_state)),
+    ])
+
+
+def encode_spawn_response(game_state: GameState, events: List[EngineEvent]) -> bytes:
+    """MatchSpawnResponseのJSON"""
+    return _join_fields([
+        (b"game_state", encode_game_state(game_state)),
+        (b"events", encode_events(events)),
+    ])
+
+
+def encode_tick_response(
+    game_state: Optional[GameState],
+    events: List[EngineEvent],
+    seq: int,
+    delta: Optional[Dict[str, Any]] = None,
+    unit_refs: Optional[Dict[str, int]] = None
+) -> bytes:
+    """
+    MatchTickResponseのJSON
+
+    Args:
+        game_state: 全状態（差分応答ではNone）
+        events: 発生したイベント
+        seq: シーケンス番号
+        delta: 差分（engine.delta.diffの戻り値）
+        unit_refs: instance_id -> ref
+
+    Returns:
+        MatchTickResponse.model_dump_json()と同じバイト列
+    """
+    return _join_fields([
+        (b"game_state", b"null" if game_state is None else encode_game_state(game_state)),
+        (b"events", encode_events(events)),
+        (b"seq", b"%d" % seq),
+        (b"delta", _dumps(delta)),
+        (b"unit_refs", _dumps(unit_refs)),
+    ])
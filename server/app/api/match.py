@@ -3,24 +3,49 @@ Match API エンドポイント
 
 対戦の開始、tick処理、ユニット召喚、AI決定を提供する。
 """
-from typing import List
+import asyncio
+from functools import partial
+from typing import Awaitable, Callable, List, Literal, Optional, TypeVar
 from uuid import UUID, uuid4
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
 
 from app.api.exceptions import (
     DeckNotFoundException,
     InsufficientCostException,
     MatchAlreadyFinishedException,
+    MatchConflictException,
     MatchNotFoundException,
+    ServerAtCapacityException,
     UnitNotFoundException
 )
 
+from app.api.binary import (
+    encode_delta,
+    encode_event,
+    encode_game_state,
+    msgpack_response,
+    wants_msgpack
+)
+from app.api import fastjson
 from app.config import get_settings
-from app.engine.tick import process_tick, spawn_unit_in_game
+from app.engine.commands import get_match_queues
+from app.engine.delta import StateTracker, get_delta_history
+from app.engine.events import EngineEvent, to_api_events
+from app.engine.lockstep import LockstepSession, spawn_input
+from app.engine.simulate import (
+    EVENT_LOG_ENCODING,
+    ScheduledSpawn,
+    adopt_state,
+    encode_event_log,
+    simulate
+)
+from app.engine.tick import get_side_cost, process_tick, spawn_unit_from_spec
 from app.schemas.api import (
     AIDecideRequest,
     AIDecideResponse,
+    MatchSimulateRequest,
+    MatchSimulateResponse,
     MatchSpawnRequest,
     MatchSpawnResponse,
     MatchStartRequest,
@@ -29,23 +54,53 @@ from app.schemas.api import (
     MatchTickResponse
 )
 from app.schemas.game import Event, GameState
-from app.schemas.unit import UnitInstance
-from app.storage.db import get_deck, get_unit_spec, save_match, update_match_result
-from app.storage.session import get_session_manager
+from app.schemas.unit import UnitSpec
+from app.storage.db import (
+    get_deck,
+    get_unit_spec,
+    get_units_by_ids,
+    save_match,
+    update_match_result
+)
+from app.storage.codec import pack_state, unpack_state
+from app.storage.roster import attach_roster, ensure_roster, get_roster, load_roster
+from app.storage.session import (
+    SessionCapacityError,
+    SessionConflictError,
+    get_session_manager
+)
 
 router = APIRouter()
 settings = get_settings()
 
+T = TypeVar("T")
+
+
+async def run_in_match(match_id: UUID, command: Callable[[], Awaitable[T]]) -> T:
+    """
+    マッチのコマンドキュー（engine.commands）でコマンドを実行
+
+    Raises:
+        MatchConflictException: 他のワーカーとの書き込みの衝突がやり直しても解消しない（409）
+    """
+    try:
+        return await get_match_queues().run(match_id, command)
+    except SessionConflictError:
+        raise MatchConflictException(str(match_id))
+
 
 @router.post("/start", response_model=MatchStartResponse)
-async def start_match(request: MatchStartRequest):
+async def start_match(request: MatchStartRequest, http_request: Request):
     """
     対戦を開始する
 
-    1. デッキをDBから読み込み
-    2. 初期GameStateを作成
-    3. セッションマネージャーに保存
+    1. デッキと両デッキのユニットスペックをDBから読み込み
+    2. 初期GameStateを作成（ユニットスペックはロスターとして持たせ、召喚とAI決定で使う）
+    3. セッションマネージャーに保存（同時マッチ数・メモリの上限を超える場合は503）
     4. matchesテーブルに記録
+
+    `Accept: application/msgpack` の場合はMessagePackで返す（api.binary参照）。
+    JSONは既定でapi.fastjsonが組み立てる（fast_json_responses）。
     """
     # デッキ取得
     player_deck = await get_deck(request.player_deck_id)
@@ -63,10 +118,13 @@ async def start_match(request: MatchStartRequest):
         ai_deck = player_deck
         ai_deck_id = player_deck.id
 
+    roster = await load_roster(player_deck, ai_deck)
+
     # 初期GameState作成
     match_id = uuid4()
     game_state = GameState(
         match_id=match_id,
+        engine_backend=request.engine_backend,
         tick_ms=settings.tick_ms,
         time_ms=0,
         player_base_hp=settings.initial_base_hp,
@@ -80,14 +138,28 @@ async def start_match(request: MatchStartRequest):
         player_deck_id=request.player_deck_id,
         ai_deck_id=ai_deck_id
     )
+    attach_roster(game_state, roster)
 
-    # セッションに保存
+    # セッションに保存（上限に達している場合は503）
     session_manager = get_session_manager()
-    session_manager.create_match(match_id, game_state)
+    try:
+        session_manager.create_match(match_id, game_state)
+    except SessionCapacityError as e:
+        raise ServerAtCapacityException(e.reason)
 
     # DB記録
     await save_match(match_id, request.player_deck_id, ai_deck_id)
 
+    if wants_msgpack(http_request):
+        refs = get_delta_history(game_state).refs
+        return msgpack_response({
+            "match_id": match_id.bytes,
+            "game_state": encode_game_state(game_state, refs)
+        })
+
+    if settings.fast_json_responses:
+        return fastjson.json_response(fastjson.encode_start_response(match_id, game_state))
+
     return MatchStartResponse(
         match_id=match_id,
         game_state=game_state
@@ -95,7 +167,7 @@ async def start_match(request: MatchStartRequest):
 
 
 @router.post("/tick", response_model=MatchTickResponse)
-async def tick_match(request: MatchTickRequest):
+async def tick_match(request: MatchTickRequest, http_request: Request):
     """
     tick処理を実行
 
@@ -103,102 +175,351 @@ async def tick_match(request: MatchTickRequest):
     2. process_tick()実行
     3. セッションに保存
     4. 勝敗が決まった場合はDB更新とセッション削除
-    5. 古い試合を定期的にクリーンアップ
+
+    ack_seqを指定すると、その時点からの差分（delta）だけを返す（build_tick_response）。
+    `Accept: application/msgpack` の場合はMessagePackで返す（api.binary参照）。
+    JSONは既定でapi.fastjsonが組み立てる（fast_json_responses）。
+
+    tick_mode="server" の場合はサーバーのスケジューラがtickを進めるので、
+    ここでは進めずに前回の呼び出し以降にバッファされたイベントと最新の状態を返す。
+
+    処理はマッチのコマンドキュー（engine.commands）で実行する。
     """
     session_manager = get_session_manager()
+    binary = wants_msgpack(http_request)
 
-    # 定期的に古い試合をクリーンアップ（30秒以上更新がない試合を削除）
-    # tickは頻繁に呼ばれるので、ここでクリーンアップを実行
-    import random
-    if random.random() < 0.01:  # 1%の確率で実行（約100tickに1回）
-        cleaned = session_manager.cleanup_inactive_matches(timeout_seconds=30)
-        if cleaned > 0:
-            print(f"[Cleanup] Removed {cleaned} inactive matches")
+    async def tick():
+        game_state = session_manager.get_match(request.match_id)
 
-    game_state = session_manager.get_match(request.match_id)
+        if not game_state:
+            # マッチが見つからない場合（削除済みまたは存在しない）
+            raise MatchNotFoundException(str(request.match_id))
+
+        if settings.tick_mode == "server":
+            return collect_scheduled_tick(request, game_state, binary)
+
+        # tick処理
+        events = process_tick(game_state)
+
+        # 勝敗が決まった場合はDB更新してセッションから削除
+        if game_state.winner:
+            await update_match_result(request.match_id, game_state.winner)
+            # セッションから削除してリソースを解放
+            session_manager.delete_match(request.match_id)
+            print(
+                f"[Match] Match {request.match_id} finished with winner: {game_state.winner}. "
+                "Session deleted."
+            )
+        else:
+            # セッションに保存（継続中の場合のみ）
+            session_manager.update_match(request.match_id, game_state)
 
+        return build_tick_response(request, game_state, events, binary)
+
+    return await run_in_match(request.match_id, tick)
+
+
+def build_tick_response(
+    request: MatchTickRequest,
+    game_state: GameState,
+    events: List[EngineEvent],
+    binary: bool = False
+):
+    """
+    tickレスポンスを作成
+
+    状態にシーケンス番号を振って履歴に記録する。request.ack_seqの状態が履歴に
+    残っていればそこからの差分だけを返し、なければ（またはresync指定時は）全状態を返す。
+
+    Args:
+        request: tickリクエスト
+        game_state: 現在のゲーム状態
+        events: クライアントに返すイベント
+        binary: MessagePackで返すか
+
+    Returns:
+        tickレスポンス（binaryまたはfast_json_responsesの場合は組み立て済みのResponse）
+    """
+    history = get_delta_history(game_state)
+    delta = None
+    unit_refs = None
+    if request.ack_seq is not None and not request.resync:
+        delta = history.delta_since(request.ack_seq, game_state)
+
+    if binary:
+        # ユニットはrefで表すので対応表は不要
+        content = {
+            "game_state": encode_game_state(game_state, history.refs) if delta is None else None,
+            "events": [encode_event(event, history.refs) for event in events],
+            "seq": history.record(game_state),
+            "delta": encode_delta(delta) if delta is not None else None
+        }
+        return msgpack_response(content)
+
+    if delta is None and (request.ack_seq is not None or request.resync):
+        # 差分を使うクライアントにはスナップショットと一緒にrefの対応表を送る
+        unit_refs = history.refs.table(game_state)
+    seq = history.record(game_state)
+
+    if settings.fast_json_responses:
+        return fastjson.json_response(fastjson.encode_tick_response(
+            game_state if delta is None else None, events, seq, delta, unit_refs
+        ))
+
+    return MatchTickResponse(
+        game_state=game_state if delta is None else None,
+        events=to_api_events(events),
+        seq=seq,
+        delta=delta,
+        unit_refs=unit_refs
+    )
+
+
+def collect_scheduled_tick(request: MatchTickRequest, game_state: GameState, binary: bool = False):
+    """
+    サーバー側スケジューラが進めたtickの結果を取得
+
+    勝敗が決まっている場合（DB更新はスケジューラが済ませている）は、
+    最後のイベントを返してからセッションを削除する。
+
+    Args:
+        request: tickリクエスト
+        game_state: セッション上のゲーム状態
+        binary: MessagePackで返すか
+
+    Returns:
+        最新の状態とバッファ済みイベント
+    """
+    from app.engine.scheduler import get_tick_scheduler
+
+    match_id = request.match_id
+    scheduler = get_tick_scheduler()
+    events = scheduler.drain(match_id)
+
+    if game_state.winner:
+        get_session_manager().delete_match(match_id)
+        scheduler.forget(match_id)
+        print(
+            f"[Match] Match {match_id} finished with winner: {game_state.winner}. Session deleted."
+        )
+
+    return build_tick_response(request, game_state, events, binary)
+
+
+@router.post("/simulate", response_model=MatchSimulateResponse)
+async def simulate_match(request: MatchSimulateRequest, http_request: Request):
+    """
+    複数tickをまとめて実行（ヘッドレス早送り）
+
+    1. セッションからGameState取得（commit=Falseならコピー）
+    2. 召喚予約のユニットをマッチのロスターから取得（デッキにないものはDBから一括取得）
+    3. simulate()でtickを連続実行
+    4. commit=Trueなら結果をセッションに反映（勝敗が決まった場合はDB更新とセッション削除）
+
+    `Accept: application/msgpack` の場合はMessagePackで返す（api.binary参照）。
+    2以降はマッチのコマンドキュー（engine.commands）で実行する。
+    """
+    session_manager = get_session_manager()
+    game_state = session_manager.get_match(request.match_id)
     if not game_state:
-        # マッチが見つからない場合（削除済みまたは存在しない）
         raise MatchNotFoundException(str(request.match_id))
 
-    # tick処理
-    events = process_tick(game_state)
+    # 召喚予約のユニットスペックをロスターから取得（デッキにないものだけDBから一括取得）
+    roster = await ensure_roster(game_state) if request.spawns else None
+    spec_ids = list({order.unit_spec_id for order in request.spawns})
+    specs = {spec_id: roster.get(spec_id) for spec_id in spec_ids} if roster else {}
+    missing = [spec_id for spec_id in spec_ids if specs.get(spec_id) is None]
+    if missing:
+        specs.update((spec.id, spec) for spec in await get_units_by_ids(missing))
+    for spec_id in spec_ids:
+        if specs.get(spec_id) is None:
+            raise UnitNotFoundException(str(spec_id))
+
+    schedule = [
+        ScheduledSpawn(time_ms=order.time_ms, side=order.side, unit_spec=specs[order.unit_spec_id])
+        for order in request.spawns
+    ]
+
+    async def run_simulation():
+        game_state = session_manager.get_match(request.match_id)
+        if not game_state:
+            raise MatchNotFoundException(str(request.match_id))
+        if not request.commit:
+            game_state = game_state.model_copy(deep=True)
+        return await simulate_in_match(request, game_state, schedule, wants_msgpack(http_request))
 
-    # 勝敗が決まった場合はDB更新してセッションから削除
-    if game_state.winner:
-        await update_match_result(request.match_id, game_state.winner)
-        # セッションから削除してリソースを解放
-        session_manager.delete_match(request.match_id)
-        print(f"[Match] Match {request.match_id} finished with winner: {game_state.winner}. Session deleted.")
-    else:
-        # セッションに保存（継続中の場合のみ）
-        session_manager.update_match(request.match_id, game_state)
+    return await run_in_match(request.match_id, run_simulation)
 
-    return MatchTickResponse(
+
+async def simulate_in_match(
+    request: MatchSimulateRequest,
+    game_state: GameState,
+    schedule: List[ScheduledSpawn],
+    binary: bool = False
+):
+    """
+    シミュレーションを実行してレスポンスを作成（マッチのコマンドキューで呼ぶ）
+
+    最大simulate_max_ticks tickかかるので、シミュレーションはスレッドで進め、その間も
+    イベントループ（他のマッチ・WebSocket）を止めない。コマンドキューの実行枠は
+    終わるまで保持する。commit=Trueの場合はスレッドで書き換えている途中の状態を
+    他の処理が読まないよう、コピーを進めてから元の状態に反映する。
+
+    Args:
+        request: シミュレーションリクエスト
+        game_state: 実行対象の状態（commit=Falseならコピー）
+        schedule: 召喚予約
+        binary: MessagePackで返すか
+
+    Returns:
+        シミュレーション結果のレスポンス
+    """
+    session_manager = get_session_manager()
+    simulated = game_state.model_copy(deep=True) if request.commit else game_state
+    result = await asyncio.to_thread(
+        simulate,
+        simulated,
+        ticks=request.ticks,
+        until_finished=request.until_finished,
+        spawn_schedule=schedule,
+        collect_events=request.include_events,
+        max_ticks=settings.simulate_max_ticks,
+        time_skip=request.time_skip
+    )
+
+    if request.commit:
+        adopt_state(game_state, simulated)
+        if game_state.winner:
+            await update_match_result(request.match_id, game_state.winner)
+            session_manager.delete_match(request.match_id)
+            print(
+                f"[Match] Match {request.match_id} finished by simulation with winner: "
+                f"{game_state.winner}. Session deleted."
+            )
+        else:
+            session_manager.update_match(request.match_id, game_state)
+
+    if binary:
+        return msgpack_response({
+            "game_state": encode_game_state(game_state, get_delta_history(game_state).refs),
+            "ticks_run": result.ticks_run,
+            "spawned": result.spawned,
+            "event_count": len(result.events),
+            "event_log": encode_event_log(result.events) if request.include_events else None,
+            "event_log_encoding": EVENT_LOG_ENCODING if request.include_events else None
+        })
+
+    return MatchSimulateResponse(
         game_state=game_state,
-        events=events
+        ticks_run=result.ticks_run,
+        spawned=result.spawned,
+        event_count=len(result.events),
+        event_log=encode_event_log(result.events) if request.include_events else None,
+        event_log_encoding=EVENT_LOG_ENCODING if request.include_events else None
     )
 
 
 @router.post("/spawn", response_model=MatchSpawnResponse)
-async def spawn_unit(request: MatchSpawnRequest):
+async def spawn_unit(request: MatchSpawnRequest, http_request: Request):
     """
     ユニットを召喚
 
     1. コスト検証
-    2. UnitInstance作成
+    2. ユニット作成（RuntimeUnit）
     3. ゲームに追加
     4. コスト消費
+
+    `Accept: application/msgpack` の場合はMessagePackで返す（api.binary参照）。
+    JSONは既定でapi.fastjsonが組み立てる（fast_json_responses）。
+
+    ユニットスペックを取得してから、召喚はマッチのコマンドキュー（engine.commands）で
+    実行する（tickの途中に割り込まず、処理中のtickが終わってから適用される）。
     """
     session_manager = get_session_manager()
     game_state = session_manager.get_match(request.match_id)
-
     if not game_state:
         raise MatchNotFoundException(str(request.match_id))
 
-    if game_state.is_finished():
-        raise MatchAlreadyFinishedException(str(request.match_id))
+    unit_spec = await load_unit_spec(game_state, request.unit_spec_id)
+    binary = wants_msgpack(http_request)
+
+    async def spawn():
+        game_state = session_manager.get_match(request.match_id)
+        if not game_state:
+            raise MatchNotFoundException(str(request.match_id))
+
+        spawn_event = spawn_in_match(game_state, request.side, unit_spec)
+
+        # セッションに保存
+        session_manager.update_match(request.match_id, game_state)
+
+        if binary:
+            refs = get_delta_history(game_state).refs
+            return msgpack_response({
+                "game_state": encode_game_state(game_state, refs),
+                "events": [encode_event(spawn_event, refs)]
+            })
+
+        if settings.fast_json_responses:
+            return fastjson.json_response(fastjson.encode_spawn_response(game_state, [spawn_event]))
 
-    # ユニットスペック取得
-    unit_spec = await get_unit_spec(request.unit_spec_id)
+        return MatchSpawnResponse(
+            game_state=game_state,
+            events=[spawn_event.to_event()]
+        )
+
+    return await run_in_match(request.match_id, spawn)
+
+
+async def load_unit_spec(game_state: GameState, unit_spec_id: UUID) -> UnitSpec:
+    """
+    召喚するユニットスペックを取得
+
+    マッチのロスター（storage.roster）から引き、デッキにないユニットだけDBに問い合わせる。
+
+    Raises:
+        UnitNotFoundException: ユニットが存在しない
+    """
+    roster = await ensure_roster(game_state)
+    unit_spec = roster.get(unit_spec_id) if roster else None
+    if unit_spec is None:
+        unit_spec = await get_unit_spec(unit_spec_id)
     if not unit_spec:
-        raise UnitNotFoundException(str(request.unit_spec_id))
+        raise UnitNotFoundException(str(unit_spec_id))
+    return unit_spec
 
-    # コスト確認
-    if request.side == "player":
-        current_cost = game_state.player_cost
-    elif request.side == "ai":
-        current_cost = game_state.ai_cost
-    else:
-        raise HTTPException(status_code=400, detail="Invalid side (must be 'player' or 'ai')")
 
-    if current_cost < unit_spec.cost:
-        raise InsufficientCostException(required=unit_spec.cost, available=current_cost)
+def spawn_in_match(game_state: GameState, side: str, unit_spec: UnitSpec) -> EngineEvent:
+    """
+    召喚リクエストを検証してユニットを召喚する（HTTPとWebSocketで共通）
 
-    # UnitInstance作成
-    initial_pos = 0.0 if request.side == "player" else 20.0
-    unit_instance = UnitInstance.from_spec(
-        spec=unit_spec,
-        side=request.side,  # type: ignore
-        initial_pos=initial_pos
-    )
+    マッチのコマンドキューから呼ぶ。
 
-    # ゲームに追加
-    spawn_event = spawn_unit_in_game(game_state, unit_instance, game_state.time_ms)
+    Args:
+        game_state: ゲーム状態（インプレースで更新される）
+        side: 召喚側
+        unit_spec: 召喚するユニットスペック
 
-    # コスト消費
-    if request.side == "player":
-        game_state.player_cost -= unit_spec.cost
-    else:
-        game_state.ai_cost -= unit_spec.cost
+    Returns:
+        SPAWNイベント
 
-    # セッションに保存
-    session_manager.update_match(request.match_id, game_state)
+    Raises:
+        MatchAlreadyFinishedException: 対戦が終了している
+        InsufficientCostException: コスト不足
+    """
+    if game_state.is_finished():
+        raise MatchAlreadyFinishedException(str(game_state.match_id))
 
-    return MatchSpawnResponse(
-        game_state=game_state,
-        events=[spawn_event]
-    )
+    # コスト確認
+    if side not in ("player", "ai"):
+        raise HTTPException(status_code=400, detail="Invalid side (must be 'player' or 'ai')")
+
+    current_cost = get_side_cost(game_state, side)  # type: ignore
+    if current_cost < unit_spec.cost:
+        raise InsufficientCostException(required=unit_spec.cost, available=current_cost)
+
+    # ゲームに追加してコスト消費
+    return spawn_unit_from_spec(game_state, unit_spec, side)  # type: ignore
 
 
 @router.post("/end")
@@ -227,20 +548,254 @@ async def end_match(request: MatchTickRequest):
         return {"message": "Match end processed", "match_id": str(request.match_id)}
 
 
+# WebSocketがtickを進めているマッチ（tick_mode="client" で二重に進めないため）
+_ws_driven_matches: set[UUID] = set()
+
+
+def _event_payload(events: List[EngineEvent]) -> List[dict]:
+    """エンジンイベントをWebSocket送信用のJSON表現に変換"""
+    return [event.model_dump(mode="json") for event in to_api_events(events)]
+
+
+@router.websocket("/{match_id}/ws")
+async def match_websocket(
+    websocket: WebSocket,
+    match_id: UUID,
+    mode: Literal["state", "lockstep"] = "state"
+):
+    """
+    マッチのWebSocketチャネル
+
+    接続直後に全体のスナップショットを送り、以降はtickごとにイベントと
+    状態の差分（engine.delta）だけを送る。召喚コマンドも同じソケットで受け付ける。
+
+    サーバー → クライアント:
+        {"type": "snapshot", "game_state": {...}, "unit_refs": {instance_id: ref}}
+        {"type": "tick", "events": [...], "delta": {...}}
+        {"type": "spawn", "events": [...], "delta": {...}}
+        {"type": "error", "detail": "..."}
+        {"type": "finished", "winner": "player" | "ai"}
+    クライアント → サーバー:
+        {"type": "spawn", "side": "player", "unit_spec_id": "..."}
+
+    tick_mode="client" ではこのソケットがtick_msごとにprocess_tickでマッチを進める
+    （/match/tick と併用しない）。"server" ではスケジューラが進めた結果を送る。
+
+    mode="lockstep"（クエリパラメータ）では状態を送らず、tickごとに入力だけのフレームを送る
+    （engine.lockstep参照。tick_mode="client" のみ）。
+        サーバー → クライアント:
+            {"type": "snapshot", "game_state": {...}, "hash_interval": 25}
+            {"type": "frame", "time_ms": 5200, "inputs": [...]}
+        クライアント → サーバー:
+            {"type": "hash", "time_ms": 5000, "hash": "..."}  # 不一致ならsnapshotを送り直す
+            {"type": "resync"}
+    """
+    import asyncio
+    import json
+
+    session_manager = get_session_manager()
+    game_state = session_manager.get_match(match_id)
+    if not game_state:
+        await websocket.close(code=4404, reason="Match not found")
+        return
+
+    server_mode = settings.tick_mode == "server"
+    if server_mode and mode == "lockstep":
+        await websocket.close(code=4400, reason="Lockstep mode requires tick_mode=client")
+        return
+    if not server_mode and match_id in _ws_driven_matches:
+        await websocket.close(code=4409, reason="Match is already driven by another socket")
+        return
+
+    await websocket.accept()
+    if not server_mode:
+        _ws_driven_matches.add(match_id)
+
+    tracker = StateTracker()
+    lockstep = LockstepSession() if mode == "lockstep" else None
+    send_lock = asyncio.Lock()
+
+    async def send(message: dict) -> None:
+        async with send_lock:
+            await websocket.send_json(message)
+
+    def reload_state() -> bool:
+        """
+        セッションから最新の状態を読み直す（マッチがなければFalse）
+
+        共有する保存先では他のワーカーの召喚などで状態が置き換わっているので、
+        コマンドのたびに読み直す（書き込みが衝突してやり直す場合も読み直した状態で進める）。
+        """
+        nonlocal game_state
+        state = session_manager.get_match(match_id)
+        if state is None:
+            return False
+        game_state = state
+        return True
+
+    async def tick_step() -> Optional[List[dict]]:
+        """
+        1tick分の処理（マッチのコマンドキューで実行）。送るメッセージを返す（マッチがなければNone）
+
+        差分の基準（tracker・lockstep）は状態を書き込めてから進める。
+        """
+        from app.engine.scheduler import get_tick_scheduler
+
+        if not reload_state():
+            return None
+
+        if server_mode:
+            events = get_tick_scheduler().drain(match_id)
+        else:
+            events = process_tick(game_state)
+
+        if game_state.winner:
+            if server_mode:
+                get_tick_scheduler().forget(match_id)
+            else:
+                await update_match_result(match_id, game_state.winner)
+            session_manager.delete_match(match_id)
+            print(
+                f"[Match] Match {match_id} finished with winner: {game_state.winner}. "
+                "Session deleted."
+            )
+        else:
+            session_manager.update_match(match_id, game_state)
+
+        if lockstep:
+            messages = [lockstep.frame(game_state)]
+        else:
+            messages = [{
+                "type": "tick",
+                "events": _event_payload(events),
+                "delta": tracker.delta(game_state)
+            }]
+        if game_state.winner:
+            messages.append({"type": "finished", "winner": game_state.winner})
+        return messages
+
+    async def tick_loop() -> None:
+        loop = asyncio.get_running_loop()
+        interval = game_state.tick_ms / 1000.0
+        next_at = loop.time()
+        while True:
+            next_at += interval
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+
+            try:
+                messages = await run_in_match(match_id, tick_step)
+            except MatchConflictException:
+                # 他のワーカーとの衝突が続いた。このtickは飛ばす
+                continue
+            if messages is None:
+                await send({"type": "error", "detail": f"Match not found: {match_id}"})
+                return
+            for message in messages:
+                await send(message)
+            if game_state.winner:
+                return
+
+    async def spawn_step(side: str, unit_spec: UnitSpec) -> Optional[dict]:
+        """召喚（マッチのコマンドキューで実行）。送るメッセージを返す（ロックステップではNone）"""
+        if not reload_state():
+            raise MatchNotFoundException(str(match_id))
+        spawn_event = spawn_in_match(game_state, side, unit_spec)
+        session_manager.update_match(match_id, game_state)
+        if lockstep:
+            # 召喚は次のフレームの入力として送る
+            lockstep.add_input(spawn_input(game_state, spawn_event))
+            return None
+        return {
+            "type": "spawn",
+            "events": _event_payload([spawn_event]),
+            "delta": tracker.delta(game_state)
+        }
+
+    async def handle_lockstep_command(message: dict) -> None:
+        if message["type"] == "hash":
+            time_ms = int(message.get("time_ms"))
+            if lockstep.verify(time_ms, str(message.get("hash"))) is not False:
+                return
+            print(f"[Lockstep] Hash mismatch on match {match_id} at {time_ms}ms. Resyncing.")
+        await send({"type": "snapshot", **lockstep.snapshot(game_state)})
+
+    async def receive_loop() -> None:
+        try:
+            while True:
+                try:
+                    message = json.loads(await websocket.receive_text())
+                    command = message.get("type")
+                    if lockstep and command in ("hash", "resync"):
+                        await handle_lockstep_command(message)
+                        continue
+                    if command != "spawn":
+                        raise ValueError(f"Unknown command: {command}")
+                    unit_spec_id = UUID(str(message.get("unit_spec_id")))
+                except (ValueError, TypeError, AttributeError) as e:
+                    await send({"type": "error", "detail": f"Invalid command: {e}"})
+                    continue
+
+                try:
+                    unit_spec = await load_unit_spec(game_state, unit_spec_id)
+                    side = message.get("side", "player")
+                    reply = await run_in_match(match_id, partial(spawn_step, side, unit_spec))
+                except HTTPException as e:
+                    await send({"type": "error", "detail": e.detail})
+                    continue
+                if reply is not None:
+                    await send(reply)
+        except WebSocketDisconnect:
+            return
+
+    if lockstep:
+        await send({"type": "snapshot", **lockstep.snapshot(game_state)})
+    else:
+        await send({"type": "snapshot", **tracker.snapshot(game_state)})
+    ticker = asyncio.create_task(tick_loop())
+    receiver = asyncio.create_task(receive_loop())
+    try:
+        done, _ = await asyncio.wait({ticker, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error and not isinstance(error, WebSocketDisconnect):
+                print(f"[Match] WebSocket error on match {match_id}: {error}")
+    finally:
+        ticker.cancel()
+        receiver.cancel()
+        _ws_driven_matches.discard(match_id)
+
+    if ticker in done:
+        try:
+            await websocket.close()
+        except RuntimeError:
+            # クライアント側で既に切断されている
+            pass
+
+
 @router.post("/ai_decide", response_model=AIDecideResponse)
 async def ai_decide_spawn_endpoint(request: AIDecideRequest):
     """
     AIの召喚決定
 
     Mistral LLMを使用して盤面を分析し、次に召喚するユニットを決定する。
+
+    盤面はマッチのコマンドキュー（engine.commands）でコピーを取り、判断はそのコピーで行う
+    （LLMの応答を待つ間もキューを占有せず、tickや召喚を止めない）。
     """
     from app.llm.ai_decide import ai_decide_spawn
 
     session_manager = get_session_manager()
-    game_state = session_manager.get_match(request.match_id)
 
-    if not game_state:
-        raise MatchNotFoundException(str(request.match_id))
+    async def copy_state():
+        game_state = session_manager.get_match(request.match_id)
+        if not game_state:
+            raise MatchNotFoundException(str(request.match_id))
+        # 差分応答の履歴などを含まないコンパクトな表現を経由して複製する
+        copied = unpack_state(pack_state(game_state))
+        attach_roster(copied, get_roster(game_state))
+        return copied
+
+    game_state = await run_in_match(request.match_id, copy_state)
 
     if game_state.is_finished():
         return AIDecideResponse(
@@ -256,9 +811,9 @@ async def ai_decide_spawn_endpoint(request: AIDecideRequest):
             reason="AI deck not set"
         )
 
-    # AIデッキ取得
-    ai_deck = await get_deck(game_state.ai_deck_id)
-    if not ai_deck:
+    # AIデッキのユニット（開始時に読み込んだロスター）
+    roster = await ensure_roster(game_state)
+    if not roster:
         return AIDecideResponse(
             spawn_unit_spec_id=None,
             wait_ms=600,
@@ -267,7 +822,7 @@ async def ai_decide_spawn_endpoint(request: AIDecideRequest):
 
     # AI決定
     try:
-        decision = await ai_decide_spawn(game_state, ai_deck)
+        decision = await ai_decide_spawn(game_state, roster.side("ai"))
         return AIDecideResponse(**decision)
     except Exception as e:
         print(f"AI decision error: {e}")
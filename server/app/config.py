@@ -33,6 +33,46 @@ class Settings(BaseSettings):
     max_cost: float = 20.0
     cost_recovery_per_tick: float = 0.6
     initial_base_hp: int = 100
+    simulate_max_ticks: int = 3000  # /match/simulate の上限tick数（200msで10分）
+
+    # Sessions
+    session_timeout_seconds: float = 30  # この時間アクセスがないマッチを削除
+    session_expiry_interval: float = 1.0  # 期限切れマッチを掃除する間隔（秒）
+    max_matches: int = 0  # ワーカーあたりの同時マッチ数の上限（0は無制限）
+    max_session_bytes: int = 512 * 1024 * 1024  # マッチの見積もりメモリ量の上限（0は無制限）
+    session_evict_idle_seconds: float = 10  # 上限時に追い出してよいマッチの最低アクセス間隔（秒）
+    # memory: ワーカー内, shared: 同じホストのワーカーで共有, redis: 外部ストア
+    session_backend: str = "memory"
+    # shared: 共有メモリのファイル（空なら/dev/shm/pixel-simu-arena-sessions）
+    session_shm_path: str = ""
+    session_shm_slots: int = 2048  # shared: 保存できるマッチ数
+    session_shm_slot_bytes: int = 64 * 1024  # shared: マッチ1つのエンコード後サイズの上限
+    session_store_url: str = ""  # redis: 接続URL（redis://host:6379/0）
+    # 進行中のマッチのスナップショット（空なら無効。例: snapshots/sessions.bin）
+    session_snapshot_path: str = ""
+    session_snapshot_interval: float = 5.0  # スナップショットを書き出す間隔（秒）
+    session_snapshot_max_age: float = 120  # 起動時にこれより古いものは読み戻さない（秒）
+
+    # AI Decision
+    ai_decision_timeout_seconds: float = 3.0  # 1回のAI決定でLLMを待つ上限（超えたらフォールバック）
+
+    # Unit/Deck Cache
+    spec_cache_size: int = 2048  # ワーカーごとにキャッシュするユニット・デッキの数（0は無効）
+    # shared: 無効化を伝えるファイル（空なら/dev/shm/pixel-simu-arena-cache-version）
+    spec_cache_version_path: str = ""
+    spec_cache_version_check_seconds: float = 1.0  # redis: 無効化を確認する間隔（秒）
+
+    # Tick Scheduler
+    # client: /match/tick の呼び出しで進める, server: サーバーのスケジューラで進める
+    tick_mode: str = "client"
+    scheduler_batch_size: int = 256  # 1回の一括処理で進めるマッチ数
+    scheduler_buffer_ticks: int = 150  # マッチごとに保持するイベントのtick数（200msで30秒）
+
+    # Responses
+    fast_json_responses: bool = True  # マッチ系のJSONをorjsonで直接組み立てる（api.fastjson）
+
+    # Diagnostics
+    tick_profiling: bool = False  # tick処理のフェーズ別計測（/health/ticks で参照）
 
     model_config = SettingsConfigDict(
         env_file=".env",
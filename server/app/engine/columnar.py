@@ -0,0 +1,383 @@
+"""
+NumPy列指向tick処理
+
+ユニットの数値ステータスを列（配列）にまとめ、クールダウン・移動・拠点到達・
+射程判定をベクトル演算で行う代替バックエンド。
+複数マッチのユニットを1つのバッファにまとめ（match列でマッチを区別）、
+全マッチを1回のパスで1tick進めることもできる。
+イベント列と最終状態はprocess_tick（参照実装）と完全に一致する。
+"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.schemas.game import GameState
+from app.schemas.unit import RuntimeUnit
+
+from .events import EngineEvent, move_event
+from .movement import try_attack
+from .profiling import start_tick_timer
+from .tick import finish_tick
+from .victory import check_base_reached
+
+# side列の値
+SIDE_PLAYER = 0
+SIDE_AI = 1
+
+LANE_MIN = 0.0
+LANE_MAX = 20.0
+
+
+class UnitColumns:
+    """
+    ユニット状態の列指向表現（Structure of Arrays）
+
+    units[i] の各ステータスが各配列のi番目に対応する。
+    match列は複数マッチを1つのバッファにまとめたときのマッチ番号。
+    """
+
+    __slots__ = (
+        "units", "match", "pos", "hp", "cooldown", "atk", "range", "speed", "atk_interval", "side"
+    )
+
+    def __init__(self, units: List[RuntimeUnit], match: Optional[np.ndarray] = None):
+        count = len(units)
+        self.units = units
+        self.match = match if match is not None else np.zeros(count, dtype=np.int64)
+        self.pos = np.fromiter((u.pos for u in units), dtype=np.float64, count=count)
+        self.hp = np.fromiter((u.hp for u in units), dtype=np.int64, count=count)
+        self.cooldown = np.fromiter((u.cooldown for u in units), dtype=np.float64, count=count)
+        self.atk = np.fromiter((u.atk for u in units), dtype=np.int64, count=count)
+        self.range = np.fromiter((u.range for u in units), dtype=np.float64, count=count)
+        self.speed = np.fromiter((u.speed for u in units), dtype=np.float64, count=count)
+        self.atk_interval = np.fromiter(
+            (u.atk_interval for u in units), dtype=np.float64, count=count
+        )
+        self.side = np.fromiter(
+            (SIDE_PLAYER if u.side == "player" else SIDE_AI for u in units),
+            dtype=np.int8,
+            count=count
+        )
+
+    @classmethod
+    def from_matches(cls, game_states: Sequence[GameState]) -> "UnitColumns":
+        """複数マッチのユニットを1つのバッファにまとめる"""
+        units: List[RuntimeUnit] = []
+        for game_state in game_states:
+            units.extend(game_state.units)
+        match = np.repeat(
+            np.arange(len(game_states), dtype=np.int64),
+            [len(game_state.units) for game_state in game_states]
+        )
+        return cls(units, match)
+
+    def __len__(self) -> int:
+        return len(self.units)
+
+    def write_back(self, indices: np.ndarray) -> None:
+        """指定したユニットの位置とクールダウンをユニットオブジェクトに書き戻す"""
+        units = self.units
+        for i, pos, cooldown in zip(
+            indices.tolist(), self.pos[indices].tolist(), self.cooldown[indices].tolist()
+        ):
+            unit = units[i]
+            unit.pos = pos
+            unit.cooldown = cooldown
+
+
+class _Lane:
+    """
+    敵ユニットを (match, pos, order) でソートしたレーン
+
+    同じマッチ・同じ位置のユニットをグループとして扱い、
+    グループ先頭（最小order）と次グループの開始位置を前計算する。
+    """
+
+    __slots__ = ("match", "pos", "order", "leader", "next_group", "size")
+
+    def __init__(self, match: np.ndarray, pos: np.ndarray, order: np.ndarray):
+        sort = np.lexsort((order, pos, match))
+        self.match = match[sort]
+        self.pos = pos[sort]
+        self.order = order[sort]
+        self.size = size = self.pos.size
+
+        new_group = np.ones(size, dtype=bool)
+        new_group[1:] = (self.match[1:] != self.match[:-1]) | (self.pos[1:] != self.pos[:-1])
+        starts = np.flatnonzero(new_group)
+        group_id = np.cumsum(new_group) - 1
+        self.leader = starts[group_id]
+        self.next_group = np.append(starts[1:], size)[group_id]
+
+    def insertion_points(self, match: np.ndarray, pos: np.ndarray) -> np.ndarray:
+        """
+        マッチごとのsearchsorted(side="left")
+
+        各クエリについて、(match, pos)より小さいレーン要素の数を返す。
+        """
+        count = pos.size
+        keys_match = np.concatenate((self.match, match))
+        keys_pos = np.concatenate((self.pos, pos))
+        # 同じ(match, pos)ではクエリを敵より前に並べる
+        kind = np.concatenate((np.ones(self.size, dtype=np.int8), np.zeros(count, dtype=np.int8)))
+        merged = np.lexsort((kind, keys_pos, keys_match))
+        enemies_before = np.cumsum(merged < self.size) - (merged < self.size)
+        result = np.empty(count, dtype=np.int64)
+        is_query = merged >= self.size
+        result[merged[is_query] - self.size] = enemies_before[is_query]
+        return result
+
+    def valid(self, index: np.ndarray, match: np.ndarray) -> np.ndarray:
+        """indexがレーン内かつクエリと同じマッチを指すか"""
+        inside = (index >= 0) & (index < self.size)
+        return inside & (self.match[np.clip(index, 0, max(self.size - 1, 0))] == match)
+
+
+def nearest_distances(
+    query_pos: np.ndarray,
+    enemy_pos: np.ndarray,
+    query_match: Optional[np.ndarray] = None,
+    enemy_match: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    各クエリ位置から同じマッチ内で最も近い敵までの距離を求める
+
+    Args:
+        query_pos: クエリ位置
+        enemy_pos: 敵位置（順不同）
+        query_match: クエリのマッチ番号（省略時は全て同じマッチ）
+        enemy_match: 敵のマッチ番号（省略時は全て同じマッチ）
+
+    Returns:
+        最近接距離（敵がいない場合はinf）
+    """
+    result = np.full(query_pos.shape, np.inf)
+    if enemy_pos.size == 0 or query_pos.size == 0:
+        return result
+
+    query_match = _default_match(query_match, query_pos)
+    enemy_match = _default_match(enemy_match, enemy_pos)
+    lane = _Lane(enemy_match, enemy_pos, np.zeros(enemy_pos.size, dtype=np.int64))
+    k = lane.insertion_points(query_match, query_pos)
+
+    for index in (k, k - 1):
+        valid = lane.valid(index, query_match)
+        dist = np.abs(lane.pos[np.clip(index, 0, lane.size - 1)] - query_pos)
+        result = np.where(valid, np.minimum(result, dist), result)
+    return result
+
+
+def nearest_targets(
+    query_pos: np.ndarray,
+    enemy_pos: np.ndarray,
+    enemy_order: np.ndarray,
+    query_match: Optional[np.ndarray] = None,
+    enemy_match: Optional[np.ndarray] = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    各クエリ位置について同じマッチ内の最近接敵を求める
+
+    同距離の敵が複数いる場合はenemy_orderが最小の敵を選ぶ（find_nearest_enemyと同じ規則）。
+
+    Args:
+        query_pos: クエリ位置
+        enemy_pos: 敵位置
+        enemy_order: 敵の並び順（ユニットリスト上のインデックス）
+        query_match: クエリのマッチ番号（省略時は全て同じマッチ）
+        enemy_match: 敵のマッチ番号（省略時は全て同じマッチ）
+
+    Returns:
+        (最近接距離, 敵のenemy_order)。敵がいない場合は (inf, -1)
+    """
+    count = query_pos.size
+    best_dist = np.full(count, np.inf)
+    best_order = np.full(count, -1, dtype=np.int64)
+    if enemy_pos.size == 0 or count == 0:
+        return best_dist, best_order
+
+    query_match = _default_match(query_match, query_pos)
+    enemy_match = _default_match(enemy_match, enemy_pos)
+    lane = _Lane(enemy_match, enemy_pos, enemy_order)
+    last = lane.size - 1
+
+    def consider(active: np.ndarray, group: np.ndarray, dist: np.ndarray) -> None:
+        cand_order = lane.order[group]
+        better = active & (
+            (dist < best_dist) | ((dist == best_dist) & (cand_order < best_order))
+        )
+        best_dist[better] = dist[better]
+        best_order[better] = cand_order[better]
+
+    k = lane.insertion_points(query_match, query_pos)
+
+    # 右側（pos >= query）: 挿入位置は同位置グループの先頭を指す
+    active = lane.valid(k, query_match)
+    group = np.clip(k, 0, last)
+    side_dist = np.abs(lane.pos[group] - query_pos)
+    consider(active, group, side_dist)
+    # 丸めで距離が一致する隣接グループが続く場合のみ追加で走査する
+    while True:
+        following = lane.next_group[group]
+        active = active & lane.valid(following, query_match)
+        following = np.clip(following, 0, last)
+        dist = np.abs(lane.pos[following] - query_pos)
+        active = active & (dist == side_dist)
+        if not active.any():
+            break
+        group = np.where(active, following, group)
+        consider(active, group, dist)
+
+    # 左側（pos < query）
+    active = lane.valid(k - 1, query_match)
+    group = lane.leader[np.clip(k - 1, 0, last)]
+    side_dist = np.abs(lane.pos[group] - query_pos)
+    consider(active, group, side_dist)
+    while True:
+        previous = group - 1
+        active = active & lane.valid(previous, query_match)
+        previous = lane.leader[np.clip(previous, 0, last)]
+        dist = np.abs(lane.pos[previous] - query_pos)
+        active = active & (dist == side_dist)
+        if not active.any():
+            break
+        group = np.where(active, previous, group)
+        consider(active, group, dist)
+
+    return best_dist, best_order
+
+
+def _default_match(match: Optional[np.ndarray], pos: np.ndarray) -> np.ndarray:
+    """マッチ番号が省略された場合は全て同じマッチとして扱う"""
+    if match is None:
+        return np.zeros(pos.size, dtype=np.int64)
+    return match
+
+
+def _move_side(
+    cols: UnitColumns,
+    movers: np.ndarray,
+    enemies: np.ndarray,
+    delta: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    片側のユニットを移動させる（射程内に敵がいるユニットは停止）
+
+    deltaはmoversごとの1tickの移動方向付き時間（秒）。
+
+    Returns:
+        (位置を更新したユニット, MOVEイベント対象のユニット) のインデックス
+    """
+    pos = cols.pos
+    blocked = nearest_distances(
+        pos[movers], pos[enemies], cols.match[movers], cols.match[enemies]
+    ) <= cols.range[movers]
+    walkers = movers[~blocked]
+
+    old = pos[walkers]
+    new = np.maximum(LANE_MIN, np.minimum(LANE_MAX, old + cols.speed[walkers] * delta[~blocked]))
+    pos[walkers] = new
+    return walkers, walkers[np.abs(new - old) > 0.001]
+
+
+def process_tick_columnar(game_state: GameState) -> List[EngineEvent]:
+    """
+    1tickの処理を列指向で実行
+
+    処理順序・イベント順序はprocess_tickと同じ。
+
+    Args:
+        game_state: 現在のゲーム状態（インプレースで更新される）
+
+    Returns:
+        発生したイベントのリスト
+    """
+    return process_ticks_columnar([game_state])[0]
+
+
+def process_ticks_columnar(game_states: Sequence[GameState]) -> List[List[EngineEvent]]:
+    """
+    複数マッチを1つの列バッファで1tickずつ進める
+
+    各マッチの結果はそれぞれprocess_tickを呼んだ場合と同じになる。
+    tick間隔（tick_ms）はマッチごとに異なっていてもよい。
+
+    Args:
+        game_states: ゲーム状態のリスト（インプレースで更新される）
+
+    Returns:
+        マッチごとのイベントリスト（game_statesと同じ順序）
+    """
+    results: List[List[EngineEvent]] = [[] for _ in game_states]
+    active = [i for i, game_state in enumerate(game_states) if not game_state.is_finished()]
+    if not active:
+        return results
+
+    timer = start_tick_timer()
+    states = [game_states[i] for i in active]
+    events = [results[i] for i in active]
+    cols = UnitColumns.from_matches(states)
+    match = cols.match
+    tick_duration = np.array([s.tick_ms / 1000.0 for s in states], dtype=np.float64)[match]
+
+    # 1. クールダウン更新
+    cooling = cols.cooldown > 0
+    cols.cooldown[cooling] = np.maximum(0.0, cols.cooldown[cooling] - tick_duration[cooling])
+    if timer:
+        timer.lap("cooldown", len(cols), 0)
+
+    # 2. 移動処理（プレイヤー→AIの順。AIはプレイヤーの移動後の位置で判定）
+    players = np.flatnonzero(cols.side == SIDE_PLAYER)
+    ais = np.flatnonzero(cols.side == SIDE_AI)
+    old_pos = cols.pos.copy()
+    player_walkers, player_moved = _move_side(cols, players, ais, tick_duration[players])
+    ai_walkers, ai_moved = _move_side(cols, ais, players, -tick_duration[ais])
+    cols.write_back(np.union1d(np.flatnonzero(cooling), np.union1d(player_walkers, ai_walkers)))
+
+    # バッファはマッチ順に並んでいるので、マッチ内ではプレイヤー→AIの順になる
+    for i, m in zip(
+        np.concatenate((player_moved, ai_moved)).tolist(),
+        match[np.concatenate((player_moved, ai_moved))].tolist()
+    ):
+        unit = cols.units[i]
+        events[m].append(move_event(unit, float(old_pos[i]), states[m].time_ms))
+    if timer:
+        timer.lap("move", len(cols), sum(map(len, events)))
+
+    # 3. 拠点到達チェック
+    reached = ((cols.side == SIDE_PLAYER) & (cols.pos >= LANE_MAX)) | (
+        (cols.side == SIDE_AI) & (cols.pos <= LANE_MIN)
+    )
+    if reached.any():
+        for i, m in zip(np.flatnonzero(reached).tolist(), match[reached].tolist()):
+            unit = cols.units[i]
+            _, base_events = check_base_reached(unit, states[m], states[m].time_ms)
+            events[m].extend(base_events)
+            states[m].units.discard(unit)
+        players = np.flatnonzero(~reached & (cols.side == SIDE_PLAYER))
+        ais = np.flatnonzero(~reached & (cols.side == SIDE_AI))
+    if timer:
+        timer.lap("base_reach", len(cols), sum(map(len, events)))
+
+    # 4. 攻撃処理（射程内に敵がいてクールダウンが終わったユニットのみ）
+    for attackers, enemies in ((players, ais), (ais, players)):
+        dist, target = nearest_targets(
+            cols.pos[attackers], cols.pos[enemies], enemies, match[attackers], match[enemies]
+        )
+        ready = (cols.cooldown[attackers] <= 0) & (dist <= cols.range[attackers])
+        for i, j, m in zip(
+            attackers[ready].tolist(), target[ready].tolist(), match[attackers[ready]].tolist()
+        ):
+            target_unit = cols.units[j]
+            events[m].extend(try_attack(cols.units[i], target_unit, states[m].time_ms))
+            if target_unit.hp <= 0:
+                states[m].units.discard(target_unit)
+    if timer:
+        timer.lap("attack", players.size + ais.size, sum(map(len, events)))
+
+    # 5-8. コスト回復・勝敗判定・時間更新（死亡ユニットは攻撃処理中に除去済み）
+    for game_state in states:
+        finish_tick(game_state, timer)
+    if timer:
+        timer.finish(len(states))
+
+    return results
@@ -0,0 +1,137 @@
+"""
+マッチごとのコマンドキュー
+
+tick・召喚・AI決定などマッチの状態に触れる処理をマッチごとのキューに積み、
+マッチごとに1つのコルーチン（ワーカー）が積まれた順に実行する。
+あるコマンドがDB書き込みなどでawaitしている間に届いたコマンドはキューで待ち、
+そのコマンドが終わった時点（tickの境界）でまとめて実行される。
+同じマッチの処理が途中で割り込み合わないので、グローバルなロックは要らない。
+
+DBからの読み込みなど状態に触れない前処理はキューに積む前に済ませておき、
+コマンド自体は状態の検証と更新だけにすること（キューを長く占有しない）。
+ワーカーはキューが空になると終了し、次のコマンドで作り直される。
+
+共有する保存先（storage.backends）で別のワーカーが同じマッチを先に書き換えていると、
+コマンドの書き込みはSessionConflictErrorになる。その場合はコマンドを最初から
+やり直す（コマンドは状態をセッションから読み直し、書き込みより前に外へ結果を出さないこと）。
+"""
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+from uuid import UUID
+
+from app.storage.backends import SessionConflictError
+
+T = TypeVar("T")
+Command = Callable[[], Awaitable[Any]]
+
+
+class MatchCommandQueues:
+    """マッチごとのコマンドキューとワーカー"""
+
+    def __init__(self, conflict_retries: int = 3):
+        """
+        Args:
+            conflict_retries: 他のワーカーとの書き込みの衝突でコマンドをやり直す回数
+        """
+        self.conflict_retries = conflict_retries
+        self._pending: Dict[UUID, Deque[Tuple[Command, asyncio.Future]]] = {}
+        self._workers: Dict[UUID, asyncio.Task] = {}
+        self.batches = 0  # ワーカーがキューからまとめて取り出した回数
+        self.commands = 0  # 実行したコマンド数
+        self.conflicts = 0  # 書き込みの衝突でやり直した回数
+
+    async def run(self, match_id: UUID, command: Callable[[], Awaitable[T]]) -> T:
+        """
+        コマンドをマッチのキューに積み、実行結果を待つ
+
+        Args:
+            match_id: マッチID
+            command: 実行するコルーチン関数（引数なし）
+
+        Returns:
+            commandの戻り値（例外もそのまま送出される）
+
+        Raises:
+            SessionConflictError: やり直しても他のワーカーとの書き込みの衝突が続いた
+        """
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.get(match_id)
+        if pending is None:
+            pending = self._pending[match_id] = deque()
+            self._workers[match_id] = asyncio.create_task(self._work(match_id, pending))
+        pending.append((command, future))
+        return await future
+
+    async def _work(self, match_id: UUID, pending: Deque[Tuple[Command, asyncio.Future]]) -> None:
+        """キューが空になるまでコマンドを順に実行する"""
+        batch: Deque[Tuple[Command, asyncio.Future]] = deque()
+        try:
+            while pending:
+                batch.extend(pending)
+                pending.clear()
+                self.batches += 1
+                while batch:
+                    command, future = batch.popleft()
+                    if future.done():
+                        # 実行前に呼び出し元がキャンセルされた
+                        continue
+                    self.commands += 1
+                    try:
+                        result = await self._execute(command)
+                    except asyncio.CancelledError:
+                        future.cancel()
+                        raise
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+        finally:
+            # ワーカーが止められた場合は残りのコマンドも実行しない
+            for _, future in (*batch, *pending):
+                future.cancel()
+            del self._pending[match_id]
+            del self._workers[match_id]
+
+    async def _execute(self, command: Command) -> Any:
+        """コマンドを実行（書き込みが衝突したらやり直す）"""
+        for _ in range(self.conflict_retries):
+            try:
+                return await command()
+            except SessionConflictError:
+                self.conflicts += 1
+        return await command()
+
+    def pending(self, match_id: UUID) -> int:
+        """実行待ちのコマンド数"""
+        pending = self._pending.get(match_id)
+        return len(pending) if pending else 0
+
+    def busy(self, match_id: UUID) -> bool:
+        """マッチのコマンドが実行中・実行待ちか"""
+        return match_id in self._workers
+
+    def active(self) -> int:
+        """ワーカーが動作中のマッチ数"""
+        return len(self._workers)
+
+    async def close(self) -> None:
+        """全ワーカーを止める（実行待ちのコマンドはキャンセルされる）"""
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+# グローバルシングルトン
+_match_queues: Optional[MatchCommandQueues] = None
+
+
+def get_match_queues() -> MatchCommandQueues:
+    """MatchCommandQueuesのシングルトンインスタンスを取得"""
+    global _match_queues
+    if _match_queues is None:
+        _match_queues = MatchCommandQueues()
+    return _match_queues
@@ -0,0 +1,346 @@
+"""
+ゲーム状態の差分
+
+クライアントが把握している状態を覚えておき、現在の状態との差分だけを作る。
+tickで変化するのは位置・HP・クールダウン・コスト・拠点HP・時間程度なので、
+ユニット名やスプライトURLなどの静的な値は追加時に1回だけ送れば足りる。
+
+差分の形式:
+    {
+        "time_ms": 5200,                  # 常に含む
+        "player_cost": 12.4, ...          # 変化したスカラー項目のみ
+        "units": {
+            "added": [{...UnitInstance, "ref": 7}],
+            "pos": [[ref, 位置×1000], ...],        # 1/1000マス単位の整数
+            "hp": [[ref, HP], ...],
+            "cooldown": [[ref, ミリ秒], ...],
+            "removed": [ref, ...]
+        }
+    }
+
+ユニットはUUIDの代わりにマッチ内で振る小さな整数（ref）で参照する。
+対応表はスナップショットと一緒に unit_refs（instance_id -> ref）として送る。
+位置とクールダウンは整数に量子化して比較・送信するので、差分を適用した状態は
+サーバーの状態を量子化したもの（quantize_state）と一致する。
+"""
+import random
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.schemas.game import GameState
+from app.schemas.unit import POS_SCALE
+
+# tickで変化しうるGameStateのスカラー項目
+STATE_FIELDS = ("time_ms", "player_base_hp", "ai_base_hp", "player_cost", "ai_cost", "winner")
+
+# マッチごとに保持する状態履歴の数（200msで約6秒分）
+DELTA_HISTORY_SIZE = 32
+
+# DeltaHistory.estimate_sizeの見積もり（実測をもとにした概算）
+RECORD_BASE_BYTES = 512  # StateRecord 1件
+RECORD_UNIT_BYTES = 192  # StateRecordのユニット1体分
+REF_BYTES = 128  # UnitRefsの1件
+
+# シーケンス番号の上位ビットに入れる履歴ごとの番号（JSONの数値で誤差なく表せる範囲に収める）
+SEQ_EPOCH_BITS = 20
+SEQ_COUNTER_BITS = 32
+
+UnitValues = Tuple[int, int, int]
+
+
+def quantize_unit(unit) -> UnitValues:
+    """ユニットの変化しうる値を (位置×1000, HP, クールダウンms) の整数にする"""
+    return (round(unit.pos * POS_SCALE), unit.hp, round(unit.cooldown * 1000))
+
+
+class UnitRefs:
+    """
+    instance_id -> ref（マッチ内で初めて送る順に振る整数）の対応表
+
+    refは再利用しない。
+    """
+
+    __slots__ = ("_refs", "_next")
+
+    def __init__(self):
+        self._refs: Dict[UUID, int] = {}
+        self._next = 0
+
+    def get(self, instance_id: UUID) -> int:
+        """refを取得（初めてのユニットには新しいrefを振る）"""
+        ref = self._refs.get(instance_id)
+        if ref is None:
+            ref = self._refs[instance_id] = self._next
+            self._next += 1
+        return ref
+
+    def table(self, game_state: GameState) -> Dict[str, int]:
+        """盤面上のユニットの対応表（スナップショットと一緒に送る）"""
+        return {str(unit.instance_id): self.get(unit.instance_id) for unit in game_state.units}
+
+    def forget(self, instance_ids) -> None:
+        """参照されなくなったユニットを対応表から消す"""
+        for instance_id in instance_ids:
+            self._refs.pop(instance_id, None)
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+
+class StateRecord:
+    """
+    差分計算用に覚えておく状態（スカラー項目とユニットごとの量子化した値）
+
+    GameStateを丸ごとコピーするより小さく、作るのも安い。
+    """
+
+    __slots__ = ("state", "units")
+
+    def __init__(self, game_state: GameState):
+        self.state: Dict[str, Any] = {field: getattr(game_state, field) for field in STATE_FIELDS}
+        self.units: Dict[UUID, UnitValues] = {
+            unit.instance_id: quantize_unit(unit) for unit in game_state.units
+        }
+
+
+def diff(base: StateRecord, game_state: GameState, refs: UnitRefs) -> Dict[str, Any]:
+    """
+    記録した状態から現在の状態までの差分を作る
+
+    Args:
+        base: 基準の状態
+        game_state: 現在のゲーム状態
+        refs: ユニットの対応表
+
+    Returns:
+        差分（形式はモジュールのdocstring参照）
+    """
+    delta: Dict[str, Any] = {"time_ms": game_state.time_ms}
+    for field in STATE_FIELDS:
+        value = getattr(game_state, field)
+        if base.state.get(field) != value:
+            delta[field] = value
+
+    previous = base.units
+    seen = 0
+    added: List[Dict[str, Any]] = []
+    columns: Tuple[List[List[int]], ...] = ([], [], [])
+    for unit in game_state.units:
+        old = previous.get(unit.instance_id)
+        ref = refs.get(unit.instance_id)
+        values = quantize_unit(unit)
+        if old is None:
+            instance = unit.to_instance().model_dump(mode="json")
+            instance["pos"] = values[0] / POS_SCALE
+            instance["cooldown"] = values[2] / 1000
+            instance["ref"] = ref
+            added.append(instance)
+            continue
+        seen += 1
+        if old != values:
+            for column, old_value, value in zip(columns, old, values):
+                if old_value != value:
+                    column.append([ref, value])
+
+    removed: List[int] = []
+    if seen != len(previous):
+        alive = {unit.instance_id for unit in game_state.units}
+        removed = [refs.get(instance_id) for instance_id in previous if instance_id not in alive]
+
+    delta["units"] = {
+        "added": added,
+        "pos": columns[0],
+        "hp": columns[1],
+        "cooldown": columns[2],
+        "removed": removed,
+    }
+    return delta
+
+
+def snapshot_payload(game_state: GameState, refs: UnitRefs) -> Dict[str, Any]:
+    """
+    差分を適用する起点となる全状態
+
+    Returns:
+        {"game_state": GameStateのJSON表現, "unit_refs": instance_id -> ref}
+    """
+    return {"game_state": game_state.model_dump(mode="json"), "unit_refs": refs.table(game_state)}
+
+
+class StateTracker:
+    """
+    1つのクライアントが把握している状態を追跡し、差分を作る
+
+    snapshot()で全体を送った後は、delta()を呼ぶたびに前回からの差分を返す
+    （WebSocketのように送信が必ず届く場合に使う）。
+    """
+
+    def __init__(self):
+        self.refs = UnitRefs()
+        self._record: Optional[StateRecord] = None  # snapshot()で設定される
+
+    def snapshot(self, game_state: GameState) -> Dict[str, Any]:
+        """
+        全体のスナップショットを作り、差分の基準にする
+
+        Args:
+            game_state: ゲーム状態
+
+        Returns:
+            snapshot_payloadの戻り値
+        """
+        self._record = StateRecord(game_state)
+        return snapshot_payload(game_state, self.refs)
+
+    def delta(self, game_state: GameState) -> Dict[str, Any]:
+        """
+        前回のsnapshot/delta以降の差分を作る
+
+        Args:
+            game_state: ゲーム状態
+
+        Returns:
+            diffの戻り値
+        """
+        delta = diff(self._record, game_state, self.refs)
+        record = StateRecord(game_state)
+        if delta["units"]["removed"]:
+            self.refs.forget(
+                instance_id for instance_id in self._record.units if instance_id not in record.units
+            )
+        self._record = record
+        return delta
+
+
+class DeltaHistory:
+    """
+    マッチの状態履歴（シーケンス番号つき）
+
+    応答ごとにシーケンス番号を振って状態を記録し、クライアントが確認応答（ack）した
+    番号の状態からの差分を作る。応答が届かなかった場合もackした状態から差分を作るので、
+    クライアントは受け取った応答を順に適用するだけでよい。ackが古すぎて履歴にない
+    場合はスナップショットが必要になる。
+
+    履歴とrefの対応表はプロセス内にしかなく、保存先を共有するワーカー間や
+    保存先から読み直した状態では別の履歴になる。シーケンス番号の上位ビットに
+    履歴ごとにランダムに選ぶ番号（epoch）を入れ、別の履歴が振った番号のackは
+    履歴にないもの（スナップショットが必要）として扱う。
+    """
+
+    def __init__(self, size: int = DELTA_HISTORY_SIZE):
+        self.epoch = random.randrange(1, 1 << SEQ_EPOCH_BITS)
+        self.seq = self.epoch << SEQ_COUNTER_BITS
+        self.refs = UnitRefs()
+        self._records: Deque[Tuple[int, StateRecord]] = deque(maxlen=size)
+
+    def record(self, game_state: GameState) -> int:
+        """
+        現在の状態を記録して新しいシーケンス番号を振る
+
+        Args:
+            game_state: ゲーム状態
+
+        Returns:
+            シーケンス番号
+        """
+        self.seq += 1
+        records = self._records
+        if len(records) == records.maxlen and len(records) > 1:
+            # 押し出される記録にしかいないユニットはもう差分で参照されない
+            oldest, following = records[0][1].units, records[1][1].units
+            self.refs.forget(instance_id for instance_id in oldest if instance_id not in following)
+        records.append((self.seq, StateRecord(game_state)))
+        return self.seq
+
+    def estimate_size(self) -> int:
+        """履歴のおおよそのサイズ（バイト、GameState.estimate_sizeから使う）"""
+        size = REF_BYTES * len(self.refs)
+        for _, record in self._records:
+            size += RECORD_BASE_BYTES + RECORD_UNIT_BYTES * len(record.units)
+        return size
+
+    def delta_since(self, ack_seq: int, game_state: GameState) -> Optional[Dict[str, Any]]:
+        """
+        ackされた状態から現在の状態までの差分
+
+        Args:
+            ack_seq: クライアントが最後に適用したシーケンス番号
+            game_state: 現在のゲーム状態
+
+        Returns:
+            差分（ack_seqが履歴にない、または別の履歴の番号の場合はNone＝スナップショットが必要）
+        """
+        if ack_seq >> SEQ_COUNTER_BITS != self.epoch:
+            return None
+        for seq, record in reversed(self._records):
+            if seq == ack_seq:
+                return diff(record, game_state, self.refs)
+            if seq < ack_seq:
+                break
+        return None
+
+
+def get_delta_history(game_state: GameState) -> DeltaHistory:
+    """マッチの状態履歴を取得（なければ作成）"""
+    history = game_state._delta_history
+    if history is None:
+        history = game_state._delta_history = DeltaHistory()
+    return history
+
+
+def quantize_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    GameStateのJSON表現の位置とクールダウンを差分と同じ精度に丸める
+
+    Args:
+        state: GameStateのJSON表現（インプレースで更新される）
+
+    Returns:
+        更新後の状態
+    """
+    for unit in state["units"]:
+        unit["pos"] = round(unit["pos"] * POS_SCALE) / POS_SCALE
+        unit["cooldown"] = round(unit["cooldown"] * 1000) / 1000
+    return state
+
+
+def apply_delta(
+    state: Dict[str, Any],
+    unit_refs: Dict[str, int],
+    delta: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    スナップショット（GameStateのJSON表現）に差分を適用する
+
+    クライアント側の処理の参照実装（テストや検証用）。
+
+    Args:
+        state: スナップショットまたは前回の適用結果（インプレースで更新される）
+        unit_refs: instance_id -> ref（インプレースで更新される）
+        delta: diffの戻り値
+
+    Returns:
+        更新後の状態（GameStateのJSON表現と同じ形）
+    """
+    for field in STATE_FIELDS:
+        if field in delta:
+            state[field] = delta[field]
+
+    changes = delta["units"]
+    by_ref = {unit_refs[unit["instance_id"]]: unit for unit in state["units"]}
+    for ref, value in changes["pos"]:
+        by_ref[ref]["pos"] = value / POS_SCALE
+    for ref, value in changes["hp"]:
+        by_ref[ref]["hp"] = value
+    for ref, value in changes["cooldown"]:
+        by_ref[ref]["cooldown"] = value / 1000
+
+    removed = set(changes["removed"])
+    units = [unit for unit in state["units"] if unit_refs[unit["instance_id"]] not in removed]
+    for unit in changes["added"]:
+        unit = dict(unit)
+        unit_refs[unit["instance_id"]] = unit.pop("ref")
+        units.append(unit)
+    state["units"] = units
+    return state
@@ -0,0 +1,115 @@
+"""
+エンジン内部イベント
+
+tick処理中に生成するイベントの軽量表現。
+pydanticのEventモデルやdata辞書・UUID文字列化はレスポンス生成時まで遅延させる。
+"""
+from enum import IntEnum
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.schemas.game import Event
+
+
+class EventType(IntEnum):
+    """イベント種別コード"""
+    SPAWN = 0
+    MOVE = 1
+    ATTACK = 2
+    HIT = 3
+    DEATH = 4
+    BASE_DAMAGE = 5
+
+
+# 種別ごとのpayloadのフィールド名（Event.dataのキー順）
+PAYLOAD_FIELDS: Dict[EventType, tuple[str, ...]] = {
+    EventType.SPAWN: (
+        "instance_id", "unit_spec_id", "side", "pos", "hp", "max_hp",
+        "atk", "speed", "range", "atk_interval"
+    ),
+    EventType.MOVE: ("instance_id", "from_pos", "to_pos", "side"),
+    EventType.ATTACK: ("attacker_id", "attacker_side", "target_id", "target_side", "damage"),
+    EventType.HIT: ("target_id", "target_side", "damage", "remaining_hp", "old_hp"),
+    EventType.DEATH: ("instance_id", "unit_spec_id", "side", "pos", "reason"),
+    EventType.BASE_DAMAGE: ("side", "damage", "remaining_hp", "attacker_id", "attacker_side"),
+}
+
+# Event.dataで文字列化・丸めが必要なフィールド
+_ID_FIELDS = frozenset({"instance_id", "unit_spec_id", "attacker_id", "target_id"})
+_POS_FIELDS = frozenset({"pos", "from_pos", "to_pos"})
+
+
+class EngineEvent:
+    """
+    エンジン内部のイベントレコード
+
+    payloadは種別ごとに決まった順序の値タプル（PAYLOAD_FIELDS参照）。
+    IDはUUIDのまま、位置は丸める前の値のまま保持する。
+    type / timestamp_ms / data はEventと同じ形で参照できる。
+    """
+
+    __slots__ = ("code", "timestamp_ms", "payload")
+
+    def __init__(self, code: EventType, timestamp_ms: int, payload: tuple):
+        self.code = code
+        self.timestamp_ms = timestamp_ms
+        self.payload = payload
+
+    @property
+    def type(self) -> str:
+        """イベントタイプ名（"MOVE"など）"""
+        return self.code.name
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        """Event.dataと同じ形式の辞書"""
+        data: Dict[str, Any] = {}
+        for name, value in zip(PAYLOAD_FIELDS[self.code], self.payload):
+            if value is None:
+                continue
+            if name in _ID_FIELDS:
+                value = str(value)
+            elif name in _POS_FIELDS:
+                value = round(value, 2)
+            data[name] = value
+        return data
+
+    def to_event(self) -> Event:
+        """API用のEventモデルに変換"""
+        return Event.model_construct(
+            type=self.type,
+            timestamp_ms=self.timestamp_ms,
+            data=self.data
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, EngineEvent):
+            return NotImplemented
+        return (
+            self.code == other.code
+            and self.timestamp_ms == other.timestamp_ms
+            and self.payload == other.payload
+        )
+
+    def __repr__(self) -> str:
+        return f"EngineEvent({self.type}, {self.timestamp_ms}, {self.payload!r})"
+
+
+def move_event(unit, from_pos: float, timestamp_ms: int) -> EngineEvent:
+    """MOVEイベントを作成（移動後の位置はunit.pos）"""
+    return EngineEvent(
+        EventType.MOVE, timestamp_ms, (unit.instance_id, from_pos, unit.pos, unit.side)
+    )
+
+
+def death_event(unit, timestamp_ms: int, reason: Optional[str] = None) -> EngineEvent:
+    """DEATHイベントを作成"""
+    return EngineEvent(
+        EventType.DEATH,
+        timestamp_ms,
+        (unit.instance_id, unit.unit_spec_id, unit.side, unit.pos, reason)
+    )
+
+
+def to_api_events(events: Iterable[EngineEvent]) -> List[Event]:
+    """エンジンイベントをAPIレスポンス用のEventに変換"""
+    return [e.to_event() for e in events]
@@ -0,0 +1,363 @@
+"""
+固定小数点tick処理
+
+engine_backend="fixed" の実装。位置をPOS_SCALE倍した整数、クールダウンを
+「次に攻撃できるtick番号」で保持し、tick処理を整数演算だけで行う。
+クールダウンはtick毎に減らさず、攻撃判定時に現在tickと比較するだけで済む。
+状態がすべて整数になるので、どの環境でもビット単位で同じ結果になり、
+state_hashで状態を安価にハッシュ化できる。
+
+処理順序・イベント順序はprocess_tickと同じ。ただし位置と攻撃間隔は整数に
+丸められるため、浮動小数点実装（python / numpy）とは数tickずれることがある。
+"""
+import hashlib
+import sys
+from array import array
+from bisect import bisect_left
+from typing import List, Optional
+
+from app.schemas.game import GameState
+from app.schemas.unit import POS_SCALE, FixedClock, FixedUnit
+
+from .events import EngineEvent, EventType, death_event, move_event
+from .profiling import start_tick_timer
+from .victory import check_base_reached
+
+LANE_MIN_FIXED = 0
+LANE_MAX_FIXED = 20 * POS_SCALE
+
+_SIDE_CODES = {"player": 0, "ai": 1}
+_WINNER_CODES = {None: 0, "player": 1, "ai": 2}
+
+
+def get_clock(game_state: GameState) -> FixedClock:
+    """
+    マッチの時計を取得し、game_state.time_msに合わせる
+
+    Args:
+        game_state: ゲーム状態
+
+    Returns:
+        マッチ内のFixedUnitが共有する時計
+    """
+    clock = game_state._fixed_clock
+    if clock is None:
+        clock = FixedClock(0, game_state.tick_ms)
+        game_state._fixed_clock = clock
+    clock.tick_ms = game_state.tick_ms
+    clock.tick = game_state.time_ms // game_state.tick_ms
+    return clock
+
+
+def ensure_fixed_units(game_state: GameState) -> FixedClock:
+    """
+    盤面のユニットをすべてFixedUnitにする
+
+    召喚直後のRuntimeUnitや外部から設定されたユニットを、召喚順を保ったまま置き換える。
+
+    Args:
+        game_state: ゲーム状態
+
+    Returns:
+        マッチの時計
+    """
+    clock = get_clock(game_state)
+    units = game_state.units
+    for unit in units:
+        if unit.__class__ is not FixedUnit or unit.clock is not clock:
+            units.replace(unit, FixedUnit.from_unit(unit, clock))
+    return clock
+
+
+class FixedLaneIndex:
+    """
+    片側ユニットの整数位置索引
+
+    LaneIndexの整数版。位置が整数なので距離は厳密に比較でき、
+    左右の最近接グループを1つずつ調べれば足りる。
+    """
+
+    __slots__ = ("_positions", "_leaders")
+
+    def __init__(self, units):
+        self._positions: List[int] = []
+        self._leaders: List[tuple[int, FixedUnit]] = []
+        for i, unit in sorted(enumerate(units), key=lambda item: item[1].fpos):
+            if self._positions and self._positions[-1] == unit.fpos:
+                continue
+            self._positions.append(unit.fpos)
+            self._leaders.append((i, unit))
+
+    def nearest(self, unit: FixedUnit) -> Optional[FixedUnit]:
+        """射程内の最近接敵（同距離なら召喚順で先のユニット）"""
+        positions = self._positions
+        if not positions:
+            return None
+        fpos = unit.fpos
+        k = bisect_left(positions, fpos)
+        best: Optional[tuple[int, int, FixedUnit]] = None
+        if k < len(positions):
+            index, leader = self._leaders[k]
+            best = (positions[k] - fpos, index, leader)
+        if k > 0:
+            index, leader = self._leaders[k - 1]
+            candidate = (fpos - positions[k - 1], index, leader)
+            if best is None or candidate[:2] < best[:2]:
+                best = candidate
+        if best[0] > unit.reach:
+            return None
+        return best[2]
+
+
+def _attack(unit: FixedUnit, target: FixedUnit, timestamp_ms: int, tick: int) -> List[EngineEvent]:
+    """攻撃を実行（クールダウン判定は呼び出し側で行う）"""
+    damage = unit.stats.atk
+    old_hp = target.hp
+    target.hp = max(0, old_hp - damage)
+    events = [
+        EngineEvent(
+            EventType.ATTACK,
+            timestamp_ms,
+            (unit.instance_id, unit.side, target.instance_id, target.side, damage)
+        ),
+        EngineEvent(
+            EventType.HIT,
+            timestamp_ms,
+            (target.instance_id, target.side, damage, target.hp, old_hp)
+        ),
+    ]
+    if target.hp <= 0:
+        events.append(death_event(target, timestamp_ms))
+    unit.ready_tick = tick + unit.interval_ticks
+    return events
+
+
+def process_tick_fixed(game_state: GameState) -> List[EngineEvent]:
+    """
+    1tickの処理を固定小数点で実行
+
+    Args:
+        game_state: 現在のゲーム状態（インプレースで更新される）
+
+    Returns:
+        発生したイベントのリスト
+    """
+    from .tick import finish_tick
+
+    events: List[EngineEvent] = []
+    if game_state.is_finished():
+        return events
+
+    timer = start_tick_timer()
+    clock = ensure_fixed_units(game_state)
+    tick = clock.tick
+    timestamp_ms = game_state.time_ms
+    player_units = game_state.get_player_units()
+    ai_units = game_state.get_ai_units()
+
+    # 1. クールダウン更新は不要（ready_tickと現在tickの比較で判定する）
+    if timer:
+        timer.lap("cooldown", len(game_state.units), 0)
+
+    # 2. 移動処理（プレイヤーはAIの移動前、AIはプレイヤーの移動後の位置で判定）
+    ai_index = FixedLaneIndex(ai_units)
+    for unit in player_units:
+        if ai_index.nearest(unit) is None:
+            old = unit.fpos
+            unit.fpos = min(LANE_MAX_FIXED, old + unit.step)
+            if unit.fpos != old:
+                events.append(move_event(unit, old / POS_SCALE, timestamp_ms))
+
+    player_index = FixedLaneIndex(player_units)
+    for unit in ai_units:
+        if player_index.nearest(unit) is None:
+            old = unit.fpos
+            unit.fpos = max(LANE_MIN_FIXED, old - unit.step)
+            if unit.fpos != old:
+                events.append(move_event(unit, old / POS_SCALE, timestamp_ms))
+    if timer:
+        timer.lap("move", len(game_state.units), len(events))
+
+    # 3. 拠点到達チェック
+    if timer:
+        checked = len(game_state.units)
+    for unit in game_state.units:
+        if (unit.side == "player" and unit.fpos >= LANE_MAX_FIXED) or (
+            unit.side == "ai" and unit.fpos <= LANE_MIN_FIXED
+        ):
+            _, base_events = check_base_reached(unit, game_state, timestamp_ms)
+            events.extend(base_events)
+            game_state.units.discard(unit)
+    if timer:
+        timer.lap("base_reach", checked, len(events))
+
+    # 4. 攻撃処理（クールダウン中のユニットは索引を引かない）
+    player_index = FixedLaneIndex(player_units)
+    ai_index = FixedLaneIndex(ai_units)
+    dead_units = []
+    for attackers, enemy_index in ((player_units, ai_index), (ai_units, player_index)):
+        for unit in attackers:
+            if unit.ready_tick > tick:
+                continue
+            target = enemy_index.nearest(unit)
+            if target is not None:
+                events.extend(_attack(unit, target, timestamp_ms, tick))
+                if target.hp <= 0:
+                    dead_units.append(target)
+    if timer:
+        timer.lap("attack", len(game_state.units), len(events))
+
+    # 5. 死亡ユニット除去
+    for unit in dead_units:
+        game_state.units.discard(unit)
+    if timer:
+        timer.lap("dead_removal", len(dead_units), len(events))
+
+    # 6-8. コスト回復・勝敗判定・時間更新
+    finish_tick(game_state, timer)
+    clock.tick = game_state.time_ms // game_state.tick_ms
+    if timer:
+        timer.finish()
+
+    return events
+
+
+def quiet_ticks_fixed(game_state: GameState, limit: Optional[int] = None) -> int:
+    """
+    移動だけで進められるtick数（timeskip.quiet_ticksの固定小数点版）
+
+    整数演算なので余裕を取らずに厳密な境界を求める。
+
+    Args:
+        game_state: ゲーム状態
+        limit: 上限tick数
+
+    Returns:
+        移動のみで進められるtick数
+    """
+    if game_state.is_finished():
+        return 0
+
+    ensure_fixed_units(game_state)
+    player_units = game_state.get_player_units()
+    ai_units = game_state.get_ai_units()
+    bounds = [] if limit is None else [limit]
+
+    # k tick後も拠点に届かない最大のk（ceil(残り距離 / 移動量) - 1）
+    if player_units:
+        front = max(u.fpos for u in player_units)
+        step = max(u.step for u in player_units)
+        if step > 0:
+            bounds.append(-(-(LANE_MAX_FIXED - front) // step) - 1)
+    if ai_units:
+        front = min(u.fpos for u in ai_units)
+        step = max(u.step for u in ai_units)
+        if step > 0:
+            bounds.append(-(-(front - LANE_MIN_FIXED) // step) - 1)
+
+    # k tick後の最小間隔 gap - k*closing が最大射程を超えている間は交戦しない
+    if player_units and ai_units:
+        gap = min(u.fpos for u in ai_units) - max(u.fpos for u in player_units)
+        reach = max(u.reach for u in game_state.units)
+        if gap <= reach:
+            return 0
+        closing = max(u.step for u in player_units) + max(u.step for u in ai_units)
+        if closing > 0:
+            bounds.append(-(-(gap - reach) // closing) - 1)
+
+    if not bounds:
+        return 0
+    return max(0, min(bounds))
+
+
+def advance_fixed_ticks(
+    game_state: GameState,
+    ticks: int,
+    collect_events: bool = False
+) -> List[EngineEvent]:
+    """
+    移動のみのtickをまとめて進める（timeskip.advance_quiet_ticksの固定小数点版）
+
+    整数なので位置はk tick分を1回の乗算で求められる。
+
+    Args:
+        game_state: ゲーム状態（インプレースで更新される）
+        ticks: 進めるtick数（quiet_ticks_fixedの戻り値以下）
+        collect_events: 区間全体の移動をユニットごとに1つのMOVEイベントとして返すか
+
+    Returns:
+        MOVEイベント（collect_events時のみ）
+    """
+    events: List[EngineEvent] = []
+    if ticks <= 0:
+        return events
+
+    clock = ensure_fixed_units(game_state)
+    start_ms = game_state.time_ms
+    for unit in game_state.units:
+        old = unit.fpos
+        if unit.side == "player":
+            unit.fpos = min(LANE_MAX_FIXED, old + unit.step * ticks)
+        else:
+            unit.fpos = max(LANE_MIN_FIXED, old - unit.step * ticks)
+        if collect_events and unit.fpos != old:
+            events.append(move_event(unit, old / POS_SCALE, start_ms))
+
+    for _ in range(ticks):
+        game_state.player_cost = min(
+            game_state.player_cost + game_state.cost_recovery_per_tick, game_state.max_cost
+        )
+        game_state.ai_cost = min(
+            game_state.ai_cost + game_state.cost_recovery_per_tick, game_state.max_cost
+        )
+
+    game_state.time_ms += game_state.tick_ms * ticks
+    clock.tick = game_state.time_ms // game_state.tick_ms
+    return events
+
+
+def state_hash(game_state: GameState) -> str:
+    """
+    ゲーム状態のハッシュ値
+
+    時間・拠点HP・勝者・ユニット（ID・陣営・HP・位置・クールダウン）を
+    リトルエンディアンの整数列にまとめてハッシュ化する。コストは浮動小数点の
+    ビット列をそのまま使う。fixedモードでは位置とクールダウンが整数なので
+    環境によらず同じ値になる。クールダウンは残りtick数で比べるので、
+    スナップショット（JSON）から復元した状態とも一致する。
+
+    Args:
+        game_state: ゲーム状態
+
+    Returns:
+        16進文字列のハッシュ値
+    """
+    clock = ensure_fixed_units(game_state) if game_state.engine_backend == "fixed" else None
+
+    ints = array("q", (
+        game_state.time_ms,
+        game_state.tick_ms,
+        game_state.player_base_hp,
+        game_state.ai_base_hp,
+        _WINNER_CODES[game_state.winner],
+    ))
+    floats = array("d", (game_state.player_cost, game_state.ai_cost))
+    ids = bytearray()
+    for unit in game_state.units:
+        ids += unit.instance_id.bytes
+        if unit.__class__ is FixedUnit:
+            remaining = max(0, unit.ready_tick - clock.tick)
+            ints.extend((_SIDE_CODES[unit.side], unit.hp, unit.fpos, remaining))
+        else:
+            ints.extend((_SIDE_CODES[unit.side], unit.hp))
+            floats.extend((unit.pos, unit.cooldown))
+
+    if sys.byteorder == "big":
+        ints.byteswap()
+        floats.byteswap()
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(ints.tobytes())
+    digest.update(floats.tobytes())
+    digest.update(bytes(ids))
+    return digest.hexdigest()
@@ -0,0 +1,181 @@
+"""
+ロックステップ同期
+
+tick処理は召喚入力が同じなら決定的なので、クライアントにも同じエンジンで
+マッチを進めてもらい、サーバーは毎tick入力（召喚）だけを送る。
+サーバーも権威としてprocess_tickを実行し、一定間隔（チェックポイント）で
+クライアントが報告する状態ハッシュ（fixed.state_hash）と自分のハッシュを比較する。
+一致しなければ全状態を送り直す（resync）。
+
+フレームの形式:
+    {
+        "type": "frame",
+        "time_ms": 5200,                 # このフレームのtick処理後の時刻
+        "inputs": [                      # tick処理の前に適用する入力（ほとんどのtickで空）
+            {"type": "spawn", "side": "player", "unit": {...UnitInstance}, "remaining_cost": 7.6}
+        ]
+    }
+
+クライアントはスナップショットを起点に、フレームごとに入力を適用してから1tick進める
+（apply_frameが参照実装）。tick処理後の時刻がチェックポイント（hash_intervalの倍数のtick）
+なら {"type": "hash", "time_ms": ..., "hash": state_hash} を送り返す。
+
+浮動小数点の結果が環境によって変わりうるので、サーバーと異なる実装で進める
+クライアントにはengine_backend="fixed"のマッチを推奨する。
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.schemas.game import GameState
+from app.schemas.unit import RuntimeUnit, UnitInstance
+
+from .events import EngineEvent
+from .fixed import state_hash
+from .tick import get_side_cost, process_tick, spawn_unit_in_game
+
+# チェックポイントの間隔（tick数、200msで5秒）
+LOCKSTEP_HASH_INTERVAL = 25
+
+# 照合用に保持するチェックポイントの数
+LOCKSTEP_HASH_HISTORY = 8
+
+
+def spawn_input(game_state: GameState, spawn_event: EngineEvent) -> Dict[str, Any]:
+    """
+    召喚を入力として表す
+
+    ユニットのinstance_idや初期位置、消費後のコストはサーバーが決めた値をそのまま送る
+    （クライアント側で引き算して誤差が出ないように）。
+
+    Args:
+        game_state: 召喚後のゲーム状態
+        spawn_event: 召喚時のSPAWNイベント
+
+    Returns:
+        フレームのinputsの要素
+    """
+    instance_id = spawn_event.payload[0]
+    unit = next(u for u in game_state.units if u.instance_id == instance_id)
+    return {
+        "type": "spawn",
+        "side": unit.side,
+        "unit": unit.to_instance().model_dump(mode="json"),
+        "remaining_cost": get_side_cost(game_state, unit.side),
+    }
+
+
+def is_checkpoint(game_state: GameState, hash_interval: int = LOCKSTEP_HASH_INTERVAL) -> bool:
+    """現在の時刻がハッシュを照合するチェックポイントか"""
+    return (game_state.time_ms // game_state.tick_ms) % hash_interval == 0
+
+
+class LockstepSession:
+    """
+    1つのクライアントとのロックステップ同期の状態
+
+    tickの間に受け付けた召喚を次のフレームの入力として溜め、チェックポイントの
+    ハッシュを覚えておいてクライアントの報告と照合する。
+    """
+
+    def __init__(
+        self,
+        hash_interval: int = LOCKSTEP_HASH_INTERVAL,
+        history_size: int = LOCKSTEP_HASH_HISTORY
+    ):
+        self.hash_interval = hash_interval
+        self.history_size = history_size
+        self.resyncs = 0
+        self._inputs: List[Dict[str, Any]] = []
+        self._hashes: "OrderedDict[int, str]" = OrderedDict()
+
+    def snapshot(self, game_state: GameState) -> Dict[str, Any]:
+        """
+        同期の起点となる全状態（接続時・resync時）
+
+        溜まっている入力は適用済みの状態に含まれるので捨てる。
+
+        Args:
+            game_state: ゲーム状態
+
+        Returns:
+            {"game_state": GameStateのJSON表現, "hash_interval": チェックポイントの間隔}
+        """
+        self._inputs = []
+        return {
+            "game_state": game_state.model_dump(mode="json"),
+            "hash_interval": self.hash_interval
+        }
+
+    def add_input(self, entry: Dict[str, Any]) -> None:
+        """サーバーの状態に適用済みの入力を次のフレームに載せる"""
+        self._inputs.append(entry)
+
+    def frame(self, game_state: GameState) -> Dict[str, Any]:
+        """
+        1tick分のフレームを作る（process_tickの直後に呼ぶ）
+
+        チェックポイントならハッシュを記録する。
+
+        Args:
+            game_state: tick処理後のゲーム状態
+
+        Returns:
+            フレーム（形式はモジュールのdocstring参照）
+        """
+        inputs, self._inputs = self._inputs, []
+        if is_checkpoint(game_state, self.hash_interval):
+            self._hashes[game_state.time_ms] = state_hash(game_state)
+            while len(self._hashes) > self.history_size:
+                self._hashes.popitem(last=False)
+        return {"type": "frame", "time_ms": game_state.time_ms, "inputs": inputs}
+
+    def verify(self, time_ms: int, digest: str) -> Optional[bool]:
+        """
+        クライアントが報告したハッシュを照合する
+
+        Args:
+            time_ms: チェックポイントの時刻
+            digest: クライアントのstate_hash
+
+        Returns:
+            一致すればTrue、不一致ならFalse（resyncが必要）、記録がなければNone
+        """
+        expected = self._hashes.get(time_ms)
+        if expected is None:
+            return None
+        if expected != digest:
+            self.resyncs += 1
+            return False
+        return True
+
+
+def apply_frame(
+    game_state: GameState,
+    frame: Dict[str, Any],
+    hash_interval: int = LOCKSTEP_HASH_INTERVAL
+) -> Optional[str]:
+    """
+    フレームを適用して1tick進める
+
+    クライアント側の処理の参照実装（テストや検証用）。
+
+    Args:
+        game_state: スナップショットから作ったゲーム状態（インプレースで更新される）
+        frame: LockstepSession.frameの戻り値（JSONを経由したもの）
+        hash_interval: スナップショットで受け取ったチェックポイントの間隔
+
+    Returns:
+        チェックポイントならstate_hash、それ以外はNone
+    """
+    for entry in frame["inputs"]:
+        if entry["type"] == "spawn":
+            unit = RuntimeUnit.from_instance(UnitInstance.model_validate(entry["unit"]))
+            spawn_unit_in_game(game_state, unit, game_state.time_ms)
+            if entry["side"] == "player":
+                game_state.player_cost = entry["remaining_cost"]
+            else:
+                game_state.ai_cost = entry["remaining_cost"]
+    process_tick(game_state)
+    if game_state.time_ms != frame["time_ms"]:
+        raise ValueError(f"Frame out of order: at {game_state.time_ms}, got {frame['time_ms']}")
+    return state_hash(game_state) if is_checkpoint(game_state, hash_interval) else None
@@ -3,10 +3,12 @@
 
 ユニットの移動、攻撃範囲判定、最近接敵の選定を行う。
 """
-from typing import List, Optional
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Sequence, Union
 
-from app.schemas.game import Event
-from app.schemas.unit import UnitInstance
+from app.schemas.unit import RuntimeUnit
+
+from .events import EngineEvent, EventType, death_event, move_event
 
 
 def calculate_distance(pos1: float, pos2: float) -> float:
@@ -14,22 +16,84 @@ def calculate_distance(pos1: float, pos2: float) -> float:
     return abs(pos2 - pos1)
 
 
-def is_in_range(attacker: UnitInstance, target: UnitInstance) -> bool:
+def is_in_range(attacker: RuntimeUnit, target: RuntimeUnit) -> bool:
     """攻撃範囲内にいるか判定"""
     distance = calculate_distance(attacker.pos, target.pos)
     return distance <= attacker.range
 
 
+class LaneIndex:
+    """
+    片側ユニットのレーン索引
+
+    tick毎に構築し、位置でソートした同位置グループを二分探索して最近接敵を求める。
+    同距離の敵が複数いる場合は元リストで先に現れるユニットを返す
+    （find_nearest_enemyのリスト走査と同じ結果になる）。
+    """
+
+    __slots__ = ("_positions", "_leaders")
+
+    def __init__(self, units: Iterable[RuntimeUnit]):
+        self._positions: List[float] = []
+        # 同位置グループの代表（元リストで最も先のユニット）と元インデックス
+        self._leaders: List[tuple[int, RuntimeUnit]] = []
+
+        # 安定ソートなので同位置では元の順序が保たれる
+        for i, unit in sorted(enumerate(units), key=lambda item: item[1].pos):
+            if self._positions and self._positions[-1] == unit.pos:
+                continue
+            self._positions.append(unit.pos)
+            self._leaders.append((i, unit))
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def nearest(self, unit: RuntimeUnit) -> Optional[RuntimeUnit]:
+        """
+        射程内の最近接敵を取得
+
+        Args:
+            unit: 攻撃者ユニット
+
+        Returns:
+            最近接敵（範囲内にいない場合はNone）
+        """
+        positions = self._positions
+        count = len(positions)
+        if count == 0:
+            return None
+
+        k = bisect_left(positions, unit.pos)
+        best: Optional[tuple[float, int, RuntimeUnit]] = None
+
+        # 右側（pos >= unit.pos）と左側（pos < unit.pos）の最近接グループを調べる。
+        # 浮動小数点の丸めで距離が一致するグループは隣接して並ぶので、同距離の間は走査を続ける
+        for start, step in ((k, 1), (k - 1, -1)):
+            if not 0 <= start < count:
+                continue
+            distance = calculate_distance(unit.pos, positions[start])
+            j = start
+            while 0 <= j < count and calculate_distance(unit.pos, positions[j]) == distance:
+                index, leader = self._leaders[j]
+                if best is None or (distance, index) < best[:2]:
+                    best = (distance, index, leader)
+                j += step
+
+        if best is None or best[0] > unit.range:
+            return None
+        return best[2]
+
+
 def find_nearest_enemy(
-    unit: UnitInstance,
-    enemies: List[UnitInstance]
-) -> Optional[UnitInstance]:
+    unit: RuntimeUnit,
+    enemies: Union[Sequence[RuntimeUnit], LaneIndex]
+) -> Optional[RuntimeUnit]:
     """
     最も近い敵を見つける
 
     Args:
         unit: 攻撃者ユニット
-        enemies: 敵ユニットリスト
+        enemies: 敵ユニットリスト、またはtick内で構築済みのLaneIndex
 
     Returns:
         最近接敵（範囲内にいない場合はNone）
@@ -37,6 +101,9 @@ def find_nearest_enemy(
     if not enemies:
         return None
 
+    if isinstance(enemies, LaneIndex):
+        return enemies.nearest(unit)
+
     # 射程内の敵をフィルタリング
     enemies_in_range = [e for e in enemies if is_in_range(unit, e)]
 
@@ -49,17 +116,19 @@ def find_nearest_enemy(
 
 
 def move_unit(
-    unit: UnitInstance,
-    enemies: List[UnitInstance],
-    tick_duration_sec: float
-) -> Optional[Event]:
+    unit: RuntimeUnit,
+    enemies: Union[Sequence[RuntimeUnit], LaneIndex],
+    tick_duration_sec: float,
+    timestamp_ms: int = 0
+) -> Optional[EngineEvent]:
     """
     ユニットを移動させる（射程内に敵がいる場合は停止）
 
     Args:
         unit: 移動するユニット
-        enemies: 敵ユニットリスト
+        enemies: 敵ユニットリスト、またはLaneIndex
         tick_duration_sec: tick期間（秒）
+        timestamp_ms: 現在時刻（ミリ秒）
 
     Returns:
         移動イベント（移動した場合）
@@ -81,20 +150,11 @@ def move_unit(
 
     # 移動した場合のみイベント生成
     if abs(unit.pos - old_pos) > 0.001:
-        return Event(
-            type="MOVE",
-            timestamp_ms=0,  # tickで設定される
-            data={
-                "instance_id": str(unit.instance_id),
-                "from_pos": round(old_pos, 2),
-                "to_pos": round(unit.pos, 2),
-                "side": unit.side
-            }
-        )
+        return move_event(unit, old_pos, timestamp_ms)
     return None
 
 
-def update_cooldown(unit: UnitInstance, tick_duration_sec: float) -> None:
+def update_cooldown(unit: RuntimeUnit, tick_duration_sec: float) -> None:
     """
     攻撃クールダウンを更新
 
@@ -107,10 +167,10 @@ def update_cooldown(unit: UnitInstance, tick_duration_sec: float) -> None:
 
 
 def try_attack(
-    unit: UnitInstance,
-    target: UnitInstance,
+    unit: RuntimeUnit,
+    target: RuntimeUnit,
     timestamp_ms: int
-) -> List[Event]:
+) -> List[EngineEvent]:
     """
     攻撃を試みる
 
@@ -129,16 +189,10 @@ def try_attack(
         return events
 
     # 攻撃イベント
-    events.append(Event(
-        type="ATTACK",
-        timestamp_ms=timestamp_ms,
-        data={
-            "attacker_id": str(unit.instance_id),
-            "attacker_side": unit.side,
-            "target_id": str(target.instance_id),
-            "target_side": target.side,
-            "damage": unit.atk
-        }
+    events.append(EngineEvent(
+        EventType.ATTACK,
+        timestamp_ms,
+        (unit.instance_id, unit.side, target.instance_id, target.side, unit.atk)
     ))
 
     # ダメージ適用
@@ -147,30 +201,15 @@ def try_attack(
     target.hp = max(0, target.hp)
 
     # ヒットイベント
-    events.append(Event(
-        type="HIT",
-        timestamp_ms=timestamp_ms,
-        data={
-            "target_id": str(target.instance_id),
-            "target_side": target.side,
-            "damage": unit.atk,
-            "remaining_hp": target.hp,
-            "old_hp": old_hp
-        }
+    events.append(EngineEvent(
+        EventType.HIT,
+        timestamp_ms,
+        (target.instance_id, target.side, unit.atk, target.hp, old_hp)
     ))
 
     # 死亡判定
     if target.hp <= 0:
-        events.append(Event(
-            type="DEATH",
-            timestamp_ms=timestamp_ms,
-            data={
-                "instance_id": str(target.instance_id),
-                "unit_spec_id": str(target.unit_spec_id),
-                "side": target.side,
-                "pos": round(target.pos, 2)
-            }
-        ))
+        events.append(death_event(target, timestamp_ms))
 
     # クールダウン設定
     unit.cooldown = unit.atk_interval
@@ -178,7 +217,7 @@ def try_attack(
     return events
 
 
-def remove_dead_units(units: List[UnitInstance]) -> List[UnitInstance]:
+def remove_dead_units(units: List[RuntimeUnit]) -> List[RuntimeUnit]:
     """
     死亡ユニットを除去
 
@@ -0,0 +1,200 @@
+"""
+tick処理のフェーズ別プロファイリング
+
+process_tickの各フェーズ（クールダウン・移動・拠点到達・攻撃・死亡除去・
+コスト回復・勝敗判定・時間更新）の所要時間・処理ユニット数・発生イベント数を
+ワーカープロセス単位で集計する。
+
+既定では無効。無効時はstart_tick_timer()がNoneを返すだけなので、
+tick処理側のコストは `if timer:` の分岐のみになる。
+"""
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Optional
+
+# process_tickの処理順序と同じ並び
+PHASES = (
+    "cooldown",
+    "move",
+    "base_reach",
+    "attack",
+    "dead_removal",
+    "cost_recovery",
+    "victory",
+    "time",
+)
+
+# ヒストグラムのバケット上限（マイクロ秒）。最後のバケットはそれ以上すべて
+BUCKET_BOUNDS_US = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+
+class PhaseStats:
+    """1フェーズ分の集計値"""
+
+    __slots__ = ("samples", "total_ns", "max_ns", "units", "events", "buckets")
+
+    def __init__(self):
+        self.samples = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.units = 0
+        self.events = 0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_US) + 1)
+
+    def add(self, elapsed_ns: int, units: int, events: int) -> None:
+        """1tick分の計測値を加算"""
+        self.samples += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        self.units += units
+        self.events += events
+        self.buckets[bisect_left(BUCKET_BOUNDS_US, elapsed_ns / 1000)] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """API応答用の辞書に変換"""
+        samples = self.samples
+        return {
+            "samples": samples,
+            "total_ms": round(self.total_ns / 1e6, 3),
+            "mean_us": round(self.total_ns / samples / 1000, 2) if samples else 0.0,
+            "max_us": round(self.max_ns / 1000, 2),
+            "units": self.units,
+            "events": self.events,
+            "histogram_us": {
+                **{f"le_{bound}": count for bound, count in zip(BUCKET_BOUNDS_US, self.buckets)},
+                "inf": self.buckets[-1],
+            },
+        }
+
+
+class TickTimer:
+    """
+    1回のtick処理の計測
+
+    lap()で直前のlap（または開始時点）からの経過時間を指定フェーズに加算する。
+    同じフェーズに複数回lapした場合（複数マッチの一括処理など）は合算し、
+    finish()でフェーズごとに1サンプルとしてプロファイラに記録する。
+    """
+
+    __slots__ = ("_profiler", "_last_ns", "_last_events", "_elapsed", "_units", "_events")
+
+    def __init__(self, profiler: "TickProfiler"):
+        self._profiler = profiler
+        self._last_ns = time.perf_counter_ns()
+        self._last_events = 0
+        self._elapsed: Dict[str, int] = {}
+        self._units: Dict[str, int] = {}
+        self._events: Dict[str, int] = {}
+
+    def lap(self, phase: str, units: int = 0, event_count: Optional[int] = None) -> None:
+        """
+        フェーズの終了を記録
+
+        Args:
+            phase: フェーズ名（PHASESのいずれか）
+            units: このフェーズで処理したユニット数
+            event_count: この時点までのイベント総数（差分をこのフェーズの発生数とする）
+        """
+        now = time.perf_counter_ns()
+        self._elapsed[phase] = self._elapsed.get(phase, 0) + now - self._last_ns
+        self._units[phase] = self._units.get(phase, 0) + units
+        if event_count is not None:
+            self._events[phase] = self._events.get(phase, 0) + event_count - self._last_events
+            self._last_events = event_count
+        self._last_ns = now
+
+    def finish(self, matches: int = 1) -> None:
+        """
+        計測結果をプロファイラに記録
+
+        Args:
+            matches: このtick処理で進めたマッチ数
+        """
+        self._profiler.record(self._elapsed, self._units, self._events, matches)
+
+
+class TickProfiler:
+    """
+    ワーカープロセス内のtickプロファイル集計
+
+    記録はイベントループ上で行われる前提なのでロックは取らない。
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self) -> None:
+        """集計値をすべて破棄"""
+        self.ticks = 0
+        self.matches = 0
+        self.started_at = time.time()
+        self.phases: Dict[str, PhaseStats] = {phase: PhaseStats() for phase in PHASES}
+
+    def record(
+        self,
+        elapsed: Dict[str, int],
+        units: Dict[str, int],
+        events: Dict[str, int],
+        matches: int = 1
+    ) -> None:
+        """1回のtick処理の計測値を集計に加える"""
+        self.ticks += 1
+        self.matches += matches
+        for phase, elapsed_ns in elapsed.items():
+            stats = self.phases.get(phase)
+            if stats is None:
+                stats = self.phases[phase] = PhaseStats()
+            stats.add(elapsed_ns, units.get(phase, 0), events.get(phase, 0))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        集計値を取得
+
+        Returns:
+            ワーカーのPID・計測tick数・フェーズ別の集計値
+        """
+        return {
+            "enabled": self.enabled,
+            "pid": os.getpid(),
+            "since": self.started_at,
+            "ticks": self.ticks,
+            "matches": self.matches,
+            "phases": {phase: stats.to_dict() for phase, stats in self.phases.items()},
+        }
+
+
+_profiler = TickProfiler()
+
+
+def get_tick_profiler() -> TickProfiler:
+    """ワーカープロセスのプロファイラを取得"""
+    return _profiler
+
+
+def configure_tick_profiler(enabled: bool) -> TickProfiler:
+    """
+    プロファイリングの有効/無効を切り替える
+
+    Args:
+        enabled: 有効にするか
+
+    Returns:
+        プロファイラ
+    """
+    _profiler.enabled = enabled
+    return _profiler
+
+
+def start_tick_timer() -> Optional[TickTimer]:
+    """
+    tick処理の計測を開始
+
+    Returns:
+        プロファイリングが有効ならTickTimer、無効ならNone
+    """
+    if not _profiler.enabled:
+        return None
+    return TickTimer(_profiler)
@@ -0,0 +1,278 @@
+"""
+サーバー側tickスケジューラ
+
+1つのasyncioタスクが tick_ms ごとに進行中の全マッチを一括で1tick進め、
+発生したイベントをマッチごとにバッファする。クライアントはtickを進める代わりに
+バッファ済みのイベントと最新の状態を好きな間隔で取りに来ればよい。
+
+tick_mode="server" のときにアプリケーションのライフサイクルで起動される。
+
+召喚などのコマンド（engine.commands）との順序: バッチの判定から書き戻しまでは
+awaitを挟まないので、その間にコマンドが割り込むことはない。バッチを組む時点で
+マッチのコマンドキューにコマンドが実行中・実行待ちの場合は、そのマッチのtickを
+キューに積み、先に積まれたコマンドが終わった後（tickの境界）に実行する。
+"""
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+from uuid import UUID
+
+from app.schemas.game import GameState
+from app.storage.backends import SessionConflictError
+
+from .commands import MatchCommandQueues, get_match_queues
+from .events import EngineEvent
+from .tick import process_tick, process_ticks
+
+FinishCallback = Callable[[UUID, GameState], Awaitable[None]]
+
+
+class TickScheduler:
+    """
+    進行中の全マッチをサーバー側の一定周期で進めるスケジューラ
+
+    マッチはbatch_size個ずつprocess_ticksで一括処理し、バッチの間で
+    イベントループに制御を返す（召喚APIなどがtick処理の間に割り込める）。
+    共有する保存先からの全マッチの読み出しはスレッドで行う。
+    イベントはマッチごとに直近buffer_ticks tick分まで保持する。
+    """
+
+    def __init__(
+        self,
+        session_manager,
+        tick_ms: int = 200,
+        batch_size: int = 256,
+        buffer_ticks: int = 150,
+        on_finish: Optional[FinishCallback] = None,
+        command_queues: Optional[MatchCommandQueues] = None
+    ):
+        """
+        Args:
+            session_manager: マッチを保持するSessionManager
+            tick_ms: tick周期（ミリ秒）
+            batch_size: 1回のprocess_ticksで進めるマッチ数
+            buffer_ticks: マッチごとに保持するtick数（古いものから捨てる）
+            on_finish: 勝敗が決まったマッチごとに1回呼ばれるコールバック
+            command_queues: マッチごとのコマンドキュー（コマンド実行中のマッチのtickを積む）
+        """
+        self.session_manager = session_manager
+        self.tick_ms = tick_ms
+        self.batch_size = max(1, batch_size)
+        self.buffer_ticks = buffer_ticks
+        self.on_finish = on_finish
+        self.command_queues = command_queues
+
+        self.ticks = 0  # スケジューラが実行した周期数
+        self.overruns = 0  # 処理がtick周期に収まらなかった回数
+        self.conflicts = 0  # 他のワーカーの書き込みと衝突して捨てたマッチのtick数
+        self.deferred = 0  # コマンドの実行中だったのでキューに積んだtick数
+        self.skipped = 0  # 前回積んだtickが終わっていなかったので飛ばしたtick数
+        self._queued: Dict[UUID, asyncio.Task] = {}  # キューに積んだtick
+        self._buffers: Dict[UUID, Deque[List[EngineEvent]]] = {}
+        self._finished: set[UUID] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        """スケジューラが動作中か"""
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """バックグラウンドタスクとしてスケジューラを起動"""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+        print(f"[Scheduler] Started (tick_ms={self.tick_ms}, batch_size={self.batch_size})")
+
+    async def stop(self) -> None:
+        """スケジューラを停止"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        queued = list(self._queued.values())
+        for task in queued:
+            task.cancel()
+        await asyncio.gather(*queued, return_exceptions=True)
+        print(f"[Scheduler] Stopped after {self.ticks} ticks ({self.overruns} overruns)")
+
+    async def _run(self) -> None:
+        """tick_msごとにstep()を呼ぶループ"""
+        loop = asyncio.get_running_loop()
+        interval = self.tick_ms / 1000.0
+        next_at = loop.time()
+        while True:
+            try:
+                await self.step()
+            except Exception as e:
+                # 1回の失敗でスケジューラ全体を止めない
+                print(f"[Scheduler] Tick error: {e}")
+
+            next_at += interval
+            delay = next_at - loop.time()
+            if delay < 0:
+                # 周期に間に合わなかった場合は遅れを取り戻そうとせず、ここから周期を数え直す
+                self.overruns += 1
+                next_at = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    async def step(self) -> int:
+        """
+        進行中の全マッチを1tick進める
+
+        Returns:
+            進めたマッチ数
+        """
+        if self.session_manager.backend.shared:
+            # 共有する保存先の全マッチの読み出し（ストアとの通信・デコード）は
+            # イベントループを止めないようスレッドで行う
+            sessions = await asyncio.to_thread(self.session_manager.list_matches)
+        else:
+            sessions = self.session_manager.list_matches()
+        active = [(mid, state) for mid, state in sessions.items() if not state.is_finished()]
+
+        finished: List[tuple[UUID, GameState]] = []
+        for start in range(0, len(active), self.batch_size):
+            if start:
+                await asyncio.sleep(0)
+            # バッチの間に終了・削除されたマッチは除き、コマンド実行中のマッチはキューに積む
+            batch = []
+            for mid, state in active[start:start + self.batch_size]:
+                if state.is_finished() or not self.session_manager.has_match(mid):
+                    continue
+                if self.command_queues is not None and self.command_queues.busy(mid):
+                    self._defer(mid)
+                    continue
+                batch.append((mid, state))
+            results = process_ticks([state for _, state in batch])
+            for (mid, state), events in zip(batch, results):
+                try:
+                    self.session_manager.write_back(mid, state)
+                except SessionConflictError:
+                    # 他のワーカーが先に書き換えていた。このtickは捨て、次の回で読み直す
+                    self.conflicts += 1
+                    continue
+                self._buffer(mid).append(events)
+                if state.is_finished():
+                    finished.append((mid, state))
+
+        # セッションから消えたマッチのバッファを捨てる
+        for mid in [mid for mid in self._buffers if not self.session_manager.has_match(mid)]:
+            self.forget(mid)
+
+        self.ticks += 1
+        for mid, state in finished:
+            await self._finish(mid, state)
+        return len(active)
+
+    def _defer(self, match_id: UUID) -> None:
+        """マッチのtickをコマンドキューに積む（前回積んだtickが残っていれば飛ばす）"""
+        if match_id in self._queued:
+            self.skipped += 1
+            return
+        self.deferred += 1
+        task = asyncio.create_task(self._tick_in_queue(match_id))
+        self._queued[match_id] = task
+        task.add_done_callback(lambda _: self._queued.pop(match_id, None))
+
+    async def _tick_in_queue(self, match_id: UUID) -> None:
+        """先に積まれたコマンドの後でマッチを1tick進める"""
+
+        async def tick() -> Optional[GameState]:
+            # コマンドが書き換えた最新の状態を読み直す（衝突でやり直す場合も同じ）
+            state = self.session_manager.backend.get(match_id)
+            if state is None or state.is_finished():
+                return None
+            events = process_tick(state)
+            self.session_manager.write_back(match_id, state)
+            self._buffer(match_id).append(events)
+            return state
+
+        try:
+            state = await self.command_queues.run(match_id, tick)
+        except SessionConflictError:
+            self.conflicts += 1
+            return
+        except Exception as e:
+            print(f"[Scheduler] Queued tick error for {match_id}: {e}")
+            return
+        if state is not None and state.is_finished():
+            await self._finish(match_id, state)
+
+    async def _finish(self, match_id: UUID, state: GameState) -> None:
+        """勝敗が決まったマッチのコールバックを1回だけ呼ぶ"""
+        if match_id in self._finished:
+            return
+        self._finished.add(match_id)
+        print(f"[Scheduler] Match {match_id} finished with winner: {state.winner}")
+        if self.on_finish is None:
+            return
+        try:
+            await self.on_finish(match_id, state)
+        except Exception as e:
+            print(f"[Scheduler] Finish callback failed for {match_id}: {e}")
+
+    def _buffer(self, match_id: UUID) -> Deque[List[EngineEvent]]:
+        buffer = self._buffers.get(match_id)
+        if buffer is None:
+            buffer = self._buffers[match_id] = deque(maxlen=self.buffer_ticks)
+        return buffer
+
+    def drain(self, match_id: UUID) -> List[EngineEvent]:
+        """
+        バッファ済みのイベントを取り出す
+
+        Args:
+            match_id: マッチID
+
+        Returns:
+            前回の取り出し以降に発生したイベント（発生順）
+        """
+        buffer = self._buffers.get(match_id)
+        if not buffer:
+            return []
+        events = [event for tick_events in buffer for event in tick_events]
+        buffer.clear()
+        return events
+
+    def pending_ticks(self, match_id: UUID) -> int:
+        """未取得のtick数"""
+        buffer = self._buffers.get(match_id)
+        return len(buffer) if buffer else 0
+
+    def forget(self, match_id: UUID) -> None:
+        """マッチのバッファと終了記録を破棄"""
+        self._buffers.pop(match_id, None)
+        self._finished.discard(match_id)
+
+
+# グローバルシングルトン
+_tick_scheduler: Optional[TickScheduler] = None
+
+
+def get_tick_scheduler() -> TickScheduler:
+    """TickSchedulerのシングルトンインスタンスを取得"""
+    global _tick_scheduler
+    if _tick_scheduler is None:
+        from app.config import get_settings
+        from app.storage.db import update_match_result
+        from app.storage.session import get_session_manager
+
+        async def record_result(match_id: UUID, state: GameState) -> None:
+            await update_match_result(match_id, state.winner)
+
+        settings = get_settings()
+        _tick_scheduler = TickScheduler(
+            get_session_manager(),
+            tick_ms=settings.tick_ms,
+            batch_size=settings.scheduler_batch_size,
+            buffer_ticks=settings.scheduler_buffer_ticks,
+            on_finish=record_result,
+            command_queues=get_match_queues()
+        )
+    return _tick_scheduler
@@ -0,0 +1,185 @@
+"""
+ヘッドレスシミュレーション
+
+HTTPを介さずにtick処理をまとめて実行し、対戦を早送りする。
+バランス調整・AIのロールアウト・回帰テスト用。
+"""
+import base64
+import json
+import math
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Literal, Optional, Sequence
+
+from app.schemas.game import Event, GameState
+from app.schemas.unit import UnitSpec
+
+from .events import EngineEvent
+from .tick import get_side_cost, process_tick, spawn_unit_from_spec
+from .timeskip import advance_quiet_ticks, quiet_ticks
+
+# 1回のシミュレーションの上限tick数（膠着した対戦や巨大なticksで止まらなくならないため）
+DEFAULT_MAX_TICKS = 3000
+
+EVENT_LOG_ENCODING = "zlib+base64+jsonl"
+
+
+@dataclass(frozen=True)
+class ScheduledSpawn:
+    """
+    召喚予約
+
+    time_ms以降で最初にコストが足りたtickの開始時に召喚される。
+    同じ側の予約は登録順に処理され、先頭の予約がコスト待ちの間は後続も待つ。
+    """
+    time_ms: int
+    side: Literal["player", "ai"]
+    unit_spec: UnitSpec
+
+
+@dataclass
+class SimulationResult:
+    """シミュレーション結果"""
+    game_state: GameState
+    ticks_run: int
+    spawned: int
+    events: List[EngineEvent] = field(default_factory=list)
+
+
+def simulate(
+    game_state: GameState,
+    ticks: Optional[int] = None,
+    until_finished: bool = False,
+    spawn_schedule: Sequence[ScheduledSpawn] = (),
+    collect_events: bool = False,
+    max_ticks: int = DEFAULT_MAX_TICKS,
+    time_skip: bool = True
+) -> SimulationResult:
+    """
+    対戦を複数tick進める
+
+    ticks指定時はそのtick数だけ、until_finished指定時は勝敗が決まるまで進める。
+    両方指定した場合は先に到達した方で止まる。どちらの場合も最大max_ticksまで。
+
+    time_skip有効時は、ユニットが歩くだけの区間（timeskip.quiet_ticks）を
+    まとめて進める。最終状態はtick毎に進めた場合と同じだが、スキップ区間の
+    MOVEイベントはユニットごとに1つへまとめられる。
+
+    Args:
+        game_state: ゲーム状態（インプレースで更新される）
+        ticks: 実行するtick数
+        until_finished: 勝敗が決まるまで実行するか
+        spawn_schedule: 召喚予約
+        collect_events: 発生したイベントを結果に含めるか
+        max_ticks: 上限tick数（ticksがこれより大きい場合も切り詰める）
+        time_skip: アイドル区間をまとめて進めるか
+
+    Returns:
+        シミュレーション結果
+
+    Raises:
+        ValueError: ticksとuntil_finishedのどちらも指定されていない場合
+    """
+    if ticks is None and not until_finished:
+        raise ValueError("Either ticks or until_finished must be specified")
+
+    limit = max_ticks if ticks is None else min(ticks, max_ticks)
+
+    pending = {
+        side: deque(sorted(
+            (s for s in spawn_schedule if s.side == side),
+            key=lambda s: s.time_ms
+        ))
+        for side in ("player", "ai")
+    }
+    events: List[EngineEvent] = []
+    ticks_run = 0
+    spawned = 0
+
+    while ticks_run < limit and not game_state.is_finished():
+        # 予約された召喚をtick開始時に適用
+        for side, queue in pending.items():
+            while queue and queue[0].time_ms <= game_state.time_ms:
+                spec = queue[0].unit_spec
+                if get_side_cost(game_state, side) < spec.cost:  # type: ignore
+                    break
+                spawn_event = spawn_unit_from_spec(game_state, spec, side)  # type: ignore
+                queue.popleft()
+                spawned += 1
+                if collect_events:
+                    events.append(spawn_event)
+
+        if time_skip:
+            span = quiet_ticks(
+                game_state,
+                limit=min(limit - ticks_run, _ticks_until_next_spawn(game_state, pending))
+            )
+            if span > 1:
+                skip_events = advance_quiet_ticks(game_state, span, collect_events)
+                ticks_run += span
+                if collect_events:
+                    events.extend(skip_events)
+                continue
+
+        tick_events = process_tick(game_state)
+        ticks_run += 1
+        if collect_events:
+            events.extend(tick_events)
+
+    return SimulationResult(
+        game_state=game_state,
+        ticks_run=ticks_run,
+        spawned=spawned,
+        events=events
+    )
+
+
+def adopt_state(target: GameState, source: GameState) -> None:
+    """
+    コピーを進めたシミュレーション結果を元の状態にインプレースで反映する
+
+    元の状態のオブジェクトを参照している処理（セッション・WebSocket）はそのまま使え、
+    差分応答の状態履歴とロスターも元の状態のものを引き継ぐ。
+
+    Args:
+        target: 反映先（セッション上の状態）
+        source: target.model_copy(deep=True)を進めた状態
+    """
+    for name in GameState.model_fields:
+        setattr(target, name, getattr(source, name))
+    # ユニットが参照する時計もコピーの方に合わせる
+    target._fixed_clock = source._fixed_clock
+
+
+def _ticks_until_next_spawn(game_state: GameState, pending: dict) -> int:
+    """次の召喚予約が有効になるtick開始までのtick数（コスト待ちの予約があれば0）"""
+    ticks = math.inf
+    for queue in pending.values():
+        if queue:
+            wait_ms = queue[0].time_ms - game_state.time_ms
+            ticks = min(ticks, max(0, math.ceil(wait_ms / game_state.tick_ms)))
+    return ticks
+
+
+def encode_event_log(events: Sequence[EngineEvent]) -> str:
+    """
+    イベントログを圧縮文字列にエンコード
+
+    1行1イベントのJSON（Eventと同じ形式）をzlibで圧縮し、base64で文字列化する。
+    """
+    lines = "\n".join(
+        json.dumps(
+            {"type": e.type, "timestamp_ms": e.timestamp_ms, "data": e.data},
+            separators=(",", ":"),
+            ensure_ascii=False
+        )
+        for e in events
+    )
+    return base64.b64encode(zlib.compress(lines.encode("utf-8"))).decode("ascii")
+
+
+def decode_event_log(encoded: str) -> List[Event]:
+    """encode_event_logでエンコードしたイベントログを復元"""
+    lines = zlib.decompress(base64.b64decode(encoded)).decode("utf-8")
+    return [Event(**json.loads(line)) for line in lines.splitlines() if line]
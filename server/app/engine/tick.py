@@ -3,14 +3,17 @@ tick処理
 
 ゲームの中心ロジック。200msごとに呼ばれ、全ユニットの移動・攻撃・死亡判定を行う。
 """
-from typing import List
+from typing import List, Literal, Optional, Sequence
 
-from app.schemas.game import Event, GameState
+from app.schemas.game import GameState
+from app.schemas.unit import RuntimeUnit, UnitSpec
 
+from .events import EngineEvent, EventType
+from .profiling import TickTimer, start_tick_timer
 from .movement import (
+    LaneIndex,
     find_nearest_enemy,
     move_unit,
-    remove_dead_units,
     try_attack,
     update_cooldown
 )
@@ -21,10 +24,13 @@ from .victory import (
 )
 
 
-def process_tick(game_state: GameState) -> List[Event]:
+def process_tick(game_state: GameState) -> List[EngineEvent]:
     """
     1tickの処理を実行
 
+    game_state.engine_backendが"numpy"の場合は列指向実装（columnar）、
+    "fixed"の場合は固定小数点実装（fixed）で処理する。
+
     処理順序:
     1. クールダウン更新
     2. 移動処理
@@ -35,96 +41,177 @@ def process_tick(game_state: GameState) -> List[Event]:
     7. 勝敗判定
     8. 時間更新
 
+    プロファイリングが有効な場合（engine.profiling）はフェーズごとの
+    所要時間・ユニット数・イベント数を記録する。
+
     Args:
         game_state: 現在のゲーム状態（インプレースで更新される）
 
     Returns:
-        発生したイベントのリスト
+        発生したイベントのリスト（APIで返す場合はevents.to_api_eventsで変換する）
     """
-    events: List[Event] = []
+    events: List[EngineEvent] = []
     tick_duration_sec = game_state.tick_ms / 1000.0  # ミリ秒を秒に変換
 
     # 勝敗が決している場合は何もしない
     if game_state.is_finished():
         return events
 
+    if game_state.engine_backend == "numpy":
+        from .columnar import process_tick_columnar
+        return process_tick_columnar(game_state)
+    if game_state.engine_backend == "fixed":
+        from .fixed import process_tick_fixed
+        return process_tick_fixed(game_state)
+
+    timer = start_tick_timer()
+
     # 1. クールダウン更新
     for unit in game_state.units:
         update_cooldown(unit, tick_duration_sec)
+    if timer:
+        timer.lap("cooldown", len(game_state.units), len(events))
 
     # 2. 移動処理 (射程内に敵がいない場合のみ移動)
     player_units = game_state.get_player_units()
     ai_units = game_state.get_ai_units()
 
-    # プレイヤーユニットの移動
+    # プレイヤーユニットの移動（AIは移動前の位置で索引）
+    ai_index = LaneIndex(ai_units)
     for unit in player_units:
-        move_event = move_unit(unit, ai_units, tick_duration_sec)
+        move_event = move_unit(unit, ai_index, tick_duration_sec, game_state.time_ms)
         if move_event:
-            move_event.timestamp_ms = game_state.time_ms
             events.append(move_event)
 
-    # AIユニットの移動
+    # AIユニットの移動（プレイヤーは移動後の位置で索引）
+    player_index = LaneIndex(player_units)
     for unit in ai_units:
-        move_event = move_unit(unit, player_units, tick_duration_sec)
+        move_event = move_unit(unit, player_index, tick_duration_sec, game_state.time_ms)
         if move_event:
-            move_event.timestamp_ms = game_state.time_ms
             events.append(move_event)
+    if timer:
+        timer.lap("move", len(game_state.units), len(events))
 
-    # 3. 拠点到達チェック
-    units_to_remove = []
+    # 3. 拠点到達チェック（到達ユニットはその場で除去）
+    if timer:
+        checked = len(game_state.units)
     for unit in game_state.units:
         reached, base_events = check_base_reached(unit, game_state, game_state.time_ms)
         if reached:
-            units_to_remove.append(unit.instance_id)
+            game_state.units.discard(unit)
             events.extend(base_events)
+    if timer:
+        timer.lap("base_reach", checked, len(events))
 
-    # 拠点到達ユニットを除去
-    game_state.units = [u for u in game_state.units if u.instance_id not in units_to_remove]
-
-    # 4. 攻撃処理 (移動処理後にユニットリストを再取得)
+    # 4. 攻撃処理
+    # 攻撃中は位置が変わらないので、索引はフェーズ開始時に一度だけ構築する
     player_units = game_state.get_player_units()
     ai_units = game_state.get_ai_units()
+    player_index = LaneIndex(player_units)
+    ai_index = LaneIndex(ai_units)
+    dead_units = []
 
     # プレイヤーユニットの攻撃
     for unit in player_units:
-        target = find_nearest_enemy(unit, ai_units)
+        target = find_nearest_enemy(unit, ai_index)
         if target:
             attack_events = try_attack(unit, target, game_state.time_ms)
             events.extend(attack_events)
+            if target.hp <= 0:
+                dead_units.append(target)
 
     # AIユニットの攻撃
     for unit in ai_units:
-        target = find_nearest_enemy(unit, player_units)
+        target = find_nearest_enemy(unit, player_index)
         if target:
             attack_events = try_attack(unit, target, game_state.time_ms)
             events.extend(attack_events)
+            if target.hp <= 0:
+                dead_units.append(target)
+    if timer:
+        timer.lap("attack", len(game_state.units), len(events))
+
+    # 5. 死亡ユニット除去（このtickで倒れたユニットだけを除去する）
+    for unit in dead_units:
+        game_state.units.discard(unit)
+    if timer:
+        timer.lap("dead_removal", len(dead_units), len(events))
+
+    # 6-8. コスト回復・勝敗判定・時間更新
+    finish_tick(game_state, timer)
+    if timer:
+        timer.finish()
+
+    return events
+
+
+def process_ticks(game_states: Sequence[GameState]) -> List[List[EngineEvent]]:
+    """
+    複数マッチを1tickずつ一括で進める
+
+    浮動小数点のマッチは全ユニットを1つの列バッファにまとめて処理する
+    （python / numpyどちらもcolumnar実装を使う）。fixedのマッチは個別に処理する。
+    各マッチの結果はprocess_tickを個別に呼んだ場合と同じ。
+
+    Args:
+        game_states: ゲーム状態のリスト（インプレースで更新される）
+
+    Returns:
+        マッチごとのイベントリスト（game_statesと同じ順序）
+    """
+    from .columnar import process_ticks_columnar
+
+    batched = [i for i, s in enumerate(game_states) if s.engine_backend != "fixed"]
+    if len(batched) == len(game_states):
+        return process_ticks_columnar(game_states)
+
+    results: List[List[EngineEvent]] = [[] for _ in game_states]
+    for i, events in zip(batched, process_ticks_columnar([game_states[i] for i in batched])):
+        results[i] = events
+    for i, game_state in enumerate(game_states):
+        if game_state.engine_backend == "fixed":
+            results[i] = process_tick(game_state)
+    return results
+
 
-    # 5. 死亡ユニット除去
-    game_state.units = remove_dead_units(game_state.units)
+def finish_tick(game_state: GameState, timer: Optional[TickTimer] = None) -> None:
+    """
+    tick終端の共通処理（コスト回復・勝敗判定・時間更新）
 
+    Args:
+        game_state: ゲーム状態（インプレースで更新される）
+        timer: プロファイリング中の計測（無効時はNone）
+    """
     # 6. コスト回復
     game_state.player_cost += game_state.cost_recovery_per_tick
     game_state.player_cost = min(game_state.player_cost, game_state.max_cost)
 
     game_state.ai_cost += game_state.cost_recovery_per_tick
     game_state.ai_cost = min(game_state.ai_cost, game_state.max_cost)
+    if timer:
+        timer.lap("cost_recovery")
 
     # 7. 勝敗判定
     winner = determine_winner(game_state)
     if winner:
         game_state.winner = winner
+    if timer:
+        timer.lap("victory")
 
     # 8. 時間更新
     game_state.time_ms += game_state.tick_ms
 
-    return events
+    # 除去済みユニットの墓標が溜まっていれば詰め直す
+    game_state.units.maybe_compact()
+    if timer:
+        timer.lap("time", len(game_state.units))
 
 
 def spawn_unit_in_game(
     game_state: GameState,
     unit_instance,
     timestamp_ms: int
-) -> Event:
+) -> EngineEvent:
     """
     ゲームにユニットを召喚
 
@@ -138,19 +225,55 @@ def spawn_unit_in_game(
     """
     game_state.units.append(unit_instance)
 
-    return Event(
-        type="SPAWN",
-        timestamp_ms=timestamp_ms,
-        data={
-            "instance_id": str(unit_instance.instance_id),
-            "unit_spec_id": str(unit_instance.unit_spec_id),
-            "side": unit_instance.side,
-            "pos": round(unit_instance.pos, 2),
-            "hp": unit_instance.hp,
-            "max_hp": unit_instance.max_hp,
-            "atk": unit_instance.atk,
-            "speed": unit_instance.speed,
-            "range": unit_instance.range,
-            "atk_interval": unit_instance.atk_interval
-        }
+    return EngineEvent(
+        EventType.SPAWN,
+        timestamp_ms,
+        (
+            unit_instance.instance_id,
+            unit_instance.unit_spec_id,
+            unit_instance.side,
+            unit_instance.pos,
+            unit_instance.hp,
+            unit_instance.max_hp,
+            unit_instance.atk,
+            unit_instance.speed,
+            unit_instance.range,
+            unit_instance.atk_interval
+        )
     )
+
+
+def get_side_cost(game_state: GameState, side: Literal["player", "ai"]) -> float:
+    """指定側の現在コストを取得"""
+    return game_state.player_cost if side == "player" else game_state.ai_cost
+
+
+def spawn_unit_from_spec(
+    game_state: GameState,
+    unit_spec: UnitSpec,
+    side: Literal["player", "ai"]
+) -> EngineEvent:
+    """
+    UnitSpecからユニットを召喚してコストを消費する
+
+    コストが足りるかの確認は呼び出し側で行う。
+
+    Args:
+        game_state: ゲーム状態
+        unit_spec: 召喚するユニット
+        side: 召喚側
+
+    Returns:
+        SPAWNイベント
+    """
+    initial_pos = 0.0 if side == "player" else 20.0
+    unit_instance = RuntimeUnit.from_spec(spec=unit_spec, side=side, initial_pos=initial_pos)
+
+    spawn_event = spawn_unit_in_game(game_state, unit_instance, game_state.time_ms)
+
+    if side == "player":
+        game_state.player_cost -= unit_spec.cost
+    else:
+        game_state.ai_cost -= unit_spec.cost
+
+    return spawn_event
@@ -0,0 +1,139 @@
+"""
+アイドル区間のスキップ
+
+ユニットが歩いているだけのtickが続く区間を解析的に求め、まとめて進める。
+敵同士が射程に入る・拠点に到達する直前までは、各tickで起きるのは
+移動・クールダウン減少・コスト回復・時間経過だけなので、全体走査を省略できる。
+"""
+import math
+from typing import List, Optional
+
+import numpy as np
+
+from app.schemas.game import GameState
+
+from .columnar import LANE_MAX, LANE_MIN, SIDE_PLAYER, UnitColumns
+from .events import EngineEvent, move_event
+
+
+def quiet_ticks(game_state: GameState, limit: Optional[int] = None) -> int:
+    """
+    次に「何かが起きる」可能性があるtickの手前までのtick数を求める
+
+    以下のいずれかが起こりうる最初のtickより前までを保守的に見積もる。
+    - いずれかの敵同士が射程内に入る
+    - ユニットが拠点に到達する
+    クールダウンの終了は射程内に敵がいない限り挙動に影響しないので境界にしない
+    （クールダウン値自体はadvance_quiet_ticksで正しく減少させる）。
+
+    Args:
+        game_state: ゲーム状態
+        limit: 上限tick数
+
+    Returns:
+        移動のみで進められるtick数（0ならスキップ不可）
+    """
+    if game_state.engine_backend == "fixed":
+        from .fixed import quiet_ticks_fixed
+        return quiet_ticks_fixed(game_state, limit)
+
+    if game_state.is_finished():
+        return 0
+
+    tick_sec = game_state.tick_ms / 1000.0
+    bound = math.inf if limit is None else limit
+
+    player_units = game_state.get_player_units()
+    ai_units = game_state.get_ai_units()
+
+    if player_units:
+        front = max(u.pos for u in player_units)
+        step = max(u.speed for u in player_units) * tick_sec
+        # 拠点到達（pos >= 20）の手前まで。丸め誤差を考慮して1tick余裕を取る
+        bound = min(bound, math.floor((LANE_MAX - front) / step) - 1)
+
+    if ai_units:
+        front = min(u.pos for u in ai_units)
+        step = max(u.speed for u in ai_units) * tick_sec
+        bound = min(bound, math.floor((front - LANE_MIN) / step) - 1)
+
+    if player_units and ai_units:
+        gap = min(u.pos for u in ai_units) - max(u.pos for u in player_units)
+        reach = max(u.range for u in game_state.units)
+        closing = (
+            max(u.speed for u in player_units) + max(u.speed for u in ai_units)
+        ) * tick_sec
+        if gap <= reach:
+            return 0
+        # k tick後の最小間隔 gap - k*closing が射程を超えている間は交戦しない
+        bound = min(bound, math.floor((gap - reach) / closing) - 1)
+
+    if bound == math.inf:
+        # ユニットがいない場合は上限まで進められる
+        return 0 if limit is None else limit
+    return max(0, int(bound))
+
+
+def advance_quiet_ticks(
+    game_state: GameState,
+    ticks: int,
+    collect_events: bool = False
+) -> List[EngineEvent]:
+    """
+    移動のみのtickをまとめて進める
+
+    quiet_ticksが返したtick数以下で呼ぶこと。位置・クールダウン・コストは
+    process_tickを繰り返した場合とビット単位で同じになるよう、1tickずつの演算を
+    配列に対してまとめて適用する。
+
+    Args:
+        game_state: ゲーム状態（インプレースで更新される）
+        ticks: 進めるtick数
+        collect_events: 区間全体の移動をユニットごとに1つのMOVEイベントとして返すか
+
+    Returns:
+        MOVEイベント（collect_events時のみ）
+    """
+    if game_state.engine_backend == "fixed":
+        from .fixed import advance_fixed_ticks
+        return advance_fixed_ticks(game_state, ticks, collect_events)
+
+    events: List[EngineEvent] = []
+    if ticks <= 0:
+        return events
+
+    tick_sec = game_state.tick_ms / 1000.0
+    start_ms = game_state.time_ms
+
+    if game_state.units:
+        cols = UnitColumns(list(game_state.units))
+        start_pos = cols.pos.copy()
+        is_player = cols.side == SIDE_PLAYER
+        step = cols.speed * tick_sec
+        pos = cols.pos
+        cooldown = cols.cooldown
+
+        for _ in range(ticks):
+            cooling = cooldown > 0
+            cooldown[cooling] = np.maximum(0.0, cooldown[cooling] - tick_sec)
+            pos[:] = np.maximum(
+                LANE_MIN, np.minimum(LANE_MAX, np.where(is_player, pos + step, pos - step))
+            )
+
+        cols.write_back(np.arange(len(cols)))
+
+        if collect_events:
+            for unit, old_pos in zip(cols.units, start_pos.tolist()):
+                if abs(unit.pos - old_pos) > 0.001:
+                    events.append(move_event(unit, old_pos, start_ms))
+
+    for _ in range(ticks):
+        game_state.player_cost = min(
+            game_state.player_cost + game_state.cost_recovery_per_tick, game_state.max_cost
+        )
+        game_state.ai_cost = min(
+            game_state.ai_cost + game_state.cost_recovery_per_tick, game_state.max_cost
+        )
+
+    game_state.time_ms += game_state.tick_ms * ticks
+    return events
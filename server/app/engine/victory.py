@@ -5,15 +5,17 @@
 """
 from typing import List, Literal, Optional
 
-from app.schemas.game import Event, GameState
-from app.schemas.unit import UnitInstance
+from app.schemas.game import GameState
+from app.schemas.unit import RuntimeUnit
+
+from .events import EngineEvent, EventType, death_event
 
 
 def check_base_reached(
-    unit: UnitInstance,
+    unit: RuntimeUnit,
     game_state: GameState,
     timestamp_ms: int
-) -> tuple[bool, List[Event]]:
+) -> tuple[bool, List[EngineEvent]]:
     """
     ユニットが拠点に到達したか確認
 
@@ -34,30 +36,14 @@ def check_base_reached(
         game_state.ai_base_hp -= damage
         game_state.ai_base_hp = max(0, game_state.ai_base_hp)
 
-        events.append(Event(
-            type="BASE_DAMAGE",
-            timestamp_ms=timestamp_ms,
-            data={
-                "side": "ai",
-                "damage": damage,
-                "remaining_hp": game_state.ai_base_hp,
-                "attacker_id": str(unit.instance_id),
-                "attacker_side": unit.side
-            }
+        events.append(EngineEvent(
+            EventType.BASE_DAMAGE,
+            timestamp_ms,
+            ("ai", damage, game_state.ai_base_hp, unit.instance_id, unit.side)
         ))
 
         # ユニットを除去（死亡イベント）
-        events.append(Event(
-            type="DEATH",
-            timestamp_ms=timestamp_ms,
-            data={
-                "instance_id": str(unit.instance_id),
-                "unit_spec_id": str(unit.unit_spec_id),
-                "side": unit.side,
-                "pos": round(unit.pos, 2),
-                "reason": "reached_base"
-            }
-        ))
+        events.append(death_event(unit, timestamp_ms, reason="reached_base"))
 
         return True, events
 
@@ -68,30 +54,14 @@ def check_base_reached(
         game_state.player_base_hp -= damage
         game_state.player_base_hp = max(0, game_state.player_base_hp)
 
-        events.append(Event(
-            type="BASE_DAMAGE",
-            timestamp_ms=timestamp_ms,
-            data={
-                "side": "player",
-                "damage": damage,
-                "remaining_hp": game_state.player_base_hp,
-                "attacker_id": str(unit.instance_id),
-                "attacker_side": unit.side
-            }
+        events.append(EngineEvent(
+            EventType.BASE_DAMAGE,
+            timestamp_ms,
+            ("player", damage, game_state.player_base_hp, unit.instance_id, unit.side)
         ))
 
         # ユニットを除去（死亡イベント）
-        events.append(Event(
-            type="DEATH",
-            timestamp_ms=timestamp_ms,
-            data={
-                "instance_id": str(unit.instance_id),
-                "unit_spec_id": str(unit.unit_spec_id),
-                "side": unit.side,
-                "pos": round(unit.pos, 2),
-                "reason": "reached_base"
-            }
-        ))
+        events.append(death_event(unit, timestamp_ms, reason="reached_base"))
 
         return True, events
 
@@ -118,7 +88,7 @@ def determine_winner(game_state: GameState) -> Optional[Literal["player", "ai"]]
     return None
 
 
-def remove_units_that_reached_base(units: List[UnitInstance]) -> List[UnitInstance]:
+def remove_units_that_reached_base(units: List[RuntimeUnit]) -> List[RuntimeUnit]:
     """
     拠点に到達したユニットを除去
 
@@ -2,7 +2,12 @@
 AI召喚決定
 
 Mistral LLMを使用して盤面を分析し、次に召喚するユニットを決定する。
+
+LLMは非同期クライアント（chat.complete_async）で呼び出し、応答を待つ間もイベントループを
+止めない（他のマッチのtickが進む）。クライアントはプロセスで1つを使い回して接続を再利用し、
+1回の決定にかける時間は ai_decision_timeout_seconds までとする（超えたらフォールバック）。
 """
+import asyncio
 import json
 from typing import Optional
 from uuid import UUID
@@ -10,12 +15,14 @@ from uuid import UUID
 from mistralai import Mistral
 
 from app.config import get_settings
-from app.schemas.deck import Deck
 from app.schemas.game import GameState
 from app.schemas.unit import UnitSpec
 
 settings = get_settings()
 
+# AI決定で使い回すクライアント（_get_mistral_clientで作成）
+_client: Optional[Mistral] = None
+
 
 AI_DECISION_SYSTEM_PROMPT = """You are an AI player in a 1-lane battle game.
 
@@ -37,7 +44,7 @@ Output ONLY valid JSON:
 If you decide not to spawn, set spawn_unit_spec_id to null."""
 
 
-async def ai_decide_spawn(game_state: GameState, ai_deck: Deck) -> dict:
+async def ai_decide_spawn(game_state: GameState, deck_units: list[UnitSpec]) -> dict:
     """
     AIの召喚決定
 
@@ -47,7 +54,7 @@ async def ai_decide_spawn(game_state: GameState, ai_deck: Deck) -> dict:
 
     Args:
         game_state: 現在のゲーム状態
-        ai_deck: AIのデッキ
+        deck_units: AIのデッキのユニット（マッチのロスター、storage.roster参照）
 
     Returns:
         {
@@ -56,11 +63,6 @@ async def ai_decide_spawn(game_state: GameState, ai_deck: Deck) -> dict:
             "reason": str
         }
     """
-    from app.storage.db import get_units_by_ids
-
-    # デッキのユニット情報取得
-    deck_units = await get_units_by_ids(ai_deck.unit_spec_ids)
-
     # コスト範囲内のユニットのみ
     available_units = [u for u in deck_units if u.cost <= game_state.ai_cost]
 
@@ -74,9 +76,12 @@ async def ai_decide_spawn(game_state: GameState, ai_deck: Deck) -> dict:
     # 1. ゲーム状態サマリー作成
     summary = _create_game_summary(game_state, available_units)
 
-    # 2. Mistral LLMで決定（同期呼び出し）
+    # 2. Mistral LLMで決定（時間切れはフォールバック）
     try:
-        decision = _call_mistral_for_decision(summary, available_units)
+        decision = await asyncio.wait_for(
+            _call_mistral_for_decision(summary, available_units),
+            timeout=settings.ai_decision_timeout_seconds
+        )
 
         # spawn_unit_spec_idをUUIDに変換
         spawn_id = None
@@ -97,6 +102,10 @@ async def ai_decide_spawn(game_state: GameState, ai_deck: Deck) -> dict:
             "reason": decision.get("reason", "")
         }
 
+    except asyncio.TimeoutError:
+        print(f"AI decision timed out after {settings.ai_decision_timeout_seconds}s")
+        return _fallback_decision(game_state, available_units)
+
     except Exception as e:
         print(f"AI decision error: {e}")
         # フォールバック: 貪欲戦略
@@ -130,7 +139,30 @@ AI units on field ({len(ai_units)}):
     return summary
 
 
-def _call_mistral_for_decision(summary: str, available_units: list[UnitSpec], max_retries: int = 2) -> dict:
+def _get_mistral_client() -> Mistral:
+    """AI決定用のMistralクライアントのシングルトンを取得"""
+    global _client
+    if _client is None:
+        _client = Mistral(
+            api_key=settings.mistral_api_key,
+            timeout_ms=int(settings.ai_decision_timeout_seconds * 1000)
+        )
+    return _client
+
+
+async def close_mistral_client() -> None:
+    """AI決定用のクライアントの接続を閉じる（シャットダウン時）"""
+    global _client
+    if _client is not None:
+        await _client.__aexit__(None, None, None)
+        _client = None
+
+
+async def _call_mistral_for_decision(
+    summary: str,
+    available_units: list[UnitSpec],
+    max_retries: int = 2
+) -> dict:
     """
     Mistral LLMを呼び出して決定を取得
 
@@ -145,11 +177,11 @@ def _call_mistral_for_decision(summary: str, available_units: list[UnitSpec], ma
     Raises:
         Exception: 生成失敗時
     """
-    client = Mistral(api_key=settings.mistral_api_key)
+    client = _get_mistral_client()
 
     for attempt in range(max_retries):
         try:
-            response = client.chat.complete(
+            response = await client.chat.complete_async(
                 model="mistral-large-latest",
                 messages=[
                     {"role": "system", "content": AI_DECISION_SYSTEM_PROMPT},
@@ -50,9 +50,62 @@ async def lifespan(app: FastAPI):
     create_placeholder_images()
     print("Placeholder images created")
 
+    # tickプロファイリング（オプトイン）
+    if settings.tick_profiling:
+        from app.engine.profiling import configure_tick_profiler
+        configure_tick_profiler(True)
+        print("Tick profiling enabled")
+
+    # 前回のスナップショットから進行中のマッチを読み戻し、定期的に書き出す
+    from app.storage.snapshots import get_session_snapshotter
+    snapshotter = get_session_snapshotter()
+    if snapshotter is not None:
+        try:
+            restored = snapshotter.restore(max_age_seconds=settings.session_snapshot_max_age)
+            print(f"Restored {restored} matches from {snapshotter.path}")
+        except Exception as e:
+            print(f"Failed to restore session snapshot: {e}")
+        await snapshotter.start()
+
+    # 期限切れマッチの掃除
+    from app.storage.session import get_session_manager
+    await get_session_manager().start_expiry(
+        timeout_seconds=settings.session_timeout_seconds,
+        interval_seconds=settings.session_expiry_interval
+    )
+
+    # サーバー側tickスケジューラ
+    if settings.tick_mode == "server":
+        from app.engine.scheduler import get_tick_scheduler
+        if settings.session_backend != "memory":
+            # 各ワーカーのスケジューラが全マッチを進めてしまう
+            print("Warning: TICK_MODE=server with a shared session backend needs a single worker")
+        await get_tick_scheduler().start()
+
     yield
 
     # シャットダウン時
+    await get_session_manager().stop_expiry()
+    if settings.tick_mode == "server":
+        from app.engine.scheduler import get_tick_scheduler
+        await get_tick_scheduler().stop()
+
+    # 実行待ちのコマンド（tick・召喚など）を止める
+    from app.engine.commands import get_match_queues
+    await get_match_queues().close()
+
+    # 最後のスナップショット（tickが止まってから書き出す）
+    if snapshotter is not None:
+        await snapshotter.stop()
+
+    get_session_manager().backend.close()
+
+    from app.storage.cache import get_spec_cache
+    get_spec_cache().version.close()
+
+    from app.llm.ai_decide import close_mistral_client
+    await close_mistral_client()
+
     await close_db_pool()
     print("Database connection closed")
 
@@ -94,19 +147,53 @@ app.include_router(deck.router, prefix="/deck", tags=["deck"])
 @app.get("/health")
 async def health_check():
     """ヘルスチェックエンドポイント"""
+    from app.storage.cache import get_spec_cache
     from app.storage.session import get_session_manager
 
     session_manager = get_session_manager()
     active_matches = session_manager.count_matches()
+    spec_cache = get_spec_cache()
 
     return {
         "status": "ok",
         "service": "pixel-simu-arena",
         "active_matches": active_matches,
+        "max_matches": session_manager.max_matches,
+        "estimated_session_bytes": session_manager.estimate_bytes(),
+        "max_session_bytes": session_manager.max_bytes,
+        "session_backend": get_settings().session_backend,
+        "evicted_matches": session_manager.evicted,
+        "rejected_matches": session_manager.rejected,
+        "spec_cache": {
+            "entries": len(spec_cache),
+            "hits": spec_cache.hits,
+            "misses": spec_cache.misses,
+            "invalidations": spec_cache.invalidations
+        },
         "environment": get_settings().environment
     }
 
 
+@app.get("/health/ticks")
+async def tick_profile(reset: bool = False):
+    """
+    tick処理のフェーズ別プロファイル
+
+    このワーカープロセスで集計したフェーズごとの所要時間ヒストグラム・
+    処理ユニット数・イベント数を返す。TICK_PROFILING=true で有効になる。
+
+    Args:
+        reset: 取得後に集計値を破棄するか
+    """
+    from app.engine.profiling import get_tick_profiler
+
+    profiler = get_tick_profiler()
+    snapshot = profiler.snapshot()
+    if reset:
+        profiler.reset()
+    return snapshot
+
+
 @app.get("/")
 async def root():
     """ルートエンドポイント"""
@@ -3,10 +3,10 @@ API入出力モデル
 
 各エンドポイントのリクエスト・レスポンスモデル
 """
-from typing import List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 from .game import Event, GameState
 from .unit import UnitSpec
@@ -47,6 +47,10 @@ class MatchStartRequest(BaseModel):
     """対戦開始リクエスト"""
     player_deck_id: UUID = Field(..., description="プレイヤーデッキID")
     ai_deck_id: Optional[UUID] = Field(None, description="AIデッキID（指定しない場合はランダム生成）")
+    engine_backend: Literal["python", "numpy", "fixed"] = Field(
+        "python",
+        description="tick処理の実装（python: 参照実装, numpy: 列指向実装, fixed: 固定小数点実装）"
+    )
 
     class Config:
         json_schema_extra = {
@@ -66,12 +70,34 @@ class MatchStartResponse(BaseModel):
 class MatchTickRequest(BaseModel):
     """tick実行リクエスト"""
     match_id: UUID = Field(..., description="マッチID")
+    ack_seq: Optional[int] = Field(
+        None,
+        ge=0,
+        description="最後に適用したレスポンスのseq（指定すると差分で応答する。0は状態未取得）"
+    )
+    resync: bool = Field(default=False, description="差分ではなく全状態を要求する")
 
 
 class MatchTickResponse(BaseModel):
-    """tick実行レスポンス"""
-    game_state: GameState = Field(..., description="更新後のゲーム状態")
+    """
+    tick実行レスポンス
+
+    ack_seqを指定しない場合は常にgame_stateを返す。
+    ack_seqを指定した場合はその時点からの差分をdeltaで返し、game_stateは省略する
+    （差分の形式はengine.delta参照）。ack_seqが古すぎる場合やresync=Trueの場合は
+    game_stateとunit_refsを返す（deltaはNone）。
+    """
+    game_state: Optional[GameState] = Field(
+        None, description="更新後のゲーム状態（差分応答では省略）"
+    )
     events: List[Event] = Field(default_factory=list, description="発生したイベント")
+    seq: int = Field(
+        default=0, description="このレスポンスの状態のシーケンス番号（次回のack_seqに使う）"
+    )
+    delta: Optional[Dict[str, Any]] = Field(None, description="ack_seqの状態からの差分")
+    unit_refs: Optional[Dict[str, int]] = Field(
+        None, description="instance_id -> ref（差分で使うユニット番号。全状態を返すときのみ）"
+    )
 
 
 class MatchSpawnRequest(BaseModel):
@@ -96,6 +122,64 @@ class MatchSpawnResponse(BaseModel):
     events: List[Event] = Field(default_factory=list, description="発生したイベント")
 
 
+class SimulateSpawnOrder(BaseModel):
+    """シミュレーション中の召喚予約"""
+    time_ms: int = Field(..., ge=0, description="召喚を試みるゲーム内時刻（ミリ秒）")
+    side: Literal["player", "ai"] = Field(..., description="召喚側")
+    unit_spec_id: UUID = Field(..., description="召喚するユニットのID")
+
+
+class MatchSimulateRequest(BaseModel):
+    """シミュレーション実行リクエスト"""
+    match_id: UUID = Field(..., description="マッチID")
+    ticks: Optional[int] = Field(
+        None, ge=1, description="実行するtick数（SIMULATE_MAX_TICKSで切り詰める）"
+    )
+    until_finished: bool = Field(False, description="勝敗が決まるまで実行するか")
+    spawns: List[SimulateSpawnOrder] = Field(default_factory=list, description="召喚予約")
+    include_events: bool = Field(False, description="圧縮イベントログを返すか")
+    commit: bool = Field(
+        True, description="結果をセッションに反映するか（Falseならコピー上で実行）"
+    )
+    time_skip: bool = Field(
+        True, description="移動のみの区間をまとめて進めるか（MOVEイベントは区間ごとに集約）"
+    )
+
+    @model_validator(mode="after")
+    def validate_stop_condition(self) -> "MatchSimulateRequest":
+        """ticksとuntil_finishedのどちらかは必須"""
+        if self.ticks is None and not self.until_finished:
+            raise ValueError("Either ticks or until_finished must be specified")
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "match_id": "550e8400-e29b-41d4-a716-446655440000",
+                "until_finished": True,
+                "spawns": [
+                    {
+                        "time_ms": 0,
+                        "side": "player",
+                        "unit_spec_id": "660e9511-f30c-52e5-b827-557766551111"
+                    }
+                ],
+                "include_events": True,
+                "commit": False
+            }
+        }
+
+
+class MatchSimulateResponse(BaseModel):
+    """シミュレーション実行レスポンス"""
+    game_state: GameState = Field(..., description="シミュレーション後のゲーム状態")
+    ticks_run: int = Field(..., description="実行したtick数")
+    spawned: int = Field(..., description="召喚されたユニット数")
+    event_count: int = Field(0, description="イベント数（include_events時のみ集計）")
+    event_log: Optional[str] = Field(None, description="圧縮イベントログ")
+    event_log_encoding: Optional[str] = Field(None, description="event_logのエンコード方式")
+
+
 class AIDecideRequest(BaseModel):
     """AI召喚決定リクエスト"""
     match_id: UUID = Field(..., description="マッチID")
@@ -5,12 +5,16 @@ GameState: 対戦の全状態（tick処理で更新）
 Event: tick処理中に発生したイベント（演出用）
 """
 from datetime import datetime
-from typing import Any, Dict, List, Literal, Optional
+from typing import Any, Dict, Literal, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
-from .unit import UnitInstance
+from .unit import FixedClock, SideUnits, UnitList, UnitRoster
+
+# GameState.estimate_sizeの見積もり（tracemallocでの実測をもとにした概算）
+GAME_STATE_BASE_BYTES = 2048  # ユニットなしのGameState
+UNIT_BYTES = 512  # RuntimeUnit 1体（ID・JSONキャッシュを含む）
 
 
 class Event(BaseModel):
@@ -74,6 +78,12 @@ class GameState(BaseModel):
     """
     match_id: UUID = Field(..., description="マッチID")
 
+    # tickエンジン
+    engine_backend: Literal["python", "numpy", "fixed"] = Field(
+        default="python",
+        description="tick処理の実装（python: 参照実装, numpy: 列指向実装, fixed: 固定小数点実装）"
+    )
+
     # 時間管理
     tick_ms: int = Field(default=200, description="1tickの時間（ミリ秒）")
     time_ms: int = Field(default=0, description="経過時間（ミリ秒）")
@@ -89,7 +99,7 @@ class GameState(BaseModel):
     cost_recovery_per_tick: float = Field(default=0.6, description="tick毎のコスト回復量")
 
     # ユニット状態
-    units: List[UnitInstance] = Field(default_factory=list, description="盤面上のユニット")
+    units: UnitList = Field(default_factory=UnitRoster, description="盤面上のユニット")
 
     # 勝敗
     winner: Optional[Literal["player", "ai"]] = Field(None, description="勝者（未決定の場合None）")
@@ -101,17 +111,43 @@ class GameState(BaseModel):
     # 作成日時
     created_at: datetime = Field(default_factory=datetime.utcnow, description="マッチ作成日時")
 
+    # 固定小数点モードの時計（engine.fixedが管理）
+    _fixed_clock: Optional[FixedClock] = PrivateAttr(default=None)
+
+    # 差分応答用の状態履歴（engine.deltaが管理）
+    _delta_history: Optional[Any] = PrivateAttr(default=None)
+
+    # 両デッキのユニットスペック（storage.rosterが管理）
+    _roster: Optional[Any] = PrivateAttr(default=None)
+
     def is_finished(self) -> bool:
         """対戦が終了しているか"""
         return self.winner is not None
 
-    def get_player_units(self) -> List[UnitInstance]:
-        """プレイヤー側のユニット一覧"""
-        return [u for u in self.units if u.side == "player"]
-
-    def get_ai_units(self) -> List[UnitInstance]:
-        """AI側のユニット一覧"""
-        return [u for u in self.units if u.side == "ai"]
+    def estimate_size(self) -> int:
+        """
+        メモリ上のおおよそのサイズ（バイト）
+
+        SessionManagerの容量管理に使う。ユニット数と差分応答の状態履歴から見積もる。
+        """
+        size = GAME_STATE_BASE_BYTES + UNIT_BYTES * len(self.units)
+        if self._delta_history is not None:
+            size += self._delta_history.estimate_size()
+        return size
+
+    def get_player_units(self) -> SideUnits:
+        """プレイヤー側のユニット一覧（召喚順のビュー）"""
+        return self.units.side("player")
+
+    def get_ai_units(self) -> SideUnits:
+        """AI側のユニット一覧（召喚順のビュー）"""
+        return self.units.side("ai")
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # unitsへのリスト代入も陣営別コンテナに変換する（要素はそのまま保持）
+        if name == "units" and not isinstance(value, UnitRoster):
+            value = UnitRoster(value)
+        super().__setattr__(name, value)
 
     class Config:
         json_schema_extra = {
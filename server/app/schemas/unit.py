@@ -2,13 +2,15 @@
 ユニットデータモデル
 
 UnitSpec: データベースに保存されるユニットの設計図
-UnitInstance: ゲーム内で実際に召喚されたユニットの状態
+UnitInstance: ゲーム内で実際に召喚されたユニットの状態（API入出力用）
+UnitStats / RuntimeUnit / FixedUnit: tick処理で使う軽量なユニット表現
 """
 from datetime import datetime
-from typing import Literal, Optional
+from typing import Annotated, Any, Dict, Iterable, Iterator, List, Literal, Optional, Union
 from uuid import UUID, uuid4
+from weakref import WeakValueDictionary
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, PlainSerializer, PlainValidator, field_validator
 
 
 class UnitSpec(BaseModel):
@@ -134,3 +136,458 @@ class UnitInstance(BaseModel):
                 "atk_interval": 2.0
             }
         }
+
+
+class UnitStats:
+    """
+    ユニットの静的ステータス（対戦中に変化しない部分）
+
+    同じ内容のステータスはintern()で1つのオブジェクトに共有されるので、
+    同じユニットを何体召喚してもステータスのコピーは1つだけになる。
+    生成後に属性を書き換えないこと。
+    """
+
+    __slots__ = (
+        "unit_spec_id", "name", "max_hp", "atk", "speed", "range",
+        "atk_interval", "battle_sprite_url", "__weakref__"
+    )
+
+    _interned: "WeakValueDictionary[tuple, UnitStats]" = WeakValueDictionary()
+
+    def __init__(
+        self,
+        unit_spec_id: UUID,
+        name: str,
+        max_hp: int,
+        atk: int,
+        speed: float,
+        range: float,
+        atk_interval: float,
+        battle_sprite_url: str
+    ):
+        self.unit_spec_id = unit_spec_id
+        self.name = name
+        self.max_hp = max_hp
+        self.atk = atk
+        self.speed = speed
+        self.range = range
+        self.atk_interval = atk_interval
+        self.battle_sprite_url = battle_sprite_url
+
+    @classmethod
+    def intern(cls, *fields: Any) -> "UnitStats":
+        """
+        同じ内容のステータスがあれば共有オブジェクトを返す
+
+        Args:
+            fields: __init__と同じ順序のステータス値
+        """
+        stats = cls._interned.get(fields)
+        if stats is None:
+            stats = cls(*fields)
+            cls._interned[fields] = stats
+        return stats
+
+    @classmethod
+    def from_spec(cls, spec: UnitSpec) -> "UnitStats":
+        """UnitSpecからステータスを取得"""
+        return cls.intern(
+            spec.id, spec.name, spec.max_hp, spec.atk, spec.speed,
+            spec.range, spec.atk_interval, spec.battle_sprite_url
+        )
+
+    def __copy__(self) -> "UnitStats":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "UnitStats":
+        # 不変なので複製せず共有する
+        return self
+
+    def __repr__(self) -> str:
+        return f"UnitStats({self.name!r}, spec={self.unit_spec_id})"
+
+
+class RuntimeUnit:
+    """
+    tick処理用のユニット
+
+    位置・HP・クールダウンなど対戦中に変化する状態だけを持ち、
+    静的ステータスは共有のUnitStatsを参照する。バリデーションを行わないので、
+    値の検証は生成元（UnitSpec / UnitInstance）で済ませておくこと。
+    レスポンスではto_instance()でUnitInstanceに変換される。
+    json_partsはapi.fastjsonが使うJSONの変化しない部分のキャッシュ。
+    """
+
+    __slots__ = ("instance_id", "side", "pos", "hp", "cooldown", "stats", "json_parts")
+
+    def __init__(
+        self,
+        stats: UnitStats,
+        side: Literal["player", "ai"],
+        pos: float,
+        hp: Optional[int] = None,
+        cooldown: float = 0.0,
+        instance_id: Optional[UUID] = None
+    ):
+        self.instance_id = instance_id if instance_id is not None else uuid4()
+        self.side = side
+        self.pos = pos
+        self.hp = stats.max_hp if hp is None else hp
+        self.cooldown = cooldown
+        self.stats = stats
+        self.json_parts = None
+
+    @property
+    def unit_spec_id(self) -> UUID:
+        return self.stats.unit_spec_id
+
+    @property
+    def name(self) -> str:
+        return self.stats.name
+
+    @property
+    def max_hp(self) -> int:
+        return self.stats.max_hp
+
+    @property
+    def atk(self) -> int:
+        return self.stats.atk
+
+    @property
+    def speed(self) -> float:
+        return self.stats.speed
+
+    @property
+    def range(self) -> float:
+        return self.stats.range
+
+    @property
+    def atk_interval(self) -> float:
+        return self.stats.atk_interval
+
+    @property
+    def battle_sprite_url(self) -> str:
+        return self.stats.battle_sprite_url
+
+    @classmethod
+    def from_spec(
+        cls,
+        spec: UnitSpec,
+        side: Literal["player", "ai"],
+        initial_pos: float
+    ) -> "RuntimeUnit":
+        """UnitSpecから初期化されたユニットを作成"""
+        return cls(UnitStats.from_spec(spec), side, max(0.0, min(20.0, initial_pos)))
+
+    @classmethod
+    def from_instance(cls, instance: UnitInstance) -> "RuntimeUnit":
+        """UnitInstance（検証済み）から作成"""
+        stats = UnitStats.intern(
+            instance.unit_spec_id, instance.name, instance.max_hp, instance.atk,
+            instance.speed, instance.range, instance.atk_interval, instance.battle_sprite_url
+        )
+        return cls(
+            stats,
+            instance.side,
+            instance.pos,
+            hp=instance.hp,
+            cooldown=instance.cooldown,
+            instance_id=instance.instance_id
+        )
+
+    def to_instance(self) -> UnitInstance:
+        """レスポンス用のUnitInstanceに変換"""
+        stats = self.stats
+        return UnitInstance.model_construct(
+            instance_id=self.instance_id,
+            unit_spec_id=stats.unit_spec_id,
+            side=self.side,
+            pos=self.pos,
+            hp=self.hp,
+            cooldown=self.cooldown,
+            name=stats.name,
+            max_hp=stats.max_hp,
+            atk=stats.atk,
+            speed=stats.speed,
+            range=stats.range,
+            atk_interval=stats.atk_interval,
+            battle_sprite_url=stats.battle_sprite_url
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"RuntimeUnit({self.name!r}, side={self.side}, pos={self.pos}, "
+            f"hp={self.hp}, cooldown={self.cooldown})"
+        )
+
+
+# 固定小数点モードの位置の倍率（1マス = 1000）
+POS_SCALE = 1000
+
+
+class FixedClock:
+    """
+    固定小数点モードのマッチ内時計
+
+    同じマッチのFixedUnitが共有し、クールダウン（次に攻撃できるtick）の
+    残り時間を秒に換算するのに使う。tickはtime_ms // tick_ms。
+    """
+
+    __slots__ = ("tick", "tick_ms")
+
+    def __init__(self, tick: int, tick_ms: int):
+        self.tick = tick
+        self.tick_ms = tick_ms
+
+
+class FixedUnit(RuntimeUnit):
+    """
+    固定小数点モード（engine_backend="fixed"）のユニット
+
+    位置はPOS_SCALE倍した整数（fpos）、クールダウンは次に攻撃できるtick番号
+    （ready_tick）で保持する。射程・1tickの移動量・攻撃間隔tick数も
+    変換時に整数化しておく。pos / cooldownは表示・API用に整数値から換算する。
+    """
+
+    __slots__ = ("fpos", "ready_tick", "reach", "step", "interval_ticks", "clock")
+
+    def __init__(
+        self,
+        stats: UnitStats,
+        side: Literal["player", "ai"],
+        fpos: int,
+        clock: FixedClock,
+        hp: Optional[int] = None,
+        ready_tick: int = 0,
+        instance_id: Optional[UUID] = None
+    ):
+        self.instance_id = instance_id if instance_id is not None else uuid4()
+        self.side = side
+        self.hp = stats.max_hp if hp is None else hp
+        self.stats = stats
+        self.fpos = fpos
+        self.ready_tick = ready_tick
+        self.clock = clock
+        self.reach = round(stats.range * POS_SCALE)
+        self.step = round(stats.speed * clock.tick_ms)
+        self.interval_ticks = -(-round(stats.atk_interval * 1000) // clock.tick_ms)
+        self.json_parts = None
+
+    @classmethod
+    def from_unit(cls, unit: Any, clock: FixedClock) -> "FixedUnit":
+        """RuntimeUnit / UnitInstanceを固定小数点表現に変換"""
+        if isinstance(unit, RuntimeUnit):
+            stats = unit.stats
+        else:
+            stats = RuntimeUnit.from_instance(unit).stats
+        cooldown_ms = round(unit.cooldown * 1000)
+        return cls(
+            stats,
+            unit.side,
+            round(unit.pos * POS_SCALE),
+            clock,
+            hp=unit.hp,
+            ready_tick=clock.tick + -(-cooldown_ms // clock.tick_ms),
+            instance_id=unit.instance_id
+        )
+
+    @property
+    def pos(self) -> float:
+        return self.fpos / POS_SCALE
+
+    @pos.setter
+    def pos(self, value: float) -> None:
+        self.fpos = round(value * POS_SCALE)
+
+    @property
+    def cooldown(self) -> float:
+        remaining = self.ready_tick - self.clock.tick
+        return remaining * self.clock.tick_ms / 1000 if remaining > 0 else 0.0
+
+    @cooldown.setter
+    def cooldown(self, value: float) -> None:
+        self.ready_tick = self.clock.tick + -(-round(value * 1000) // self.clock.tick_ms)
+
+    def __getstate__(self) -> tuple:
+        # pos / cooldownはプロパティなので、保持している値だけを明示的に複製する
+        return (
+            self.instance_id, self.side, self.hp, self.stats, self.fpos,
+            self.ready_tick, self.reach, self.step, self.interval_ticks, self.clock
+        )
+
+    def __setstate__(self, state: tuple) -> None:
+        (
+            self.instance_id, self.side, self.hp, self.stats, self.fpos,
+            self.ready_tick, self.reach, self.step, self.interval_ticks, self.clock
+        ) = state
+        self.json_parts = None
+
+    def __repr__(self) -> str:
+        return (
+            f"FixedUnit({self.name!r}, side={self.side}, fpos={self.fpos}, "
+            f"hp={self.hp}, ready_tick={self.ready_tick})"
+        )
+
+
+# 墓標がこの数以上かつ生存ユニット数を超えたら詰め直す
+ROSTER_COMPACT_MIN = 32
+
+
+class UnitRoster:
+    """
+    盤面上のユニットのコンテナ（GameState.units）
+
+    召喚順の全体リストと陣営ごとのリストを持ち、召喚・死亡・拠点到達のたびに
+    差分で更新する。削除は各リストの該当位置を墓標（None）にするだけのO(1)で、
+    墓標が溜まったらappend()かmaybe_compact()でまとめて詰める。
+    反復・len()は生存ユニットのみを召喚順で扱う。
+
+    反復中にdiscard()してもよい（詰め直しは行わないので位置がずれない）。
+    """
+
+    __slots__ = ("_all", "_sides", "_slots", "_counts", "_tombstones")
+
+    def __init__(self, units: Iterable[Any] = ()):
+        self._all: List[Any] = []
+        self._sides: Dict[str, List[Any]] = {"player": [], "ai": []}
+        self._counts: Dict[str, int] = {"player": 0, "ai": 0}
+        # instance_id -> (全体リストの位置, 陣営リストの位置)
+        self._slots: Dict[UUID, tuple[int, int]] = {}
+        self._tombstones = 0
+        for unit in units:
+            self._insert(unit)
+
+    def _insert(self, unit: Any) -> None:
+        side_units = self._sides[unit.side]
+        self._slots[unit.instance_id] = (len(self._all), len(side_units))
+        self._all.append(unit)
+        side_units.append(unit)
+        self._counts[unit.side] += 1
+
+    def append(self, unit: Any) -> None:
+        """ユニットを末尾（最新の召喚）に追加"""
+        self.maybe_compact()
+        self._insert(unit)
+
+    def extend(self, units: Iterable[Any]) -> None:
+        """複数のユニットを追加"""
+        for unit in units:
+            self.append(unit)
+
+    def discard(self, unit: Any) -> bool:
+        """
+        ユニットを除去（墓標に置き換える）
+
+        Returns:
+            除去したか（既に除去済みの場合False）
+        """
+        slot = self._slots.pop(unit.instance_id, None)
+        if slot is None:
+            return False
+        self._all[slot[0]] = None
+        self._sides[unit.side][slot[1]] = None
+        self._counts[unit.side] -= 1
+        self._tombstones += 1
+        return True
+
+    def replace(self, unit: Any, new_unit: Any) -> None:
+        """ユニットを同じ位置（召喚順）のまま別オブジェクトに置き換える"""
+        slot = self._slots.pop(unit.instance_id)
+        self._slots[new_unit.instance_id] = slot
+        self._all[slot[0]] = new_unit
+        self._sides[unit.side][slot[1]] = new_unit
+
+    def remove(self, unit: Any) -> None:
+        """ユニットを除去（存在しない場合はValueError）"""
+        if not self.discard(unit):
+            raise ValueError(f"Unit {unit.instance_id} is not on the board")
+
+    def maybe_compact(self) -> None:
+        """墓標が溜まっていれば詰め直す（反復中に呼ばないこと）"""
+        if self._tombstones >= ROSTER_COMPACT_MIN and self._tombstones > len(self._slots):
+            self.compact()
+
+    def compact(self) -> None:
+        """墓標を取り除いて詰め直す"""
+        live = list(self)
+        self.__init__(live)
+
+    def side(self, side: Literal["player", "ai"]) -> "SideUnits":
+        """陣営ごとのユニット（召喚順）"""
+        return SideUnits(self, side)
+
+    def __iter__(self) -> Iterator[Any]:
+        return filter(None, self._all)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, unit: Any) -> bool:
+        slot = self._slots.get(unit.instance_id)
+        return slot is not None and self._all[slot[0]] is unit
+
+    def __getitem__(self, index):
+        return list(self)[index]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (UnitRoster, SideUnits, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"UnitRoster({list(self)!r})"
+
+
+class SideUnits:
+    """UnitRosterの片側陣営のビュー（コピーせずに召喚順で反復する）"""
+
+    __slots__ = ("_roster", "_side")
+
+    def __init__(self, roster: UnitRoster, side: Literal["player", "ai"]):
+        self._roster = roster
+        self._side = side
+
+    def __iter__(self) -> Iterator[Any]:
+        return filter(None, self._roster._sides[self._side])
+
+    def __len__(self) -> int:
+        return self._roster._counts[self._side]
+
+    def __getitem__(self, index):
+        return list(self)[index]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (UnitRoster, SideUnits, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"SideUnits({self._side!r}, {list(self)!r})"
+
+
+def _to_runtime_units(value: Any) -> UnitRoster:
+    """GameState.unitsの入力をRuntimeUnitのUnitRosterに変換"""
+    if not isinstance(value, (list, tuple, UnitRoster)):
+        raise ValueError("units must be a list")
+    roster = UnitRoster()
+    for item in value:
+        if not isinstance(item, RuntimeUnit):
+            if not isinstance(item, UnitInstance):
+                item = UnitInstance.model_validate(item)
+            item = RuntimeUnit.from_instance(item)
+        roster.append(item)
+    return roster
+
+
+def _to_unit_instances(units: Iterable[Union[RuntimeUnit, UnitInstance]]) -> List[UnitInstance]:
+    """GameState.unitsをレスポンス用のUnitInstanceのリストに変換"""
+    return [u.to_instance() if isinstance(u, RuntimeUnit) else u for u in units]
+
+
+# GameState.unitsの型
+# 内部ではRuntimeUnitをUnitRosterで保持し、入出力はUnitInstanceのリストの形式で行う
+UnitList = Annotated[
+    Any,
+    PlainValidator(_to_runtime_units, json_schema_input_type=List[UnitInstance]),
+    PlainSerializer(_to_unit_instances, return_type=List[UnitInstance]),
+]
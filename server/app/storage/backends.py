@@ -0,0 +1,700 @@
+"""
+セッションの保存先
+
+SessionManagerがGameStateを保持する場所を差し替えられるようにする。
+
+- MemorySessionBackend: プロセス内の辞書（既定。1ワーカー向け）
+- SharedMemorySessionBackend: 同じホストのワーカープロセス間で共有するmmap領域
+- KeyValueSessionBackend: Redisなどのネットワーク上のキーバリューストア
+
+共有する保存先にはcodec.pack_stateのバイト列を書き込む。読み出した状態は
+書き込みごとに振るトークンと一緒にプロセス内にキャッシュし、他のワーカーが
+書き換えていなければデコードせずに同じオブジェクトを返す（差分応答の状態履歴も保たれる）。
+状態をインプレースで変更した場合は、put()で書き戻すまで他のワーカーには見えない。
+
+書き込みはトークンの比較つき（compare-and-set）で、最後に読んだ後に他のワーカーが
+書き換えていればSessionConflictErrorになる（読み直してやり直すのは呼び出し側）。
+"""
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+from app.schemas.game import GameState
+
+from .codec import pack_state, unpack_state
+
+
+class SessionCapacityError(Exception):
+    """セッションの上限に達していて新しいマッチを受け付けられない"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class SessionConflictError(Exception):
+    """最後に読んだ後に他のワーカーがマッチを書き換えたので、書き込みを取りやめた"""
+
+    def __init__(self, match_id: UUID):
+        super().__init__(f"Match {match_id} was modified by another worker")
+        self.match_id = match_id
+
+
+class SessionBackend(ABC):
+    """GameStateの保存先"""
+
+    # 他のプロセスと状態を共有するか（Trueならインプレースの変更はput()で書き戻す）
+    shared = False
+
+    @abstractmethod
+    def get(self, match_id: UUID) -> Optional[GameState]:
+        """状態を取得（存在しない場合はNone）"""
+
+    @abstractmethod
+    def put(self, match_id: UUID, state: GameState, create: bool = False) -> None:
+        """
+        状態を保存
+
+        共有する保存先では、このプロセスが最後に読んだ（書いた）版が最新の場合だけ書き込む
+        （読んでいないマッチとcreate=Trueの場合は存在しない場合だけ）。
+
+        Raises:
+            SessionCapacityError: 保存先に空きがない
+            SessionConflictError: 他のワーカーが先に書き換えていた（キャッシュは捨てられる）
+        """
+
+    @abstractmethod
+    def delete(self, match_id: UUID) -> None:
+        """状態を削除（存在しなくてもよい）"""
+
+    @abstractmethod
+    def contains(self, match_id: UUID) -> bool:
+        """状態が存在するか"""
+
+    @abstractmethod
+    def ids(self) -> List[UUID]:
+        """保存されている全マッチID"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """保存されているマッチ数"""
+
+    @abstractmethod
+    def size_of(self, match_id: UUID) -> int:
+        """マッチ1つの見積もりサイズ（バイト、存在しない場合は0）"""
+
+    @abstractmethod
+    def estimate_bytes(self) -> int:
+        """全マッチの見積もりサイズ（バイト）。マッチ数に比例する処理をしないこと"""
+
+    def refresh_sizes(self) -> None:
+        """
+        見積もりサイズを数え直す（SessionManagerの掃除のたびに呼ばれる）
+
+        put()の後にインプレースで変わった状態のサイズを反映するために使う。
+        """
+
+    def prune_cache(self) -> None:
+        """
+        保存先にないマッチの状態をプロセス内のキャッシュから捨てる
+
+        他のワーカーが削除したマッチのために使う（SessionManagerの掃除から呼ばれる）。
+        """
+
+    def items(self) -> Dict[UUID, GameState]:
+        """全マッチの状態（途中で削除されたマッチは含まない）"""
+        states = {}
+        for match_id in self.ids():
+            state = self.get(match_id)
+            if state is not None:
+                states[match_id] = state
+        return states
+
+    def written_at(self, match_id: UUID) -> Optional[float]:
+        """
+        最後に書き込まれた時刻（time.time()基準）
+
+        他のワーカーがアクセスしているマッチを期限切れとして消さないために使う。
+        プロセス内の保存先ではNone（SessionManagerの記録だけで判断する）。
+        """
+        return None
+
+    def stale_ids(self, written_before: float) -> List[UUID]:
+        """
+        written_beforeより前から書き込まれていないマッチ（time.time()基準）
+
+        どのワーカーもアクセスしていない（作成したワーカーが終了した）マッチを掃除するために使う。
+        プロセス内の保存先では空（SessionManagerの記録だけで判断する）。
+        """
+        return []
+
+    def close(self) -> None:
+        """保存先を閉じる"""
+
+
+class MemorySessionBackend(SessionBackend):
+    """
+    プロセス内の辞書に保持する保存先（状態はコピーせずそのまま保持する）
+
+    見積もりサイズはput()のたびに記録して合計を持っておき、estimate_bytes()で
+    全マッチをたどらない。put()の後のインプレースの変更（tickや状態履歴の増加）は
+    次のput()かrefresh_sizes()で反映される。
+    """
+
+    def __init__(self):
+        self._states: Dict[UUID, GameState] = {}
+        self._sizes: Dict[UUID, int] = {}
+        self._total_bytes = 0
+
+    def get(self, match_id: UUID) -> Optional[GameState]:
+        return self._states.get(match_id)
+
+    def put(self, match_id: UUID, state: GameState, create: bool = False) -> None:
+        size = state.estimate_size()
+        self._total_bytes += size - self._sizes.get(match_id, 0)
+        self._sizes[match_id] = size
+        self._states[match_id] = state
+
+    def delete(self, match_id: UUID) -> None:
+        self._states.pop(match_id, None)
+        self._total_bytes -= self._sizes.pop(match_id, 0)
+
+    def contains(self, match_id: UUID) -> bool:
+        return match_id in self._states
+
+    def ids(self) -> List[UUID]:
+        return list(self._states)
+
+    def count(self) -> int:
+        return len(self._states)
+
+    def size_of(self, match_id: UUID) -> int:
+        return self._sizes.get(match_id, 0)
+
+    def estimate_bytes(self) -> int:
+        return self._total_bytes
+
+    def refresh_sizes(self) -> None:
+        self._sizes = {match_id: state.estimate_size() for match_id, state in self._states.items()}
+        self._total_bytes = sum(self._sizes.values())
+
+    def items(self) -> Dict[UUID, GameState]:
+        return self._states.copy()
+
+
+# 共有する保存先のレコードの先頭（書き込みごとのトークン、書き込み時刻）
+_RECORD_HEADER = struct.Struct("<16sd")
+
+
+class _BlobSessionBackend(SessionBackend):
+    """
+    状態をバイト列で保存する共有の保存先の共通部分
+
+    レコードは [トークン16バイト][書き込み時刻][pack_stateのバイト列]。
+    サブクラスはレコードの読み書きだけを実装する。
+    """
+
+    shared = True
+
+    def __init__(self):
+        # match_id -> (トークン, 復元済みの状態)
+        # 保存先にないマッチはitems() / prune_cache()で捨てる
+        self._cache: Dict[UUID, Tuple[bytes, GameState]] = {}
+
+    @abstractmethod
+    def _read(self, match_id: UUID) -> Optional[bytes]:
+        """レコードを読み出す"""
+
+    @abstractmethod
+    def _write(self, match_id: UUID, record: bytes, expected: Optional[bytes]) -> bool:
+        """
+        保存されているレコードのトークンがexpectedの場合だけレコードを書き込む
+
+        Args:
+            match_id: マッチID
+            record: 書き込むレコード
+            expected: 期待するトークン（Noneならレコードが存在しないこと）
+
+        Returns:
+            書き込んだ場合True（トークンが違えばFalse）
+        """
+
+    @abstractmethod
+    def _remove(self, match_id: UUID) -> None:
+        """レコードを削除"""
+
+    def _read_many(self, match_ids: List[UUID]) -> Dict[UUID, bytes]:
+        """複数のレコードを読み出す（存在するものだけ）"""
+        records = {}
+        for match_id in match_ids:
+            record = self._read(match_id)
+            if record is not None:
+                records[match_id] = record
+        return records
+
+    def _decode(self, match_id: UUID, record: bytes) -> GameState:
+        """レコードの状態を返す（キャッシュと同じ版ならデコードしない）"""
+        token = record[:16]
+        cached = self._cache.get(match_id)
+        if cached is not None and cached[0] == token:
+            return cached[1]
+        state = unpack_state(record[_RECORD_HEADER.size:])
+        self._cache[match_id] = (token, state)
+        return state
+
+    def get(self, match_id: UUID) -> Optional[GameState]:
+        record = self._read(match_id)
+        if record is None:
+            self._cache.pop(match_id, None)
+            return None
+        return self._decode(match_id, record)
+
+    def items(self) -> Dict[UUID, GameState]:
+        records = self._read_many(self.ids())
+        states = {match_id: self._decode(match_id, record) for match_id, record in records.items()}
+        # 他のワーカーが削除したマッチはキャッシュに残さない
+        # （メモリが全ワーカーのマッチの累計で増えないように）
+        for match_id in self._cache.keys() - records.keys():
+            self._cache.pop(match_id, None)
+        return states
+
+    def prune_cache(self) -> None:
+        live = set(self.ids())
+        for match_id in self._cache.keys() - live:
+            self._cache.pop(match_id, None)
+
+    def payloads(self) -> List[bytes]:
+        """保存されている全マッチのpack_stateのバイト列（デコードしない）"""
+        return [record[_RECORD_HEADER.size:] for record in self._read_many(self.ids()).values()]
+
+    def put(self, match_id: UUID, state: GameState, create: bool = False) -> None:
+        cached = None if create else self._cache.get(match_id)
+        token = uuid4().bytes
+        record = _RECORD_HEADER.pack(token, time.time()) + pack_state(state)
+        if not self._write(match_id, record, cached[0] if cached is not None else None):
+            # 次のget()で最新の状態を読み直す
+            self._cache.pop(match_id, None)
+            raise SessionConflictError(match_id)
+        self._cache[match_id] = (token, state)
+
+    def delete(self, match_id: UUID) -> None:
+        self._cache.pop(match_id, None)
+        self._remove(match_id)
+
+    def written_at(self, match_id: UUID) -> Optional[float]:
+        record = self._read(match_id)
+        if record is None:
+            return None
+        return _RECORD_HEADER.unpack_from(record)[1]
+
+
+# 共有メモリのファイル先頭
+# （マジック、レイアウトのバージョン、スロット数、スロットサイズ、使用数、使用バイト数）
+_SHM_MAGIC = b"PSAS"
+_SHM_HEADER = struct.Struct("<4sIIIIQ")
+_SHM_HEADER_BYTES = 64
+# スロットの先頭（状態、match_id、レコード長）
+_SLOT_HEADER = struct.Struct("<B16sI")
+_SLOT_EMPTY, _SLOT_USED, _SLOT_DELETED = 0, 1, 2
+_SHM_LAYOUT_VERSION = 1
+
+
+def default_shared_memory_path() -> str:
+    """共有メモリのファイルの既定の場所（/dev/shmがあればそこ、なければ一時ディレクトリ）"""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "pixel-simu-arena-sessions")
+
+
+class SharedMemorySessionBackend(_BlobSessionBackend):
+    """
+    同じホストのワーカープロセス間で共有する保存先
+
+    1つのファイルをmmapした固定サイズのスロットのハッシュ表（match_idで開番地法）。
+    各スロットは slot_bytes バイトで、レコードがそれを超えるマッチは保存できない。
+    読み出しは共有ロック、書き込みは排他ロック（ファイルへのflock）で行う。
+    flockは同じファイルを開いたプロセス内のスレッド同士を区別しないので、スレッド間は
+    プロセス内のロックで排他する（スナップショットなどはスレッドから読む）。
+    最初に開いたワーカーがファイルを初期化し、後から開いたワーカーはそのレイアウトを使う。
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        slots: int = 2048,
+        slot_bytes: int = 64 * 1024
+    ):
+        """
+        Args:
+            path: 共有するファイルのパス（省略時はdefault_shared_memory_path()）
+            slots: スロット数（保存できるマッチ数の上限）
+            slot_bytes: スロット1つのバイト数（マッチ1つのレコードの上限）
+        """
+        super().__init__()
+        self.path = path or default_shared_memory_path()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, _SHM_HEADER_BYTES + slots * slot_bytes)
+                os.pwrite(self._fd, _SHM_HEADER.pack(
+                    _SHM_MAGIC, _SHM_LAYOUT_VERSION, slots, slot_bytes, 0, 0
+                ), 0)
+            magic, version, slots, slot_bytes, _, _ = _SHM_HEADER.unpack(
+                os.pread(self._fd, _SHM_HEADER.size, 0)
+            )
+            if magic != _SHM_MAGIC or version != _SHM_LAYOUT_VERSION:
+                raise ValueError(f"{self.path} is not a session store (layout {version})")
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self._map = mmap.mmap(self._fd, _SHM_HEADER_BYTES + slots * slot_bytes)
+        self._thread_lock = threading.Lock()
+
+    def _lock(self, exclusive: bool = False) -> "_FileLock":
+        return _FileLock(self._fd, exclusive, self._thread_lock)
+
+    def _slot_offset(self, index: int) -> int:
+        return _SHM_HEADER_BYTES + index * self.slot_bytes
+
+    def _probe(self, match_id: UUID) -> Iterator[int]:
+        start = match_id.int % self.slots
+        for i in range(self.slots):
+            yield (start + i) % self.slots
+
+    def _slot_state(self, index: int) -> int:
+        return self._map[self._slot_offset(index)]
+
+    def _find(self, match_id: UUID) -> Optional[int]:
+        """match_idのスロット番号（ロックを取ってから呼ぶ）"""
+        key = match_id.bytes
+        for index in self._probe(match_id):
+            state, slot_key, _ = _SLOT_HEADER.unpack_from(self._map, self._slot_offset(index))
+            if state == _SLOT_EMPTY:
+                return None
+            if state == _SLOT_USED and slot_key == key:
+                return index
+        return None
+
+    def _usage(self) -> Tuple[int, int]:
+        return _SHM_HEADER.unpack_from(self._map, 0)[4:]
+
+    def _set_usage(self, count: int, size: int) -> None:
+        struct.pack_into("<IQ", self._map, 16, count, size)
+
+    def _read(self, match_id: UUID) -> Optional[bytes]:
+        with self._lock():
+            index = self._find(match_id)
+            if index is None:
+                return None
+            offset = self._slot_offset(index)
+            length = _SLOT_HEADER.unpack_from(self._map, offset)[2]
+            start = offset + _SLOT_HEADER.size
+            return self._map[start:start + length]
+
+    def _write(self, match_id: UUID, record: bytes, expected: Optional[bytes]) -> bool:
+        if _SLOT_HEADER.size + len(record) > self.slot_bytes:
+            raise SessionCapacityError(
+                f"Match state ({len(record)} bytes) does not fit in a shared memory slot "
+                f"({self.slot_bytes} bytes)"
+            )
+        key = match_id.bytes
+        with self._lock(exclusive=True):
+            count, size = self._usage()
+            target = None
+            found = False
+            for index in self._probe(match_id):
+                state, slot_key, length = _SLOT_HEADER.unpack_from(
+                    self._map, self._slot_offset(index)
+                )
+                if state == _SLOT_USED and slot_key == key:
+                    start = self._slot_offset(index) + _SLOT_HEADER.size
+                    if self._map[start:start + 16] != expected:
+                        return False
+                    target = index
+                    found = True
+                    size -= length
+                    count -= 1
+                    break
+                if state != _SLOT_USED and target is None:
+                    target = index  # 削除済みのスロットは再利用するが、既存のキーを探し続ける
+                if state == _SLOT_EMPTY:
+                    break
+            if expected is not None and not found:
+                # 読んだ後に他のワーカーが削除した
+                return False
+            if target is None:
+                raise SessionCapacityError(f"Shared session store is full ({self.slots} matches)")
+            offset = self._slot_offset(target)
+            end = offset + _SLOT_HEADER.size + len(record)
+            self._map[offset + _SLOT_HEADER.size:end] = record
+            _SLOT_HEADER.pack_into(self._map, offset, _SLOT_USED, key, len(record))
+            self._set_usage(count + 1, size + len(record))
+            return True
+
+    def _remove(self, match_id: UUID) -> None:
+        with self._lock(exclusive=True):
+            index = self._find(match_id)
+            if index is None:
+                return
+            offset = self._slot_offset(index)
+            length = _SLOT_HEADER.unpack_from(self._map, offset)[2]
+            _SLOT_HEADER.pack_into(self._map, offset, _SLOT_DELETED, b"\0" * 16, 0)
+            # 次のスロットが空なら探索はここで止まるので、後ろから削除済みを空に戻す
+            while self._slot_state((index + 1) % self.slots) == _SLOT_EMPTY:
+                if self._slot_state(index) != _SLOT_DELETED:
+                    break
+                _SLOT_HEADER.pack_into(
+                    self._map, self._slot_offset(index), _SLOT_EMPTY, b"\0" * 16, 0
+                )
+                index = (index - 1) % self.slots
+            count, size = self._usage()
+            self._set_usage(count - 1, size - length)
+
+    def contains(self, match_id: UUID) -> bool:
+        with self._lock():
+            return self._find(match_id) is not None
+
+    def ids(self) -> List[UUID]:
+        result = []
+        with self._lock():
+            for index in range(self.slots):
+                state, key, _ = _SLOT_HEADER.unpack_from(self._map, self._slot_offset(index))
+                if state == _SLOT_USED:
+                    result.append(UUID(bytes=key))
+        return result
+
+    def stale_ids(self, written_before: float) -> List[UUID]:
+        result = []
+        with self._lock():
+            for index in range(self.slots):
+                offset = self._slot_offset(index)
+                state, key, _ = _SLOT_HEADER.unpack_from(self._map, offset)
+                if state != _SLOT_USED:
+                    continue
+                written_at = _RECORD_HEADER.unpack_from(self._map, offset + _SLOT_HEADER.size)[1]
+                if written_at < written_before:
+                    result.append(UUID(bytes=key))
+        return result
+
+    def count(self) -> int:
+        with self._lock():
+            return self._usage()[0]
+
+    def size_of(self, match_id: UUID) -> int:
+        with self._lock():
+            index = self._find(match_id)
+            if index is None:
+                return 0
+            return _SLOT_HEADER.unpack_from(self._map, self._slot_offset(index))[2]
+
+    def estimate_bytes(self) -> int:
+        with self._lock():
+            return self._usage()[1]
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+
+class _FileLock:
+    """flockによるプロセス間のロックとプロセス内のスレッド間のロック（withで使う）"""
+
+    __slots__ = ("_fd", "_operation", "_thread_lock")
+
+    def __init__(self, fd: int, exclusive: bool, thread_lock: threading.Lock):
+        self._fd = fd
+        self._operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        self._thread_lock = thread_lock
+
+    def __enter__(self) -> None:
+        self._thread_lock.acquire()
+        try:
+            fcntl.flock(self._fd, self._operation)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def __exit__(self, *exc: Any) -> None:
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+
+# 比較つきの書き込み
+# KEYS: レコード、サイズのハッシュ、書き込み時刻のソート済みセット、合計バイト数
+# ARGV: 期待するトークン（空なら存在しないこと）、レコード、有効期限の秒数（0なら無期限）、
+#       match_id、書き込み時刻
+# 存在しないキーのGETRANGEは空文字列になる。レコードと一緒に索引（マッチ数・合計サイズ・
+# 書き込み時刻）も更新するので、読み出し側はキーを走査しなくてよい
+CAS_WRITE_SCRIPT = """
+if redis.call('GETRANGE', KEYS[1], 0, 15) ~= ARGV[1] then
+    return 0
+end
+if tonumber(ARGV[3]) > 0 then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+else
+    redis.call('SET', KEYS[1], ARGV[2])
+end
+local size = string.len(ARGV[2])
+local previous = tonumber(redis.call('HGET', KEYS[2], ARGV[4]) or 0)
+redis.call('HSET', KEYS[2], ARGV[4], size)
+redis.call('INCRBY', KEYS[4], size - previous)
+redis.call('ZADD', KEYS[3], ARGV[5], ARGV[4])
+return 1
+"""
+
+# レコードと索引からの削除（KEYSはCAS_WRITE_SCRIPTと同じ、ARGV: match_id）。
+# 有効期限でレコードだけ消えていても索引から除く
+DELETE_SCRIPT = """
+redis.call('DEL', KEYS[1])
+local previous = redis.call('HGET', KEYS[2], ARGV[1])
+if previous then
+    redis.call('HDEL', KEYS[2], ARGV[1])
+    redis.call('DECRBY', KEYS[4], previous)
+end
+redis.call('ZREM', KEYS[3], ARGV[1])
+return 1
+"""
+
+
+class KeyValueSessionBackend(_BlobSessionBackend):
+    """
+    ネットワーク上のキーバリューストアに保存する保存先
+
+    clientはredis-py（同期版）の get / mget / exists / hget / hlen / hkeys / zrangebyscore /
+    register_script と同じインターフェースを持つオブジェクト。
+    ホストをまたいでワーカーを動かす場合に使う。
+    書き込みと削除はストア側のスクリプト（CAS_WRITE_SCRIPT / DELETE_SCRIPT）で行い、
+    同時にマッチごとのサイズ・合計バイト数・書き込み時刻の索引を更新する。
+    マッチ数と合計サイズは索引を1回読むだけで、キーを走査しない。
+    呼び出しは同期的に行うので、低レイテンシで到達できるストアを使うこと
+    （全マッチの読み出しはスケジューラがスレッドで行う）。
+
+    有効期限で消えたレコードは索引に残るが、書き込み時刻が古いのでSessionManagerの
+    掃除（stale_ids）で削除される。
+    """
+
+    # 全マッチの読み出しで1回に読むレコード数
+    read_batch_size = 256
+
+    def __init__(
+        self,
+        client: Any,
+        prefix: str = "pixel-simu-arena:session:",
+        ttl_seconds: Optional[float] = None
+    ):
+        """
+        Args:
+            client: ストアのクライアント
+            prefix: キーの接頭辞
+            ttl_seconds: 書き込みごとに設定する有効期限
+                （全ワーカーが止まってもストアから消えるように）
+        """
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        # 索引のキーはレコードのキー（prefix + match_id）と重ならないようにする
+        base = prefix.rstrip(":")
+        self._sizes_key = f"{base}-sizes"
+        self._written_key = f"{base}-written"
+        self._bytes_key = f"{base}-bytes"
+        self._cas_write = client.register_script(CAS_WRITE_SCRIPT)
+        self._delete = client.register_script(DELETE_SCRIPT)
+
+    def _key(self, match_id: UUID) -> str:
+        return f"{self.prefix}{match_id}"
+
+    def _script_keys(self, match_id: UUID) -> List[str]:
+        return [self._key(match_id), self._sizes_key, self._written_key, self._bytes_key]
+
+    def _read(self, match_id: UUID) -> Optional[bytes]:
+        return self.client.get(self._key(match_id))
+
+    def _write(self, match_id: UUID, record: bytes, expected: Optional[bytes]) -> bool:
+        ex = 0 if self.ttl_seconds is None else max(1, int(self.ttl_seconds))
+        written_at = _RECORD_HEADER.unpack_from(record)[1]
+        written = self._cas_write(
+            keys=self._script_keys(match_id),
+            args=[expected or b"", record, ex, str(match_id), repr(written_at)]
+        )
+        return bool(written)
+
+    def _remove(self, match_id: UUID) -> None:
+        self._delete(keys=self._script_keys(match_id), args=[str(match_id)])
+
+    def _read_many(self, match_ids: List[UUID]) -> Dict[UUID, bytes]:
+        records = {}
+        for start in range(0, len(match_ids), self.read_batch_size):
+            batch = match_ids[start:start + self.read_batch_size]
+            values = self.client.mget([self._key(match_id) for match_id in batch])
+            for match_id, record in zip(batch, values):
+                if record is not None:
+                    records[match_id] = record
+        return records
+
+    def contains(self, match_id: UUID) -> bool:
+        return bool(self.client.exists(self._key(match_id)))
+
+    def ids(self) -> List[UUID]:
+        return [UUID(_decode_member(member)) for member in self.client.hkeys(self._sizes_key)]
+
+    def count(self) -> int:
+        return int(self.client.hlen(self._sizes_key))
+
+    def size_of(self, match_id: UUID) -> int:
+        return int(self.client.hget(self._sizes_key, str(match_id)) or 0)
+
+    def estimate_bytes(self) -> int:
+        return int(self.client.get(self._bytes_key) or 0)
+
+    def stale_ids(self, written_before: float) -> List[UUID]:
+        members = self.client.zrangebyscore(self._written_key, "-inf", f"({written_before!r}")
+        return [UUID(_decode_member(member)) for member in members]
+
+
+def _decode_member(member: Any) -> str:
+    """ストアから返ったハッシュ・セットのメンバー（bytesまたはstr）を文字列にする"""
+    return member.decode() if isinstance(member, bytes) else member
+
+
+def create_session_backend(settings) -> SessionBackend:
+    """
+    設定（session_backend）に応じた保存先を作成
+
+    Args:
+        settings: アプリケーション設定
+
+    Returns:
+        memory: MemorySessionBackend, shared: SharedMemorySessionBackend,
+        redis: KeyValueSessionBackend（redisパッケージが必要）
+    """
+    kind = settings.session_backend
+    if kind == "memory":
+        return MemorySessionBackend()
+    if kind == "shared":
+        return SharedMemorySessionBackend(
+            path=settings.session_shm_path or None,
+            slots=settings.session_shm_slots,
+            slot_bytes=settings.session_shm_slot_bytes
+        )
+    if kind == "redis":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SESSION_BACKEND=redis requires the 'redis' package") from e
+        return KeyValueSessionBackend(
+            redis.Redis.from_url(settings.session_store_url),
+            # 掃除（SessionManager）より先に消えないよう余裕を持たせる
+            ttl_seconds=settings.session_timeout_seconds * 2
+        )
+    raise ValueError(f"Unknown session backend: {kind}")
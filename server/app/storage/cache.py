@@ -0,0 +1,256 @@
+"""
+ユニットスペック・デッキのキャッシュ
+
+storage.dbのget_unit_spec / get_units_by_ids / get_deckの結果をプロセス内のLRUキャッシュに持ち、
+同じユニット・デッキを読むたびにPostgreSQLへ問い合わせてUnitSpecを組み立て直さないようにする。
+ユニットは画像の更新と削除、デッキは更新と削除でしか変わらないので、その書き込みで無効化する。
+
+複数のワーカーで動かす場合は書き込んだワーカーが共有のバージョン番号を進め、
+他のワーカーは次の読み込みでバージョンの変化を見てキャッシュ全体を捨てる
+（書き込みはまれなので、どのキーが変わったかまでは伝えない）。
+バージョン番号の置き場所はセッションの保存先（session_backend）に合わせる。
+
+キャッシュから返すオブジェクトは共有されるので、呼び出し側で書き換えないこと。
+"""
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+_VERSION = struct.Struct("<Q")
+
+
+class CacheVersion:
+    """キャッシュのバージョン番号（プロセス内）"""
+
+    def __init__(self):
+        self._value = 0
+
+    def read(self) -> int:
+        """現在のバージョン"""
+        return self._value
+
+    def bump(self) -> int:
+        """バージョンを進め、新しいバージョンを返す"""
+        self._value += 1
+        return self._value
+
+    def close(self) -> None:
+        """リソースを解放"""
+
+
+class SharedCacheVersion(CacheVersion):
+    """
+    同じホストのワーカーで共有するバージョン番号
+
+    8バイトのファイルをmmapし、読み出しはメモリを読むだけ（システムコールなし）。
+    進めるときはファイルへのflockで排他する。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: 共有するファイルのパス（省略時はdefault_cache_version_path()）
+        """
+        super().__init__()
+        self.path = path or default_cache_version_path()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size < _VERSION.size:
+                os.ftruncate(self._fd, _VERSION.size)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, _VERSION.size)
+
+    def read(self) -> int:
+        return _VERSION.unpack_from(self._map, 0)[0]
+
+    def bump(self) -> int:
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            value = self.read() + 1
+            _VERSION.pack_into(self._map, 0, value)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return value
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+
+class KeyValueCacheVersion(CacheVersion):
+    """
+    ネットワーク上のキーバリューストアに置くバージョン番号
+
+    clientはredis-py（同期版）の get / incr を持つもの。読むたびに問い合わせないよう、
+    check_interval秒の間は前回読んだ値を使う（他のワーカーの書き込みはその分遅れて反映される）。
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        key: str = "pixel-simu-arena:cache-version",
+        check_interval: float = 1.0
+    ):
+        """
+        Args:
+            client: キーバリューストアのクライアント
+            key: バージョン番号のキー
+            check_interval: ストアを読み直す間隔（秒）
+        """
+        super().__init__()
+        self.client = client
+        self.key = key
+        self.check_interval = check_interval
+        self._checked_at = float("-inf")
+
+    def read(self) -> int:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._value = int(self.client.get(self.key) or 0)
+            self._checked_at = now
+        return self._value
+
+    def bump(self) -> int:
+        self._value = int(self.client.incr(self.key))
+        self._checked_at = time.monotonic()
+        return self._value
+
+
+def default_cache_version_path() -> str:
+    """共有のバージョン番号のファイルの既定の場所（/dev/shmがあればそこ、なければ一時ディレクトリ）"""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "pixel-simu-arena-cache-version")
+
+
+class ObjectCache:
+    """
+    件数上限つきのLRUキャッシュ
+
+    読み込みのたびにバージョン番号を確認し、他のワーカーが進めていれば全体を捨てる。
+    DBから読んでいる間に無効化された値を入れないよう、読み込み前にgenerationを控えておき、
+    put()に渡す（その間に無効化があれば入れない）。
+    """
+
+    def __init__(self, max_entries: int = 2048, version: Optional[CacheVersion] = None):
+        """
+        Args:
+            max_entries: 保持する件数の上限（0ならキャッシュしない）
+            version: バージョン番号（省略時はプロセス内）
+        """
+        self.max_entries = max_entries
+        self.version = version or CacheVersion()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._seen_version = self.version.read()
+        self.generation = 0  # 無効化のたびに進む（ワーカー内）
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0  # 他のワーカーの書き込みで全体を捨てた回数
+
+    def _check_version(self) -> None:
+        version = self.version.read()
+        if version != self._seen_version:
+            self._seen_version = version
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """値を取得（なければNone）"""
+        self._check_version()
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """複数の値を取得（あるものだけ）"""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def put(self, key: Hashable, value: Any, generation: int) -> None:
+        """
+        値を保存
+
+        Args:
+            key: キー
+            value: 値
+            generation: 読み込みを始める前のself.generation
+        """
+        if generation != self.generation or self.max_entries <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *keys: Hashable) -> None:
+        """書き込んだキーを捨て、他のワーカーにも知らせる"""
+        for key in keys:
+            self._entries.pop(key, None)
+        self.generation += 1
+        previous = self._seen_version
+        version = self.version.bump()
+        if version == previous + 1:
+            # 他のワーカーの書き込みがなければ自分のキャッシュは捨てなくてよい
+            self._seen_version = version
+
+    def clear(self) -> None:
+        """すべて捨てる（このワーカーのみ）"""
+        self._entries.clear()
+        self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def create_cache_version(settings) -> CacheVersion:
+    """
+    設定（session_backend）に応じたバージョン番号を作成
+
+    memory: プロセス内, shared: 同じホストの共有ファイル, redis: セッションと同じストア
+    """
+    kind = settings.session_backend
+    if kind == "shared":
+        return SharedCacheVersion(settings.spec_cache_version_path or None)
+    if kind == "redis":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SESSION_BACKEND=redis requires the 'redis' package") from e
+        return KeyValueCacheVersion(
+            redis.Redis.from_url(settings.session_store_url),
+            check_interval=settings.spec_cache_version_check_seconds
+        )
+    return CacheVersion()
+
+
+# グローバルシングルトン
+_spec_cache: Optional[ObjectCache] = None
+
+
+def get_spec_cache() -> ObjectCache:
+    """ユニットスペック・デッキのキャッシュのシングルトンインスタンスを取得"""
+    global _spec_cache
+    if _spec_cache is None:
+        from app.config import get_settings
+
+        settings = get_settings()
+        _spec_cache = ObjectCache(
+            max_entries=settings.spec_cache_size,
+            version=create_cache_version(settings)
+        )
+    return _spec_cache
@@ -0,0 +1,137 @@
+"""
+GameStateのコンパクトなバイナリ表現
+
+ワーカープロセス間で共有するセッション（storage.backends）に保存するための形式。
+MessagePackの配列で、キー名を持たない。ユニットの静的ステータスは
+マッチ内で1回だけ書き、各ユニットはその番号で参照する（同じユニットを何体召喚しても
+名前やスプライトURLは1回分）。
+
+差分応答の状態履歴（_delta_history）など、プロセス内のキャッシュは保存しない。
+固定小数点モードのユニットは位置・クールダウンを浮動小数に戻して保存するが、
+tick処理時にFixedUnitへ変換し直すと同じ整数値になる。
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import msgpack
+
+from app.schemas.game import GameState
+from app.schemas.unit import RuntimeUnit, UnitRoster, UnitStats
+
+# 形式のバージョン（配列の先頭）
+CODEC_VERSION = 1
+
+_SIDES = ("player", "ai")
+_SIDE_CODES = {"player": 0, "ai": 1}
+
+
+def _uuid_bytes(value: Optional[UUID]) -> Optional[bytes]:
+    return None if value is None else value.bytes
+
+
+def _uuid(value: Optional[bytes]) -> Optional[UUID]:
+    return None if value is None else UUID(bytes=value)
+
+
+def pack_state(game_state: GameState) -> bytes:
+    """
+    GameStateをバイト列にする
+
+    Args:
+        game_state: ゲーム状態
+
+    Returns:
+        MessagePackでエンコードしたバイト列
+    """
+    stats_table: List[List[Any]] = []
+    stats_index: Dict[int, int] = {}
+    units = []
+    for unit in game_state.units:
+        stats = unit.stats
+        index = stats_index.get(id(stats))
+        if index is None:
+            index = stats_index[id(stats)] = len(stats_table)
+            stats_table.append([
+                stats.unit_spec_id.bytes, stats.name, stats.max_hp, stats.atk,
+                stats.speed, stats.range, stats.atk_interval, stats.battle_sprite_url
+            ])
+        units.append([
+            unit.instance_id.bytes, _SIDE_CODES[unit.side], index,
+            unit.pos, unit.hp, unit.cooldown
+        ])
+
+    return msgpack.packb([
+        CODEC_VERSION,
+        game_state.match_id.bytes,
+        game_state.engine_backend,
+        game_state.tick_ms,
+        game_state.time_ms,
+        game_state.player_base_hp,
+        game_state.ai_base_hp,
+        game_state.player_cost,
+        game_state.ai_cost,
+        game_state.max_cost,
+        game_state.cost_recovery_per_tick,
+        game_state.winner,
+        _uuid_bytes(game_state.player_deck_id),
+        _uuid_bytes(game_state.ai_deck_id),
+        game_state.created_at.isoformat(),
+        stats_table,
+        units,
+    ], use_bin_type=True)
+
+
+def unpack_state(data: bytes) -> GameState:
+    """
+    pack_stateのバイト列からGameStateを復元
+
+    保存時に検証済みの値なので、pydanticの検証は行わない。
+
+    Args:
+        data: pack_stateの出力
+
+    Returns:
+        ゲーム状態
+
+    Raises:
+        ValueError: 形式のバージョンが異なる
+    """
+    fields = msgpack.unpackb(data, raw=False)
+    if fields[0] != CODEC_VERSION:
+        raise ValueError(f"Unsupported game state encoding: {fields[0]}")
+
+    (
+        _, match_id, engine_backend, tick_ms, time_ms, player_base_hp, ai_base_hp,
+        player_cost, ai_cost, max_cost, cost_recovery_per_tick, winner,
+        player_deck_id, ai_deck_id, created_at, stats_table, units
+    ) = fields
+
+    stats_list = [
+        UnitStats.intern(UUID(bytes=spec_id), *rest) for spec_id, *rest in stats_table
+    ]
+    roster = UnitRoster(
+        RuntimeUnit(
+            stats_list[index], _SIDES[side], pos,
+            hp=hp, cooldown=cooldown, instance_id=UUID(bytes=instance_id)
+        )
+        for instance_id, side, index, pos, hp, cooldown in units
+    )
+
+    return GameState.model_construct(
+        match_id=UUID(bytes=match_id),
+        engine_backend=engine_backend,
+        tick_ms=tick_ms,
+        time_ms=time_ms,
+        player_base_hp=player_base_hp,
+        ai_base_hp=ai_base_hp,
+        player_cost=player_cost,
+        ai_cost=ai_cost,
+        max_cost=max_cost,
+        cost_recovery_per_tick=cost_recovery_per_tick,
+        units=roster,
+        winner=winner,
+        player_deck_id=_uuid(player_deck_id),
+        ai_deck_id=_uuid(ai_deck_id),
+        created_at=datetime.fromisoformat(created_at),
+    )
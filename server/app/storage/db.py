@@ -3,6 +3,9 @@ PostgreSQLデータベース接続とテーブル操作
 
 asyncpgを使用した非同期データベース操作を提供する。
 コネクションプールで接続を管理し、効率的にクエリを実行する。
+
+ユニットとデッキの取得はプロセス内のキャッシュ（storage.cache）を通し、
+画像の更新・削除・デッキの更新で無効化する。
 """
 import json
 from typing import List, Optional
@@ -14,6 +17,8 @@ from app.config import get_settings
 from app.schemas.deck import Deck
 from app.schemas.unit import UnitSpec
 
+from .cache import get_spec_cache
+
 # グローバルコネクションプール
 _pool: Optional[asyncpg.Pool] = None
 
@@ -147,7 +152,13 @@ async def save_unit_spec(unit_spec: UnitSpec) -> None:
 
 
 async def get_unit_spec(unit_id: UUID) -> Optional[UnitSpec]:
-    """ユニットをIDで取得"""
+    """ユニットをIDで取得（キャッシュ優先）"""
+    cache = get_spec_cache()
+    cached = cache.get(("unit", unit_id))
+    if cached is not None:
+        return cached
+
+    generation = cache.generation
     pool = get_db_pool()
     async with pool.acquire() as conn:
         row = await conn.fetchrow(
@@ -156,7 +167,9 @@ async def get_unit_spec(unit_id: UUID) -> Optional[UnitSpec]:
         )
         if row is None:
             return None
-        return UnitSpec(**dict(row))
+        unit = UnitSpec(**dict(row))
+    cache.put(("unit", unit_id), unit, generation)
+    return unit
 
 
 async def list_unit_specs(limit: int = 20, offset: int = 0) -> List[UnitSpec]:
@@ -179,14 +192,29 @@ async def count_unit_specs() -> int:
 
 
 async def get_units_by_ids(unit_ids: List[UUID]) -> List[UnitSpec]:
-    """複数のユニットをIDで一括取得"""
-    pool = get_db_pool()
-    async with pool.acquire() as conn:
-        rows = await conn.fetch(
-            "SELECT * FROM units WHERE id = ANY($1::varchar[])",
-            [str(uid) for uid in unit_ids]
-        )
-        return [UnitSpec(**dict(row)) for row in rows]
+    """
+    複数のユニットをIDで一括取得（キャッシュにないものだけDBから読む）
+
+    存在するユニットだけをunit_idsの順で返す（重複は1つにまとめる）。
+    """
+    cache = get_spec_cache()
+    unit_ids = list(dict.fromkeys(unit_ids))
+    found = cache.get_many(("unit", uid) for uid in unit_ids)
+    units = {key[1]: unit for key, unit in found.items()}
+    missing = [uid for uid in unit_ids if uid not in units]
+    if missing:
+        generation = cache.generation
+        pool = get_db_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT * FROM units WHERE id = ANY($1::varchar[])",
+                [str(uid) for uid in missing]
+            )
+        for row in rows:
+            unit = UnitSpec(**dict(row))
+            units[unit.id] = unit
+            cache.put(("unit", unit.id), unit, generation)
+    return [units[uid] for uid in unit_ids if uid in units]
 
 
 async def update_unit_images(unit_id: UUID, sprite_url: str, battle_sprite_url: str, card_url: str) -> None:
@@ -204,6 +232,7 @@ async def update_unit_images(unit_id: UUID, sprite_url: str, battle_sprite_url:
             battle_sprite_url,
             card_url
         )
+        get_spec_cache().invalidate(("unit", unit_id))
         print(f"[DB] Updated images for unit {unit_id}: sprite={sprite_url}, battle_sprite={battle_sprite_url}, card={card_url}, result={result}")
 
 
@@ -223,6 +252,7 @@ async def delete_unit_spec(unit_id: UUID) -> bool:
             "DELETE FROM units WHERE id = $1",
             str(unit_id)
         )
+        get_spec_cache().invalidate(("unit", unit_id))
         # DELETEコマンドは "DELETE n" という形式を返す
         return result.split()[-1] != "0"
 
@@ -246,7 +276,13 @@ async def save_deck(deck: Deck) -> None:
 
 
 async def get_deck(deck_id: UUID) -> Optional[Deck]:
-    """デッキをIDで取得"""
+    """デッキをIDで取得（キャッシュ優先）"""
+    cache = get_spec_cache()
+    cached = cache.get(("deck", deck_id))
+    if cached is not None:
+        return cached
+
+    generation = cache.generation
     pool = get_db_pool()
     async with pool.acquire() as conn:
         row = await conn.fetchrow(
@@ -260,12 +296,14 @@ async def get_deck(deck_id: UUID) -> Optional[Deck]:
         unit_ids_json = row["unit_spec_ids"]
         unit_ids = [UUID(uid) for uid in json.loads(unit_ids_json)]
 
-        return Deck(
+        deck = Deck(
             id=UUID(row["id"]),
             name=row["name"],
             unit_spec_ids=unit_ids,
             created_at=row["created_at"]
         )
+    cache.put(("deck", deck_id), deck, generation)
+    return deck
 
 
 async def list_decks(limit: int = 20, offset: int = 0) -> List[Deck]:
@@ -303,6 +341,7 @@ async def update_deck(deck_id: UUID, name: str, unit_spec_ids: List[UUID]) -> No
             name,
             json.dumps([str(uid) for uid in unit_spec_ids])
         )
+        get_spec_cache().invalidate(("deck", deck_id))
 
 
 async def delete_deck(deck_id: UUID) -> bool:
@@ -321,6 +360,7 @@ async def delete_deck(deck_id: UUID) -> bool:
             "DELETE FROM decks WHERE id = $1",
             str(deck_id)
         )
+        get_spec_cache().invalidate(("deck", deck_id))
         # DELETEコマンドは "DELETE n" という形式を返す
         return result.split()[-1] != "0"
 
@@ -0,0 +1,91 @@
+"""
+マッチのユニットロスター
+
+対戦開始時に両デッキのユニットスペックを1回のクエリで読み込み、GameStateに持たせる。
+召喚とAI決定はこのロスターを引くので、対戦中の操作ごとにDBへ問い合わせない。
+
+ロスターはGameStateのプライベート属性で、保存先のバイナリ表現（storage.codec）や
+スナップショットには含まれない。他のワーカーが書き戻した状態や再起動後に復元した状態には
+ないので、最初に必要になったときにデッキから読み直して付け直す（ensure_roster）。
+"""
+from typing import Dict, List, Literal, Optional
+from uuid import UUID
+
+from app.schemas.deck import Deck
+from app.schemas.game import GameState
+from app.schemas.unit import UnitSpec
+
+Side = Literal["player", "ai"]
+
+
+class MatchRoster:
+    """両デッキのユニットスペック（デッキの並び順）"""
+
+    def __init__(self, player_units: List[UnitSpec], ai_units: List[UnitSpec]):
+        self.player_units = player_units
+        self.ai_units = ai_units
+        self._by_id: Dict[UUID, UnitSpec] = {
+            spec.id: spec for spec in (*player_units, *ai_units)
+        }
+
+    def get(self, unit_spec_id: UUID) -> Optional[UnitSpec]:
+        """ユニットスペックを取得（どちらのデッキにもない場合はNone）"""
+        return self._by_id.get(unit_spec_id)
+
+    def side(self, side: Side) -> List[UnitSpec]:
+        """片側のデッキのユニットスペック"""
+        return self.player_units if side == "player" else self.ai_units
+
+
+async def load_roster(player_deck: Deck, ai_deck: Deck) -> MatchRoster:
+    """
+    両デッキのユニットスペックをまとめて読み込む
+
+    DBから消えたユニットはロスターに含めない。
+    """
+    from app.storage.db import get_units_by_ids
+
+    unit_ids = list(dict.fromkeys([*player_deck.unit_spec_ids, *ai_deck.unit_spec_ids]))
+    specs = {spec.id: spec for spec in await get_units_by_ids(unit_ids)}
+    return MatchRoster(
+        player_units=[specs[uid] for uid in player_deck.unit_spec_ids if uid in specs],
+        ai_units=[specs[uid] for uid in ai_deck.unit_spec_ids if uid in specs]
+    )
+
+
+def attach_roster(game_state: GameState, roster: Optional[MatchRoster]) -> None:
+    """ロスターをマッチの状態に持たせる"""
+    game_state._roster = roster
+
+
+def get_roster(game_state: GameState) -> Optional[MatchRoster]:
+    """マッチのロスターを取得（読み込まれていなければNone）"""
+    return game_state._roster
+
+
+async def ensure_roster(game_state: GameState) -> Optional[MatchRoster]:
+    """
+    マッチのロスターを取得（なければデッキから読み込んで付け直す）
+
+    Returns:
+        ロスター（デッキが設定されていない、または見つからない場合はNone）
+    """
+    roster = game_state._roster
+    if roster is not None:
+        return roster
+    if not game_state.player_deck_id or not game_state.ai_deck_id:
+        return None
+
+    from app.storage.db import get_deck
+
+    player_deck = await get_deck(game_state.player_deck_id)
+    if game_state.ai_deck_id == game_state.player_deck_id:
+        ai_deck = player_deck
+    else:
+        ai_deck = await get_deck(game_state.ai_deck_id)
+    if not player_deck or not ai_deck:
+        return None
+
+    roster = await load_roster(player_deck, ai_deck)
+    attach_roster(game_state, roster)
+    return roster
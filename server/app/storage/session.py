@@ -1,33 +1,143 @@
 """
-インメモリセッション管理
+セッション管理
 
-対戦状態（GameState）をメモリ内で管理する。
+対戦状態（GameState）を保存先（storage.backends）で管理する。既定はプロセス内のメモリで、
+ワーカープロセス間で共有する場合は共有メモリかネットワーク上のストアを使う。
 サーバー再起動で失われるが、短期対戦なので許容範囲。
+
+マッチ数と見積もりメモリ量（GameState.estimate_size）に上限を設定でき、上限に達したときは
+しばらくアクセスのないマッチを古い順に追い出し、それでも空かなければ新しいマッチを拒否する。
+
+一定時間アクセスのないマッチはバックグラウンドタスク（start_expiry）が削除する。
+最終アクセス時刻は粗い時計（掃除のたびに進める）で記録し、アクセス順に並べておくので、
+アクセス時に時刻を取得する必要がなく、掃除は期限切れのマッチだけを見れば済む。
+共有する保存先では、作成したワーカーが終了したマッチはどのワーカーの記録にもないので、
+タイムアウトの間隔ごとに保存先の書き込み時刻から期限切れのマッチを探して削除する。
 """
+import asyncio
 import time
-from typing import Dict, Optional
+from collections import OrderedDict
+from typing import Dict, List, Optional
 from uuid import UUID
 
+from app.engine.events import EngineEvent
+from app.engine.tick import process_ticks
 from app.schemas.game import GameState
 
+from .backends import (
+    MemorySessionBackend,
+    SessionBackend,
+    SessionCapacityError,
+    SessionConflictError
+)
+
 
 class SessionManager:
     """GameStateを管理するシングルトンマネージャー"""
 
-    def __init__(self):
-        self._sessions: Dict[UUID, GameState] = {}
-        self._last_activity: Dict[UUID, float] = {}  # 最終更新時刻（Unixタイムスタンプ）
+    def __init__(
+        self,
+        max_matches: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        evict_idle_seconds: float = 10,
+        backend: Optional[SessionBackend] = None
+    ):
+        """
+        Args:
+            max_matches: 同時に保持するマッチ数の上限（Noneなら無制限）
+            max_bytes: 見積もりメモリ量の上限（Noneなら無制限）
+            evict_idle_seconds: 上限に達したときに追い出してよいマッチの最低アクセス間隔（秒）
+            backend: 状態の保存先（省略時はプロセス内のメモリ）
+        """
+        self.max_matches = max_matches
+        self.max_bytes = max_bytes
+        self.evict_idle_seconds = evict_idle_seconds
+        self.evicted = 0  # 上限のために追い出したマッチ数
+        self.rejected = 0  # 上限のために拒否したマッチ数
+        self.backend = backend if backend is not None else MemorySessionBackend()
+        # このプロセスでの最終アクセス時刻（time.monotonic()基準の粗い時計）。古い順に並ぶ
+        self._last_activity: "OrderedDict[UUID, float]" = OrderedDict()
+        self._clock = time.monotonic()  # 掃除のたびに進める
+        self._orphans_checked_at: Optional[float] = None  # 保存先を最後に探した時刻（_clock基準）
+        self._expiry_task: Optional[asyncio.Task] = None
+
+    def _touch(self, match_id: UUID) -> None:
+        """最終アクセス時刻を更新して末尾に移す（時計が進んでいなければ何もしない）"""
+        if self._last_activity.get(match_id) != self._clock:
+            self._last_activity[match_id] = self._clock
+            self._last_activity.move_to_end(match_id)
 
     def create_match(self, match_id: UUID, initial_state: GameState) -> None:
         """
         新しいマッチを作成
 
+        上限を超える場合は、evict_idle_seconds以上アクセスのないマッチを
+        アクセスの古い順（LRU）に追い出して空きを作る。
+
         Args:
             match_id: マッチID
             initial_state: 初期ゲーム状態
+
+        Raises:
+            SessionCapacityError: 追い出せるマッチがなく上限を超える（保存先に空きがない場合も）
+            SessionConflictError: 共有する保存先に同じマッチが既にある
         """
-        self._sessions[match_id] = initial_state
-        self._last_activity[match_id] = time.time()
+        self._make_room(initial_state.estimate_size())
+        try:
+            self.backend.put(match_id, initial_state, create=True)
+        except SessionCapacityError:
+            self.rejected += 1
+            raise
+        self._touch(match_id)
+
+    def _make_room(self, size: int) -> None:
+        """新しいマッチ（sizeバイト）のために上限まで空きを作る"""
+        if self.max_matches is None and self.max_bytes is None:
+            return
+
+        if self.max_bytes is not None and size > self.max_bytes:
+            self.rejected += 1
+            raise SessionCapacityError(
+                f"Match is larger than the session memory limit ({self.max_bytes} bytes)"
+            )
+
+        # アクセス間隔は掃除のたびに進む粗い時計で測る
+        count = self.backend.count()
+        total = self.estimate_bytes() if self.max_bytes is not None else 0
+        while (
+            (self.max_matches is not None and count >= self.max_matches)
+            or (self.max_bytes is not None and total + size > self.max_bytes)
+        ):
+            victim = next(iter(self._last_activity.items()), None)
+            if victim is None or self._clock - victim[1] < self.evict_idle_seconds:
+                self.rejected += 1
+                raise SessionCapacityError(
+                    f"Server is at capacity ({count} matches, {total} bytes)"
+                )
+            match_id = victim[0]
+            if not self.backend.contains(match_id):
+                # 他のワーカーが削除済み
+                del self._last_activity[match_id]
+                continue
+            if self._written_recently(match_id, self.evict_idle_seconds):
+                # 他のワーカーが使っているので追い出さない
+                continue
+            total -= self.backend.size_of(match_id)
+            count -= 1
+            print(f"[SessionManager] Evicting least recently used match: {match_id}")
+            self.delete_match(match_id)
+            self.evicted += 1
+
+    def estimate_bytes(self) -> int:
+        """
+        保持している全マッチの見積もりメモリ量
+
+        put()時点のGameState.estimate_sizeの合計で、インプレースの変更は掃除のたびに反映される。
+
+        Returns:
+            見積もりメモリ量（共有する保存先ではレコードの合計、バイト）
+        """
+        return self.backend.estimate_bytes()
 
     def get_match(self, match_id: UUID) -> Optional[GameState]:
         """
@@ -39,20 +149,38 @@ class SessionManager:
         Returns:
             ゲーム状態（存在しない場合はNone）
         """
-        if match_id in self._sessions:
-            self._last_activity[match_id] = time.time()  # アクセス時刻を更新
-        return self._sessions.get(match_id)
+        state = self.backend.get(match_id)
+        if state is not None:
+            self._touch(match_id)  # アクセス時刻を更新
+        return state
+
+    def has_match(self, match_id: UUID) -> bool:
+        """
+        マッチが存在するか（最終アクセス時刻は更新しない）
+
+        Args:
+            match_id: マッチID
+
+        Returns:
+            存在する場合True
+        """
+        return self.backend.contains(match_id)
 
     def update_match(self, match_id: UUID, state: GameState) -> None:
         """
         マッチ状態を更新
 
+        共有する保存先では、インプレースで変更した状態もここで書き戻すまで他のワーカーに見えない。
+
         Args:
             match_id: マッチID
             state: 新しいゲーム状態
+
+        Raises:
+            SessionConflictError: 読んだ後に他のワーカーが書き換えていた（読み直してやり直す）
         """
-        self._sessions[match_id] = state
-        self._last_activity[match_id] = time.time()
+        self.backend.put(match_id, state)
+        self._touch(match_id)
 
     def delete_match(self, match_id: UUID) -> None:
         """
@@ -61,10 +189,8 @@ class SessionManager:
         Args:
             match_id: マッチID
         """
-        if match_id in self._sessions:
-            del self._sessions[match_id]
-        if match_id in self._last_activity:
-            del self._last_activity[match_id]
+        self.backend.delete(match_id)
+        self._last_activity.pop(match_id, None)
 
     def list_matches(self) -> Dict[UUID, GameState]:
         """
@@ -73,7 +199,7 @@ class SessionManager:
         Returns:
             マッチID -> GameStateのマッピング
         """
-        return self._sessions.copy()
+        return self.backend.items()
 
     def count_matches(self) -> int:
         """
@@ -82,30 +208,171 @@ class SessionManager:
         Returns:
             マッチ数
         """
-        return len(self._sessions)
+        return self.backend.count()
+
+    def write_back(self, match_id: UUID, state: GameState) -> None:
+        """
+        tick処理でインプレースに進めた状態を保存先に書き戻す
+
+        最終アクセス時刻は更新しない。プロセス内の保存先では何もしない。
+
+        Args:
+            match_id: マッチID
+            state: ゲーム状態
+
+        Raises:
+            SessionConflictError: 読んだ後に他のワーカーが書き換えていた
+        """
+        if self.backend.shared:
+            self.backend.put(match_id, state)
 
-    def cleanup_inactive_matches(self, timeout_seconds: int = 30) -> int:
+    def _written_recently(self, match_id: UUID, seconds: float) -> bool:
         """
-        一定時間更新がないマッチを削除
+        他のワーカーがseconds秒以内に書き込んだか（書き込まれていればアクセス時刻を進める）
+
+        共有する保存先で、このプロセスからはアクセスがなくても他のワーカーが
+        使っているマッチを消さないために使う。
+        """
+        written_at = self.backend.written_at(match_id)
+        if written_at is None or time.time() - written_at >= seconds:
+            return False
+        self._last_activity[match_id] = self._clock
+        self._last_activity.move_to_end(match_id)
+        return True
+
+    def tick_all_matches(self) -> Dict[UUID, List[EngineEvent]]:
+        """
+        進行中の全マッチを1tick進める
+
+        全マッチを1つの列バッファで一括処理する。
+        終了済みのマッチは処理しない（セッションからの削除は呼び出し側で行う）。
+        共有する保存先で他のワーカーが先に書き換えていたマッチは、このtickを捨てて結果に含めない。
+
+        Returns:
+            マッチID -> 発生したイベントリスト
+        """
+        sessions = self.backend.items()
+        match_ids = [mid for mid, state in sessions.items() if not state.is_finished()]
+        results = process_ticks([sessions[mid] for mid in match_ids])
+        ticked = {}
+        for match_id, events in zip(match_ids, results):
+            try:
+                self.write_back(match_id, sessions[match_id])
+            except SessionConflictError:
+                continue
+            ticked[match_id] = events
+        return ticked
+
+    def cleanup_inactive_matches(
+        self,
+        timeout_seconds: float = 30,
+        now: Optional[float] = None
+    ) -> int:
+        """
+        一定時間アクセスがないマッチを削除
+
+        時計を進め、アクセスの古い順に期限切れのマッチだけを削除する
+        （期限切れでない最初のマッチで止まるので、コストは削除数に比例する）。
+        共有する保存先では、timeout_seconds秒ごとに保存先全体からどのワーカーも
+        書き込んでいないマッチを探して削除する（_remove_orphans）。
+        最後に保存先の見積もりサイズを数え直す（作成のたびに全マッチをたどらないため）。
+        共有する保存先では、他のワーカーがtimeout以内に書き込んだマッチは削除しない。
 
         Args:
             timeout_seconds: タイムアウト時間（秒）デフォルトは30秒
+            now: 現在時刻（time.monotonic()基準、省略時は現在時刻）
 
         Returns:
             削除されたマッチ数
         """
-        current_time = time.time()
-        expired_matches = []
+        self._clock = time.monotonic() if now is None else now
+        deadline = self._clock - timeout_seconds
+        last_activity = self._last_activity
+        cleaned = 0
 
-        for match_id, last_activity in self._last_activity.items():
-            if current_time - last_activity > timeout_seconds:
-                expired_matches.append(match_id)
-
-        for match_id in expired_matches:
+        while last_activity:
+            match_id, last = next(iter(last_activity.items()))
+            if last > deadline:
+                break
+            if self._written_recently(match_id, timeout_seconds):
+                continue
             print(f"[SessionManager] Cleaning up inactive match: {match_id}")
             self.delete_match(match_id)
+            cleaned += 1
 
-        return len(expired_matches)
+        if self.backend.shared and (
+            self._orphans_checked_at is None
+            or self._clock - self._orphans_checked_at >= timeout_seconds
+        ):
+            self._orphans_checked_at = self._clock
+            cleaned += self._remove_orphans(deadline, timeout_seconds)
+
+        # 上限の判定（_make_room）で使う見積もりサイズはここで数え直す
+        self.backend.refresh_sizes()
+        return cleaned
+
+    def _remove_orphans(self, deadline: float, timeout_seconds: float) -> int:
+        """
+        保存先でtimeout_seconds秒以上書き込まれていないマッチを削除する
+
+        このワーカーがdeadlineより後にアクセスしたマッチは残す。
+        最後に他のワーカーが削除したマッチの状態をキャッシュから捨てる。
+        """
+        cleaned = 0
+        for match_id in self.backend.stale_ids(time.time() - timeout_seconds):
+            last = self._last_activity.get(match_id)
+            if last is not None and last > deadline:
+                continue
+            print(f"[SessionManager] Cleaning up orphaned match: {match_id}")
+            self.delete_match(match_id)
+            cleaned += 1
+        self.backend.prune_cache()
+        return cleaned
+
+    @property
+    def expiry_running(self) -> bool:
+        """期限切れマッチの掃除タスクが動作中か"""
+        return self._expiry_task is not None and not self._expiry_task.done()
+
+    async def start_expiry(
+        self,
+        timeout_seconds: float = 30,
+        interval_seconds: float = 1.0
+    ) -> None:
+        """
+        期限切れマッチの掃除をバックグラウンドタスクとして起動
+
+        Args:
+            timeout_seconds: タイムアウト時間（秒）
+            interval_seconds: 掃除の間隔（秒）。最終アクセス時刻の精度もこの間隔になる
+        """
+        if self.expiry_running:
+            return
+
+        async def run() -> None:
+            while True:
+                await asyncio.sleep(interval_seconds)
+                try:
+                    cleaned = self.cleanup_inactive_matches(timeout_seconds)
+                except Exception as e:
+                    # 保存先の一時的なエラーで掃除を止めない
+                    print(f"[Cleanup] Failed to clean up inactive matches: {e}")
+                    continue
+                if cleaned > 0:
+                    print(f"[Cleanup] Removed {cleaned} inactive matches")
+
+        self._expiry_task = asyncio.create_task(run())
+
+    async def stop_expiry(self) -> None:
+        """掃除タスクを停止"""
+        if self._expiry_task is None:
+            return
+        self._expiry_task.cancel()
+        try:
+            await self._expiry_task
+        except asyncio.CancelledError:
+            pass
+        self._expiry_task = None
 
 
 # グローバルシングルトン
@@ -113,8 +380,18 @@ _session_manager: Optional[SessionManager] = None
 
 
 def get_session_manager() -> SessionManager:
-    """SessionManagerのシングルトンインスタンスを取得"""
+    """SessionManagerのシングルトンインスタンスを取得（上限は設定から。0は無制限）"""
     global _session_manager
     if _session_manager is None:
-        _session_manager = SessionManager()
+        from app.config import get_settings
+
+        from .backends import create_session_backend
+
+        settings = get_settings()
+        _session_manager = SessionManager(
+            max_matches=settings.max_matches or None,
+            max_bytes=settings.max_session_bytes or None,
+            evict_idle_seconds=settings.session_evict_idle_seconds,
+            backend=create_session_backend(settings)
+        )
     return _session_manager
@@ -0,0 +1,254 @@
+"""
+セッションのスナップショット
+
+進行中のマッチを定期的にローカルディスクへ書き出し、起動時に読み戻す。
+デプロイや再起動をまたいでも対戦が続けられるようにする。
+
+スナップショットは全マッチを1ファイルにまとめたもの（codec.pack_stateのバイト列の配列）。
+プロセス内の保存先では状態のエンコードをイベントループ上でbatch_size個ずつ行い
+（途中で状態が変わらないように）、共有する保存先では保存されているバイト列を
+エンコードし直さずにスレッドで読み出す。ファイルの書き込みとfsyncはスレッドで行う。一時ファイルに書いてから置き換えるので、
+書き込み中に落ちても前回のスナップショットが残る。
+
+差分応答の状態履歴は保存しないので、復元後の最初のtickでクライアントには全状態が返る。
+"""
+import asyncio
+import os
+import time
+from typing import List, Optional, Tuple
+
+import msgpack
+
+from app.schemas.game import GameState
+
+from .backends import SessionCapacityError, SessionConflictError
+from .codec import pack_state, unpack_state
+
+# ファイル形式のバージョン
+SNAPSHOT_VERSION = 1
+
+
+def write_snapshot(path: str, records: List[bytes], written_at: Optional[float] = None) -> None:
+    """
+    スナップショットをファイルに書き込む（ブロッキング。スレッドから呼ぶ）
+
+    Args:
+        path: 書き込み先
+        records: pack_stateのバイト列
+        written_at: 作成時刻（time.time()基準、省略時は現在時刻）
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = msgpack.packb(
+        [SNAPSHOT_VERSION, time.time() if written_at is None else written_at, records],
+        use_bin_type=True
+    )
+    tmp_path = f"{path}.{os.getpid()}.tmp"  # 複数のワーカーが同じパスに書いても混ざらない
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> Optional[Tuple[float, List[GameState]]]:
+    """
+    スナップショットを読み込む
+
+    Args:
+        path: スナップショットのファイル
+
+    Returns:
+        (作成時刻, マッチの状態のリスト)。ファイルがない場合はNone
+
+    Raises:
+        ValueError: 形式のバージョンが異なる
+    """
+    try:
+        with open(path, "rb") as f:
+            version, written_at, records = msgpack.unpackb(f.read(), raw=False)
+    except FileNotFoundError:
+        return None
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported session snapshot version: {version}")
+    return written_at, [unpack_state(record) for record in records]
+
+
+class SessionSnapshotter:
+    """
+    SessionManagerの進行中のマッチを定期的にスナップショットに書き出す
+
+    start()でinterval_secondsごとのバックグラウンドタスクを起動し、
+    stop()で停止して最後にもう一度書き出す。
+    """
+
+    def __init__(
+        self,
+        session_manager,
+        path: str,
+        interval_seconds: float = 5.0,
+        batch_size: int = 256
+    ):
+        """
+        Args:
+            session_manager: マッチを保持するSessionManager
+            path: スナップショットのファイル
+            interval_seconds: 書き出す間隔（秒）
+            batch_size: イベントループに制御を返すまでにエンコードするマッチ数
+        """
+        self.session_manager = session_manager
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self.batch_size = max(1, batch_size)
+        self.snapshots = 0  # 書き出した回数
+        self.last_matches = 0  # 前回書き出したマッチ数
+        self._task: Optional[asyncio.Task] = None
+        self._writing: Optional[asyncio.Future] = None  # 書き込み中のスレッド
+
+    @property
+    def running(self) -> bool:
+        """定期書き出しタスクが動作中か"""
+        return self._task is not None and not self._task.done()
+
+    async def collect(self) -> List[bytes]:
+        """
+        進行中のマッチをエンコード
+
+        プロセス内の保存先では終了済みのマッチは含まない。共有する保存先では
+        保存されているバイト列をそのまま返す（終了済みのマッチはrestore()で除く）。
+
+        Returns:
+            pack_stateのバイト列
+        """
+        backend = self.session_manager.backend
+        if backend.shared:
+            return await asyncio.to_thread(backend.payloads)
+
+        sessions = list(self.session_manager.list_matches().values())
+        records = []
+        for start in range(0, len(sessions), self.batch_size):
+            if start:
+                await asyncio.sleep(0)
+            records.extend(
+                pack_state(state) for state in sessions[start:start + self.batch_size]
+                if not state.is_finished()
+            )
+        return records
+
+    async def flush(self) -> int:
+        """
+        スナップショットを書き出す
+
+        Returns:
+            書き出したマッチ数
+        """
+        records = await self.collect()
+        if self._writing is not None:
+            await asyncio.gather(self._writing, return_exceptions=True)
+        # タスクがキャンセルされてもスレッドの書き込みは止まらないので、stop()で待てるようにする
+        self._writing = asyncio.ensure_future(
+            asyncio.to_thread(write_snapshot, self.path, records)
+        )
+        await asyncio.shield(self._writing)
+        self.snapshots += 1
+        self.last_matches = len(records)
+        return len(records)
+
+    def restore(self, max_age_seconds: Optional[float] = None) -> int:
+        """
+        スナップショットからマッチを読み戻す
+
+        既にセッションにあるマッチと終了済みのマッチは読み戻さない。
+        上限（SessionCapacityError）に達したら残りは捨てる。
+
+        Args:
+            max_age_seconds: これより古いスナップショットは読み戻さない
+                （クライアントが既にあきらめている）
+
+        Returns:
+            読み戻したマッチ数
+        """
+        snapshot = read_snapshot(self.path)
+        if snapshot is None:
+            return 0
+        written_at, states = snapshot
+        age = time.time() - written_at
+        if max_age_seconds is not None and age > max_age_seconds:
+            print(f"[Snapshot] Ignoring snapshot from {age:.0f}s ago")
+            return 0
+
+        restored = 0
+        for state in states:
+            if state.is_finished() or self.session_manager.has_match(state.match_id):
+                continue
+            try:
+                self.session_manager.create_match(state.match_id, state)
+            except SessionCapacityError as e:
+                print(f"[Snapshot] Stopped restoring: {e.reason}")
+                break
+            except SessionConflictError:
+                # 他のワーカーが先に作成（復元）した
+                continue
+            restored += 1
+        return restored
+
+    async def start(self) -> None:
+        """定期書き出しをバックグラウンドタスクとして起動"""
+        if self.running:
+            return
+
+        async def run() -> None:
+            while True:
+                await asyncio.sleep(self.interval_seconds)
+                try:
+                    await self.flush()
+                except Exception as e:
+                    # 1回の失敗で書き出しを止めない
+                    print(f"[Snapshot] Failed to write {self.path}: {e}")
+
+        self._task = asyncio.create_task(run())
+
+    async def stop(self, flush: bool = True) -> None:
+        """
+        定期書き出しを停止
+
+        Args:
+            flush: 停止後に最後のスナップショットを書き出すか
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writing is not None:
+            await asyncio.gather(self._writing, return_exceptions=True)
+            self._writing = None
+        if flush:
+            count = await self.flush()
+            print(f"[Snapshot] Wrote {count} matches to {self.path}")
+
+
+# グローバルシングルトン
+_snapshotter: Optional[SessionSnapshotter] = None
+
+
+def get_session_snapshotter() -> Optional[SessionSnapshotter]:
+    """SessionSnapshotterのシングルトンインスタンスを取得（session_snapshot_pathが空ならNone）"""
+    global _snapshotter
+    if _snapshotter is None:
+        from app.config import get_settings
+
+        from .session import get_session_manager
+
+        settings = get_settings()
+        if not settings.session_snapshot_path:
+            return None
+        _snapshotter = SessionSnapshotter(
+            get_session_manager(),
+            settings.session_snapshot_path,
+            interval_seconds=settings.session_snapshot_interval
+        )
+    return _snapshotter
@@ -0,0 +1,6 @@
+"""
+ゲームエンジンのベンチマーク
+
+実行方法（serverディレクトリで）:
+    python -m benchmarks.engine_bench --output results.json
+"""
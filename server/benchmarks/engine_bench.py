@@ -0,0 +1,398 @@
+"""
+エンジンのマイクロベンチマーク
+
+process_tick / find_nearest_enemy / try_attack / 1試合通しのシミュレーションを計測し、
+ticks/sec・tickレイテンシのp50/p99・tickあたりのメモリ確保量をJSONで出力する。
+保存済みのベースラインと比較して、最適化の効果や退行を確認できる。
+
+使い方（serverディレクトリで）:
+    python -m benchmarks.engine_bench --backend python --backend numpy --output out.json
+    python -m benchmarks.engine_bench --save-baseline benchmarks/results/baseline.json
+    python -m benchmarks.engine_bench --baseline benchmarks/results/baseline.json
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.engine.movement import LaneIndex, find_nearest_enemy, try_attack
+from app.engine.simulate import ScheduledSpawn, simulate
+from app.engine.tick import process_tick, process_ticks
+from app.schemas.game import GameState
+
+from .scenarios import SCENARIOS, Scenario, build_match, build_matches, get_scenario, make_spec
+
+DEFAULT_TICKS = 200
+# 盤面が減りすぎないよう、このtick数ごとに初期状態へ戻す（復元時間は計測外）
+RESET_EVERY = 25
+# メモリ確保量の計測tick数（tracemalloc有効時は遅いので少なめ）
+ALLOC_TICKS = 25
+# マイクロベンチマークの1サンプルあたりの呼び出し回数
+MICRO_BATCH = 100
+
+# 比較に使うスループット指標（大きいほど速い）
+THROUGHPUT_KEYS = ("ticks_per_sec", "ops_per_sec", "matches_per_sec")
+
+
+def _latency_stats(samples_ns: Sequence[int], per_sample: int = 1) -> Dict[str, float]:
+    """
+    サンプル（ナノ秒）からレイテンシ統計を計算
+
+    Args:
+        samples_ns: 計測値
+        per_sample: 1サンプルに含まれる操作回数
+
+    Returns:
+        p50 / p99 / 平均（マイクロ秒、1操作あたり）
+    """
+    ordered = sorted(samples_ns)
+    count = len(ordered)
+
+    def percentile(q: float) -> float:
+        return ordered[min(count - 1, int(q * count))] / per_sample / 1000
+
+    return {
+        "p50_us": round(percentile(0.50), 3),
+        "p99_us": round(percentile(0.99), 3),
+        "mean_us": round(sum(ordered) / count / per_sample / 1000, 3),
+    }
+
+
+def _fresh_states(template: List[GameState]) -> List[GameState]:
+    return [state.model_copy(deep=True) for state in template]
+
+
+def _tick_function(scenario: Scenario) -> Callable[[List[GameState]], Any]:
+    if scenario.matches == 1:
+        return lambda states: process_tick(states[0])
+    return process_ticks
+
+
+def _measure_allocations(
+    template: List[GameState],
+    step: Callable[[List[GameState]], Any],
+    ticks: int
+) -> Dict[str, float]:
+    """
+    tickあたりのメモリ確保量を計測
+
+    各tick中に確保された一時領域のピーク（tick開始時からの増分）と、
+    tick終了後も残った確保量をtracemallocで測る。
+    """
+    states = _fresh_states(template)
+    peaks: List[int] = []
+    retained: List[int] = []
+
+    tracemalloc.start()
+    try:
+        for i in range(ticks):
+            if i and i % RESET_EVERY == 0:
+                states = _fresh_states(template)
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            step(states)
+            after, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(after - before)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "alloc_peak_bytes_per_tick": round(sum(peaks) / len(peaks)),
+        "alloc_retained_bytes_per_tick": round(sum(retained) / len(retained)),
+    }
+
+
+def bench_tick(
+    scenario: Scenario,
+    engine_backend: str,
+    ticks: int = DEFAULT_TICKS,
+    measure_alloc: bool = True
+) -> Dict[str, Any]:
+    """
+    シナリオの盤面でtick処理を計測
+
+    複数マッチのシナリオはprocess_ticksで一括処理する。
+
+    Args:
+        scenario: シナリオ
+        engine_backend: tick処理の実装
+        ticks: 計測tick数
+        measure_alloc: メモリ確保量も計測するか
+
+    Returns:
+        計測結果
+    """
+    template = build_matches(scenario, engine_backend=engine_backend)
+    step = _tick_function(scenario)
+
+    # ウォームアップ
+    step(_fresh_states(template))
+
+    samples: List[int] = []
+    states = _fresh_states(template)
+    for i in range(ticks):
+        if i and i % RESET_EVERY == 0:
+            states = _fresh_states(template)
+        start = time.perf_counter_ns()
+        step(states)
+        samples.append(time.perf_counter_ns() - start)
+
+    result: Dict[str, Any] = {
+        "scenario": scenario.name,
+        "engine_backend": engine_backend,
+        "matches": scenario.matches,
+        "units_per_match": scenario.player_units + scenario.ai_units,
+        "ticks": ticks,
+        "ticks_per_sec": round(len(samples) / (sum(samples) / 1e9), 1),
+        **_latency_stats(samples),
+    }
+    if scenario.matches > 1:
+        result["match_ticks_per_sec"] = round(result["ticks_per_sec"] * scenario.matches, 1)
+    if measure_alloc:
+        result.update(_measure_allocations(template, step, min(ticks, ALLOC_TICKS)))
+    return result
+
+
+def _time_batches(call: Callable[[], Any], batches: int) -> List[int]:
+    samples = []
+    for _ in range(batches):
+        start = time.perf_counter_ns()
+        for _ in range(MICRO_BATCH):
+            call()
+        samples.append(time.perf_counter_ns() - start)
+    return samples
+
+
+def _micro_result(name: str, samples: List[int], **extra: Any) -> Dict[str, Any]:
+    total_ops = len(samples) * MICRO_BATCH
+    return {
+        "benchmark": name,
+        **extra,
+        "ops_per_sec": round(total_ops / (sum(samples) / 1e9), 1),
+        **_latency_stats(samples, per_sample=MICRO_BATCH),
+    }
+
+
+def bench_find_nearest_enemy(enemy_count: int = 100, batches: int = 200) -> List[Dict[str, Any]]:
+    """
+    最近接敵の選定を計測（リスト走査とLaneIndex）
+
+    LaneIndexは1tickに1回構築し、同じ側の全ユニットが引く使い方を想定して
+    構築コストを含めない参照1回あたりの時間と、構築1回の時間を別々に出す。
+    """
+    state = build_match(get_scenario("100v100"))
+    attackers = list(state.get_player_units())
+    enemies = list(state.get_ai_units())[:enemy_count]
+    index = LaneIndex(enemies)
+    queries = iter(attackers * (batches * MICRO_BATCH // len(attackers) + 1))
+    queries_indexed = iter(attackers * (batches * MICRO_BATCH // len(attackers) + 1))
+
+    return [
+        _micro_result(
+            "find_nearest_enemy/list",
+            _time_batches(lambda: find_nearest_enemy(next(queries), enemies), batches),
+            enemies=len(enemies)
+        ),
+        _micro_result(
+            "find_nearest_enemy/lane_index",
+            _time_batches(lambda: find_nearest_enemy(next(queries_indexed), index), batches),
+            enemies=len(enemies)
+        ),
+        _micro_result(
+            "lane_index/build",
+            _time_batches(lambda: LaneIndex(enemies), max(1, batches // 10)),
+            enemies=len(enemies)
+        ),
+    ]
+
+
+def bench_try_attack(batches: int = 200) -> Dict[str, Any]:
+    """攻撃処理（ATTACK / HITイベント生成とダメージ適用）を計測"""
+    state = build_match(get_scenario("10v10"))
+    attacker = next(iter(state.get_player_units()))
+    target = next(iter(state.get_ai_units()))
+
+    def attack() -> None:
+        # 毎回クールダウンとHPを戻して、攻撃が必ず成立するようにする
+        attacker.cooldown = 0.0
+        target.hp = target.max_hp
+        try_attack(attacker, target, 0)
+
+    return _micro_result("try_attack", _time_batches(attack, batches))
+
+
+def bench_full_match(
+    engine_backend: str,
+    matches: int = 20,
+    time_skip: bool = True
+) -> Dict[str, Any]:
+    """
+    召喚予約付きの1試合を勝敗が決まるまでシミュレーション
+
+    Args:
+        engine_backend: tick処理の実装
+        matches: 試合数（seedを変えて生成）
+        time_skip: アイドル区間のスキップを使うか
+
+    Returns:
+        計測結果
+    """
+    samples: List[int] = []
+    ticks_run = 0
+    for seed in range(matches):
+        rng = random.Random(seed)
+        specs = [make_spec(rng) for _ in range(5)]
+        schedule = [
+            ScheduledSpawn(
+                time_ms=rng.randint(0, 120) * 1000,
+                side=rng.choice(["player", "ai"]),
+                unit_spec=rng.choice(specs)
+            )
+            for _ in range(60)
+        ]
+        state = GameState(match_id=make_spec(rng).id, engine_backend=engine_backend)
+
+        start = time.perf_counter_ns()
+        result = simulate(state, until_finished=True, spawn_schedule=schedule, time_skip=time_skip)
+        samples.append(time.perf_counter_ns() - start)
+        ticks_run += result.ticks_run
+
+    total_sec = sum(samples) / 1e9
+    return {
+        "benchmark": "full_match",
+        "engine_backend": engine_backend,
+        "time_skip": time_skip,
+        "matches": matches,
+        "matches_per_sec": round(matches / total_sec, 2),
+        "ticks_per_sec": round(ticks_run / total_sec, 1),
+        **_latency_stats(samples),
+    }
+
+
+def run(
+    scenario_names: Optional[Sequence[str]] = None,
+    engine_backends: Sequence[str] = ("python",),
+    ticks: int = DEFAULT_TICKS,
+    measure_alloc: bool = True,
+    micro: bool = True,
+    full_matches: int = 20
+) -> Dict[str, Any]:
+    """
+    ベンチマークを実行して結果をまとめる
+
+    Returns:
+        {"meta": 実行環境, "results": {結果キー: 計測結果}}
+    """
+    scenarios = [get_scenario(name) for name in scenario_names] if scenario_names else SCENARIOS
+    results: Dict[str, Dict[str, Any]] = {}
+
+    for backend in engine_backends:
+        for scenario in scenarios:
+            results[f"tick/{scenario.name}/{backend}"] = bench_tick(
+                scenario, backend, ticks=ticks, measure_alloc=measure_alloc
+            )
+        for time_skip in (False, True):
+            key = f"full_match/{backend}/{'skip' if time_skip else 'step'}"
+            results[key] = bench_full_match(backend, matches=full_matches, time_skip=time_skip)
+
+    if micro:
+        for result in bench_find_nearest_enemy():
+            results[result["benchmark"]] = result
+        results["try_attack"] = bench_try_attack()
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "numpy": np.__version__,
+            "ticks": ticks,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    ベースラインとスループットを比較
+
+    Returns:
+        結果キー -> {metric, baseline, current, ratio}（ratio > 1なら高速化）
+    """
+    comparison: Dict[str, Dict[str, Any]] = {}
+    for key, result in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        for metric in THROUGHPUT_KEYS:
+            if metric in result and base.get(metric):
+                comparison[key] = {
+                    "metric": metric,
+                    "baseline": base[metric],
+                    "current": result[metric],
+                    "ratio": round(result[metric] / base[metric], 3),
+                }
+                break
+    return comparison
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="ゲームエンジンのベンチマーク")
+    parser.add_argument(
+        "--scenario", action="append", choices=[s.name for s in SCENARIOS],
+        help="実行するシナリオ（複数指定可、省略時は全シナリオ）"
+    )
+    parser.add_argument(
+        "--backend", action="append", choices=["python", "numpy", "fixed"],
+        help="tick処理の実装（複数指定可、省略時はpython）"
+    )
+    parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS, help="シナリオごとの計測tick数")
+    parser.add_argument("--no-alloc", action="store_true", help="メモリ確保量を計測しない")
+    parser.add_argument("--no-micro", action="store_true", help="マイクロベンチマークを省略")
+    parser.add_argument("--output", type=Path, help="結果JSONの出力先（省略時は標準出力）")
+    parser.add_argument("--baseline", type=Path, help="比較するベースラインJSON")
+    parser.add_argument("--save-baseline", type=Path, help="結果をベースラインとして保存")
+    args = parser.parse_args(argv)
+
+    report = run(
+        scenario_names=args.scenario,
+        engine_backends=args.backend or ["python"],
+        ticks=args.ticks,
+        measure_alloc=not args.no_alloc,
+        micro=not args.no_micro
+    )
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        report["comparison"] = compare(report, baseline)
+        for key, row in report["comparison"].items():
+            print(
+                f"[Bench] {key}: {row['metric']} {row['baseline']} -> {row['current']} "
+                f"(x{row['ratio']})",
+                file=sys.stderr
+            )
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(text + "\n")
+        print(f"[Bench] Baseline saved to {args.save_baseline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
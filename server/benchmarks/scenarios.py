@@ -0,0 +1,139 @@
+"""
+ベンチマーク用シナリオ生成
+
+UnitSpecをランダムに作り、UnitInstance.from_specで盤面を組み立てる。
+同じseedからは常に同じ盤面が生成される。
+"""
+import random
+from dataclasses import dataclass
+from typing import List, Literal
+from uuid import UUID
+
+from app.schemas.game import GameState
+from app.schemas.unit import UnitInstance, UnitSpec
+
+UnitKind = Literal["mixed", "ranged", "melee"]
+
+# 拠点HP（ベンチマーク中に勝敗が決まらないよう十分大きくする）
+BENCH_BASE_HP = 10**9
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """
+    ベンチマークシナリオ
+
+    matches個のマッチそれぞれに、プレイヤー側player_units体・AI側ai_units体を配置する。
+    """
+    name: str
+    description: str
+    player_units: int
+    ai_units: int
+    kind: UnitKind = "mixed"
+    matches: int = 1
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("empty", "ユニットなし（tickの固定費）", 0, 0),
+    Scenario("10v10", "10対10の混成", 10, 10),
+    Scenario("100v100", "100対100の混成", 100, 100),
+    Scenario("all_ranged", "100対100、全ユニット遠距離（射程5-7）", 100, 100, kind="ranged"),
+    Scenario("all_melee", "100対100、全ユニット近接（射程1）", 100, 100, kind="melee"),
+    Scenario("many_matches", "10対10のマッチ200個を一括で進める", 10, 10, matches=200),
+]
+
+
+def get_scenario(name: str) -> Scenario:
+    """名前からシナリオを取得"""
+    for scenario in SCENARIOS:
+        if scenario.name == name:
+            return scenario
+    raise KeyError(f"Unknown scenario: {name}")
+
+
+def make_spec(rng: random.Random, kind: UnitKind = "mixed") -> UnitSpec:
+    """
+    ランダムなUnitSpecを作成
+
+    Args:
+        rng: 乱数生成器
+        kind: mixed（射程1-7）/ ranged（射程5-7）/ melee（射程1）
+
+    Returns:
+        ユニットスペック
+    """
+    if kind == "ranged":
+        range_val = rng.uniform(5.0, 7.0)
+    elif kind == "melee":
+        range_val = 1.0
+    else:
+        range_val = rng.uniform(1.0, 7.0)
+
+    return UnitSpec(
+        id=UUID(int=rng.getrandbits(128)),
+        name="Bench Unit",
+        cost=rng.randint(1, 8),
+        max_hp=rng.randint(5, 30),
+        atk=rng.randint(1, 15),
+        speed=rng.uniform(0.2, 2.0),
+        range=range_val,
+        atk_interval=rng.uniform(1.0, 5.0),
+        sprite_url="/static/sprites/placeholder.png",
+        battle_sprite_url="/static/battle_sprites/placeholder.png",
+        card_url="/static/cards/placeholder.png"
+    )
+
+
+def build_match(
+    scenario: Scenario,
+    seed: int = 0,
+    engine_backend: str = "python"
+) -> GameState:
+    """
+    シナリオの盤面を1マッチ分作成
+
+    プレイヤー側は0-10、AI側は10-20にランダムに配置するので、
+    開始直後から移動と交戦の両方が発生する。
+
+    Args:
+        scenario: シナリオ
+        seed: 乱数シード
+        engine_backend: tick処理の実装
+
+    Returns:
+        ゲーム状態
+    """
+    rng = random.Random(seed)
+    # 実際のデッキと同様、少数のスペックを使い回す
+    specs = [make_spec(rng, scenario.kind) for _ in range(5)]
+
+    units: List[UnitInstance] = []
+    for side, low, high, count in (
+        ("player", 0.0, 10.0, scenario.player_units),
+        ("ai", 10.0, 20.0, scenario.ai_units),
+    ):
+        for _ in range(count):
+            unit = UnitInstance.from_spec(rng.choice(specs), side, rng.uniform(low, high))
+            unit.instance_id = UUID(int=rng.getrandbits(128))
+            units.append(unit)
+    rng.shuffle(units)
+
+    return GameState(
+        match_id=UUID(int=rng.getrandbits(128)),
+        engine_backend=engine_backend,
+        player_base_hp=BENCH_BASE_HP,
+        ai_base_hp=BENCH_BASE_HP,
+        units=units
+    )
+
+
+def build_matches(
+    scenario: Scenario,
+    seed: int = 0,
+    engine_backend: str = "python"
+) -> List[GameState]:
+    """シナリオの全マッチを作成"""
+    return [
+        build_match(scenario, seed=seed + i, engine_backend=engine_backend)
+        for i in range(scenario.matches)
+    ]
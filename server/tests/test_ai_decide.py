@@ -0,0 +1,95 @@
+"""
+AI召喚決定のテスト
+
+LLMの応答が ai_decision_timeout_seconds を超えたらフォールバックを返すこと、
+クライアントを呼び出しごとに作り直さず使い回し、シャットダウンで閉じることを確認する。
+"""
+import asyncio
+import os
+import time
+from uuid import uuid4
+
+# app.configは必須の環境変数がないと読み込めない
+for name in ("PIXELLAB_API_KEY", "MISTRAL_API_KEY"):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/test")
+
+from app.llm import ai_decide  # noqa: E402
+from app.schemas.game import GameState  # noqa: E402
+from app.schemas.unit import UnitSpec  # noqa: E402
+
+
+def create_test_spec(name, cost):
+    """テスト用ユニットスペックを作成"""
+    return UnitSpec(
+        name=name,
+        cost=cost,
+        max_hp=10,
+        atk=5,
+        speed=1.0,
+        range=2.0,
+        atk_interval=2.0,
+        sprite_url="/static/sprites/placeholder.png",
+        battle_sprite_url="/static/battle_sprites/placeholder.png",
+        card_url="/static/cards/placeholder.png"
+    )
+
+
+class SlowChat:
+    """応答が返らないchat（complete_asyncは呼ばれた回数だけ記録して待ち続ける）"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def complete_async(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(60)
+
+
+class FakeMistral:
+    """Mistralクライアントの代わり（chatと、閉じたかどうかだけ持つ）"""
+
+    def __init__(self):
+        self.chat = SlowChat()
+        self.closed = False
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.closed = True
+
+
+async def test_slow_llm_falls_back_within_budget(monkeypatch):
+    """応答が時間内に返らなければ、待ち続けずに最も高コストのユニットを召喚する"""
+    budget = 0.05
+    fake = FakeMistral()
+    monkeypatch.setattr(ai_decide.settings, "ai_decision_timeout_seconds", budget)
+    monkeypatch.setattr(ai_decide, "_client", fake)
+    cheap, expensive = create_test_spec("Cheap", 3), create_test_spec("Expensive", 5)
+    game_state = GameState(match_id=uuid4())
+
+    for _ in range(2):
+        started = time.perf_counter()
+        decision = await ai_decide.ai_decide_spawn(game_state, [cheap, expensive])
+        assert time.perf_counter() - started < budget + 0.5
+        assert decision["spawn_unit_spec_id"] == expensive.id
+        assert decision["reason"].startswith("Fallback")
+
+    # 2回とも同じクライアントで呼び出した
+    assert fake.chat.calls == 2
+    assert ai_decide._get_mistral_client() is fake
+
+
+async def test_close_resets_client(monkeypatch):
+    """閉じたクライアントは捨て、次の呼び出しで作り直す"""
+    fake = FakeMistral()
+    monkeypatch.setattr(ai_decide, "_client", fake)
+
+    await ai_decide.close_mistral_client()
+    assert fake.closed
+    assert ai_decide._client is None
+    await ai_decide.close_mistral_client()  # 2回目は何もしない
+
+    client = ai_decide._get_mistral_client()
+    assert client is not fake
+    assert ai_decide._get_mistral_client() is client
+    await ai_decide.close_mistral_client()
+    assert ai_decide._client is None
@@ -0,0 +1,32 @@
+"""
+ベンチマークスイートのスモークテスト
+
+計測値そのものではなく、シナリオ生成と結果JSONの形式を確認する。
+"""
+from benchmarks.engine_bench import compare, run
+from benchmarks.scenarios import build_match, get_scenario
+
+
+def test_scenarios_are_reproducible():
+    """同じseedからは同じ盤面が生成される"""
+    scenario = get_scenario("100v100")
+
+    first = build_match(scenario, seed=3)
+    second = build_match(scenario, seed=3)
+
+    assert len(first.get_player_units()) == 100
+    assert len(first.get_ai_units()) == 100
+    assert first.model_dump(exclude={"created_at"}) == second.model_dump(exclude={"created_at"})
+
+
+def test_run_reports_throughput_and_latency():
+    """結果にticks/sec・p50/p99・メモリ確保量が含まれ、ベースラインと比較できる"""
+    report = run(scenario_names=["10v10"], ticks=3, micro=False, full_matches=1)
+    result = report["results"]["tick/10v10/python"]
+
+    assert result["ticks_per_sec"] > 0
+    assert result["p50_us"] <= result["p99_us"]
+    assert "alloc_peak_bytes_per_tick" in result
+
+    comparison = compare(report, report)
+    assert comparison["tick/10v10/python"]["ratio"] == 1.0
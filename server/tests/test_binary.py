@@ -0,0 +1,89 @@
+"""
+MessagePackエンコードのテスト
+
+ID・陣営・イベント種別が整数に置き換わり、JSONと同じ内容を表すことを確認する。
+"""
+import json
+from uuid import UUID
+
+import msgpack
+
+from app.api.binary import (
+    SIDE_CODES,
+    UNIT_FIELDS,
+    encode_delta,
+    encode_event,
+    encode_game_state
+)
+from app.engine.delta import DeltaHistory
+from app.engine.events import PAYLOAD_FIELDS, EventType
+from app.engine.tick import process_tick
+from benchmarks.scenarios import build_match, get_scenario
+
+
+def test_game_state_encoding_matches_json():
+    """ユニット配列はJSONのユニットと同じ値を持ち、IDはマッチ内のrefになる"""
+    game_state = build_match(get_scenario("10v10"))
+    process_tick(game_state)
+    history = DeltaHistory()
+
+    decoded = msgpack.unpackb(
+        msgpack.packb(encode_game_state(game_state, history.refs), use_bin_type=True)
+    )
+    expected = game_state.model_dump(mode="json")
+
+    assert decoded["match_id"] == game_state.match_id.bytes
+    assert decoded["time_ms"] == expected["time_ms"]
+    refs = history.refs.table(game_state)
+    for encoded, unit in zip(decoded["units"], expected["units"]):
+        fields = dict(zip(UNIT_FIELDS, encoded))
+        assert fields["ref"] == refs[unit["instance_id"]]
+        assert fields["unit_spec_id"] == UUID(unit["unit_spec_id"]).bytes
+        assert fields["side"] == SIDE_CODES[unit["side"]]
+        for name in UNIT_FIELDS[3:]:
+            assert fields[name] == unit[name]
+
+
+def test_event_encoding_uses_small_integers():
+    """イベント種別・陣営・ユニットIDは整数で、それ以外はpayloadの値そのまま"""
+    game_state = build_match(get_scenario("10v10"))
+    history = DeltaHistory()
+    refs = history.refs.table(game_state)
+    events = []
+    for _ in range(30):
+        events.extend(process_tick(game_state))
+    assert {e.code for e in events} >= {EventType.MOVE, EventType.ATTACK, EventType.HIT}
+
+    for event in events:
+        encoded = msgpack.unpackb(msgpack.packb(encode_event(event, history.refs)))
+        assert encoded[:2] == [int(event.code), event.timestamp_ms]
+        for name, value, original in zip(PAYLOAD_FIELDS[event.code], encoded[2:], event.payload):
+            if name in ("instance_id", "attacker_id", "target_id"):
+                assert value == refs[str(original)]
+            elif name.endswith("side"):
+                assert value == SIDE_CODES[original]
+            elif name == "unit_spec_id":
+                assert value == original.bytes
+            else:
+                assert value == original
+
+
+def test_msgpack_is_smaller_than_json():
+    """100対100の盤面のtickレスポンスはJSONより小さい"""
+    game_state = build_match(get_scenario("100v100"))
+    history = DeltaHistory()
+    ack = history.record(game_state)
+    events = process_tick(game_state)
+
+    full_json = json.dumps({
+        "game_state": game_state.model_dump(mode="json"),
+        "events": [e.to_event().model_dump(mode="json") for e in events]
+    })
+    full_msgpack = msgpack.packb({
+        "game_state": encode_game_state(game_state, history.refs),
+        "events": [encode_event(e, history.refs) for e in events]
+    }, use_bin_type=True)
+    assert len(full_msgpack) * 2 < len(full_json)
+
+    delta = msgpack.packb(encode_delta(history.delta_since(ack, game_state)), use_bin_type=True)
+    assert len(delta) < len(full_msgpack) / 10
@@ -0,0 +1,115 @@
+"""
+列指向tick処理のテスト
+
+columnarバックエンドが参照実装と同じイベント・状態を生成することを確認する。
+"""
+import random
+from uuid import uuid4
+
+import numpy as np
+
+from app.engine.columnar import nearest_targets
+from app.engine.movement import find_nearest_enemy
+from app.engine.tick import process_tick, process_ticks
+from app.schemas.game import GameState
+from app.schemas.unit import UnitInstance
+from app.storage.session import SessionManager
+
+
+def create_random_unit(rng: random.Random, side: str) -> UnitInstance:
+    """ランダムなステータスのユニットを拠点位置に作成"""
+    return UnitInstance(
+        unit_spec_id=uuid4(),
+        side=side,
+        pos=0.0 if side == "player" else 20.0,
+        hp=rng.randint(5, 30),
+        name="Test Unit",
+        max_hp=30,
+        atk=rng.randint(1, 15),
+        speed=rng.choice([0.5, 1.0, round(rng.uniform(0.2, 2.0), 2)]),
+        range=rng.choice([1.0, 2.0, round(rng.uniform(1.0, 7.0), 2)]),
+        atk_interval=round(rng.uniform(1.0, 5.0), 2),
+        battle_sprite_url="/static/battle_sprites/placeholder.png"
+    )
+
+
+def test_nearest_targets_matches_find_nearest_enemy():
+    """ベクトル化した最近接敵選定がリスト走査と一致する"""
+    rng = random.Random(7)
+    for _ in range(100):
+        enemies = [create_random_unit(rng, "ai") for _ in range(rng.randint(1, 10))]
+        for enemy in enemies:
+            enemy.pos = rng.randint(0, 40) * 0.5
+        attackers = [create_random_unit(rng, "player") for _ in range(5)]
+        for attacker in attackers:
+            attacker.pos = rng.randint(0, 40) * 0.5
+
+        dist, order = nearest_targets(
+            np.array([a.pos for a in attackers]),
+            np.array([e.pos for e in enemies]),
+            np.arange(len(enemies))
+        )
+        for attacker, d, i in zip(attackers, dist.tolist(), order.tolist()):
+            expected = find_nearest_enemy(attacker, enemies)
+            actual = enemies[i] if d <= attacker.range else None
+            assert actual is expected
+
+
+def test_columnar_backend_matches_reference():
+    """numpyバックエンドの1試合分のイベントと状態が参照実装と一致する"""
+    rng = random.Random(2024)
+    reference = GameState(match_id=uuid4())
+    columnar = reference.model_copy(update={"engine_backend": "numpy"}, deep=True)
+
+    for _ in range(400):
+        for _ in range(rng.choice([0, 0, 0, 1, 2])):
+            unit = create_random_unit(rng, rng.choice(["player", "ai"]))
+            reference.units.append(unit)
+            columnar.units.append(unit.model_copy())
+
+        expected = process_tick(reference)
+        actual = process_tick(columnar)
+
+        assert actual == expected
+        assert columnar.model_dump(exclude={"engine_backend"}) == reference.model_dump(
+            exclude={"engine_backend"}
+        )
+        if reference.is_finished():
+            break
+
+
+def test_batched_ticks_match_individual_ticks():
+    """複数マッチの一括処理がマッチごとの処理と一致する"""
+    rng = random.Random(99)
+    singles = [GameState(match_id=uuid4(), tick_ms=rng.choice([100, 200])) for _ in range(12)]
+    batched = [state.model_copy(deep=True) for state in singles]
+
+    for _ in range(300):
+        for single, batch in zip(singles, batched):
+            if rng.random() < 0.3:
+                unit = create_random_unit(rng, rng.choice(["player", "ai"]))
+                single.units.append(unit)
+                batch.units.append(unit.model_copy())
+
+        expected = [process_tick(state) for state in singles]
+        actual = process_ticks(batched)
+
+        for exp_events, act_events in zip(expected, actual):
+            assert act_events == exp_events
+        for single, batch in zip(singles, batched):
+            assert batch.model_dump() == single.model_dump()
+
+
+def test_session_manager_ticks_all_active_matches():
+    """SessionManagerは進行中のマッチだけを一括で進める"""
+    manager = SessionManager()
+    running = GameState(match_id=uuid4())
+    finished = GameState(match_id=uuid4(), winner="player")
+    manager.create_match(running.match_id, running)
+    manager.create_match(finished.match_id, finished)
+
+    results = manager.tick_all_matches()
+
+    assert set(results) == {running.match_id}
+    assert running.time_ms == 200
+    assert finished.time_ms == 0
@@ -0,0 +1,117 @@
+"""
+マッチごとのコマンドキューのテスト
+
+同じマッチのコマンドはawaitを挟んでも割り込み合わずに積まれた順に実行され、
+別のマッチのコマンドは並行して進むことを確認する。
+"""
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from app.engine.commands import MatchCommandQueues
+from app.engine.tick import process_tick, spawn_unit_from_spec
+from app.schemas.game import GameState
+from app.schemas.unit import UnitSpec
+
+
+def create_test_spec():
+    """テスト用ユニットスペックを作成"""
+    return UnitSpec(
+        name="Test Spec",
+        cost=3,
+        max_hp=10,
+        atk=5,
+        speed=1.0,
+        range=2.0,
+        atk_interval=2.0,
+        sprite_url="/static/sprites/placeholder.png",
+        battle_sprite_url="/static/battle_sprites/placeholder.png",
+        card_url="/static/cards/placeholder.png"
+    )
+
+
+async def test_spawn_waits_for_tick_boundary():
+    """tickがDB書き込みを待っている間に届いた召喚は、そのtickが終わってから適用される"""
+    queues = MatchCommandQueues()
+    game_state = GameState(match_id=uuid4())
+    db_write = asyncio.Event()
+    log = []
+
+    async def tick():
+        process_tick(game_state)
+        log.append(("tick", game_state.time_ms, len(game_state.units)))
+        await db_write.wait()  # update_match_resultなど
+        log.append(("tick done", game_state.time_ms, len(game_state.units)))
+        return game_state.time_ms
+
+    async def spawn():
+        spawn_unit_from_spec(game_state, create_test_spec(), "player")
+        log.append(("spawn", game_state.time_ms, len(game_state.units)))
+        return len(game_state.units)
+
+    tick_task = asyncio.create_task(queues.run(game_state.match_id, tick))
+    await asyncio.sleep(0)
+    spawn_task = asyncio.create_task(queues.run(game_state.match_id, spawn))
+    await asyncio.sleep(0.01)
+    assert queues.pending(game_state.match_id) == 1
+    assert log == [("tick", 200, 0)]
+
+    db_write.set()
+    assert await tick_task == 200
+    assert await spawn_task == 1
+    assert log == [("tick", 200, 0), ("tick done", 200, 0), ("spawn", 200, 1)]
+
+    # キューが空になるとワーカーは終了する
+    await asyncio.sleep(0)
+    assert queues.active() == 0
+
+
+async def test_matches_run_concurrently():
+    """別のマッチのコマンドは互いを待たない"""
+    queues = MatchCommandQueues()
+    blocked = asyncio.Event()
+
+    async def wait_forever():
+        await blocked.wait()
+
+    async def answer():
+        return 42
+
+    blocked_task = asyncio.create_task(queues.run(uuid4(), wait_forever))
+    assert await asyncio.wait_for(queues.run(uuid4(), answer), timeout=1) == 42
+
+    blocked.set()
+    await blocked_task
+
+
+async def test_errors_and_cancellation():
+    """例外は呼び出し元に返り、実行前にキャンセルされたコマンドは実行されない"""
+    queues = MatchCommandQueues()
+    match_id = uuid4()
+    release = asyncio.Event()
+    ran = []
+
+    async def fail():
+        raise ValueError("invalid spawn")
+
+    async def hold():
+        await release.wait()
+        ran.append("hold")
+
+    async def record():
+        ran.append("record")
+
+    with pytest.raises(ValueError, match="invalid spawn"):
+        await queues.run(match_id, fail)
+
+    holder = asyncio.create_task(queues.run(match_id, hold))
+    await asyncio.sleep(0)
+    cancelled = asyncio.create_task(queues.run(match_id, record))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    release.set()
+    await holder
+    await asyncio.sleep(0)
+    assert ran == ["hold"]
+    assert queues.commands == 2
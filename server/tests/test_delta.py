@@ -0,0 +1,173 @@
+"""
+状態差分のテスト
+
+スナップショットに差分を順に適用すると、毎tickの全状態と一致することを確認する。
+"""
+import json
+from uuid import uuid4
+
+from app.engine.delta import (
+    DeltaHistory,
+    StateTracker,
+    apply_delta,
+    get_delta_history,
+    quantize_state
+)
+from app.engine.tick import process_tick, spawn_unit_from_spec
+from app.schemas.game import GameState
+from app.schemas.unit import UnitSpec
+from app.storage.backends import SharedMemorySessionBackend
+from app.storage.session import SessionManager
+
+
+def create_test_spec(speed=1.0, range_val=2.0, max_hp=10):
+    """テスト用ユニットスペックを作成"""
+    return UnitSpec(
+        name="Test Spec",
+        cost=3,
+        max_hp=max_hp,
+        atk=5,
+        speed=speed,
+        range=range_val,
+        atk_interval=2.0,
+        sprite_url="/static/sprites/placeholder.png",
+        battle_sprite_url="/static/battle_sprites/placeholder.png",
+        card_url="/static/cards/placeholder.png"
+    )
+
+
+def test_applied_deltas_reproduce_full_state():
+    """召喚・移動・攻撃・死亡・拠点到達を含む対戦で差分の適用結果が全状態と一致する"""
+    game_state = GameState(match_id=uuid4(), player_cost=20.0, ai_cost=20.0)
+    tracker = StateTracker()
+    snapshot = tracker.snapshot(game_state)
+    client_state, unit_refs = snapshot["game_state"], snapshot["unit_refs"]
+
+    specs = [
+        create_test_spec(speed=1.5),
+        create_test_spec(range_val=5.0),
+        create_test_spec(max_hp=30)
+    ]
+    for tick in range(400):
+        if tick % 25 == 0:
+            spawn_unit_from_spec(game_state, specs[tick % 3], "player")
+            spawn_unit_from_spec(game_state, specs[(tick + 1) % 3], "ai")
+        process_tick(game_state)
+        # 送信時と同じくJSONを経由させる
+        delta = json.loads(json.dumps(tracker.delta(game_state)))
+        apply_delta(client_state, unit_refs, delta)
+        assert client_state == quantize_state(game_state.model_dump(mode="json"))
+        if game_state.is_finished():
+            break
+
+
+def test_delta_contains_only_changes():
+    """変化していない項目とユニットは差分に含まれない"""
+    game_state = GameState(match_id=uuid4())
+    spawn_unit_from_spec(game_state, create_test_spec(speed=1.0), "player")
+    spawn_unit_from_spec(game_state, create_test_spec(speed=1.0), "ai")
+    tracker = StateTracker()
+
+    # 足止めされたユニット（敵が射程内で攻撃待ち）は位置とHPが変わらない
+    game_state.units[0].pos = 10.0
+    game_state.units[1].pos = 11.0
+    game_state.units[0].cooldown = 1.0
+    game_state.units[1].cooldown = 1.0
+    unit_refs = tracker.snapshot(game_state)["unit_refs"]
+    process_tick(game_state)
+    delta = tracker.delta(game_state)
+
+    assert delta["time_ms"] == 200
+    assert "player_base_hp" not in delta
+    assert delta["player_cost"] == game_state.player_cost
+    assert sorted(unit_refs.values()) == [0, 1]
+    assert delta["units"] == {
+        "added": [],
+        "pos": [],
+        "hp": [],
+        "cooldown": [[0, 800], [1, 800]],
+        "removed": []
+    }
+
+    # 何も変わらなければtime_msと空のunitsだけ
+    assert tracker.delta(game_state) == {
+        "time_ms": 200,
+        "units": {"added": [], "pos": [], "hp": [], "cooldown": [], "removed": []}
+    }
+
+
+def test_delta_history_uses_acked_state():
+    """ackした状態からの差分を作り、届かなかった応答があっても状態が一致する"""
+    game_state = GameState(match_id=uuid4())
+    spawn_unit_from_spec(game_state, create_test_spec(), "player")
+    history = DeltaHistory(size=4)
+
+    client_state = game_state.model_dump(mode="json")
+    unit_refs = history.refs.table(game_state)
+    ack = history.record(game_state)
+    for tick in range(3):
+        process_tick(game_state)
+        if tick == 1:
+            spawn_unit_from_spec(game_state, create_test_spec(), "ai")
+        # 途中の応答は届かなかったものとして捨てる
+        history.record(game_state)
+
+    delta = history.delta_since(ack, game_state)
+    apply_delta(client_state, unit_refs, json.loads(json.dumps(delta)))
+    assert client_state == quantize_state(game_state.model_dump(mode="json"))
+
+    # 履歴より古いseqや未来のseqは差分を作れない（スナップショットが必要）
+    for _ in range(4):
+        history.record(game_state)
+    assert history.delta_since(ack, game_state) is None
+    assert history.delta_since(history.seq + 1, game_state) is None
+    assert history.delta_since(history.seq, game_state)["units"]["pos"] == []
+
+
+def test_delta_is_much_smaller_than_full_state():
+    """100対100の盤面で1tick分の差分は全状態より1桁以上小さい"""
+    from benchmarks.scenarios import build_match, get_scenario
+
+    game_state = build_match(get_scenario("100v100"))
+    history = DeltaHistory()
+    process_tick(game_state)
+    ack = history.record(game_state)
+    process_tick(game_state)
+
+    full = len(game_state.model_dump_json())
+    delta = len(json.dumps(history.delta_since(ack, game_state), separators=(",", ":")))
+    assert delta * 10 < full
+
+
+def test_ack_from_another_worker_needs_snapshot(tmp_path):
+    """別のワーカーの履歴が振ったseqでは差分を作らず、スナップショットから続ける"""
+    path = str(tmp_path / "sessions")
+    worker_a = SessionManager(backend=SharedMemorySessionBackend(path, slots=8))
+    worker_b = SessionManager(backend=SharedMemorySessionBackend(path))
+    game_state = GameState(match_id=uuid4())
+    spawn_unit_from_spec(game_state, create_test_spec(), "player")
+    worker_a.create_match(game_state.match_id, game_state)
+
+    history_a = get_delta_history(worker_a.get_match(game_state.match_id))
+    ack = history_a.record(game_state)
+
+    # 次のリクエストは別のワーカーが処理する（同じ回数だけ記録していてもseqは一致しない）
+    remote = worker_b.get_match(game_state.match_id)
+    process_tick(remote)
+    worker_b.update_match(remote.match_id, remote)
+    history_b = get_delta_history(remote)
+    history_b.record(remote)
+    assert history_b.epoch != history_a.epoch
+    assert history_b.delta_since(ack, remote) is None
+    assert history_b.delta_since(0, remote) is None
+
+    # スナップショットとrefの対応表を受け取り直せば、以降はこのワーカーの差分を適用できる
+    client_state = remote.model_dump(mode="json")
+    unit_refs = history_b.refs.table(remote)
+    ack = history_b.record(remote)
+    spawn_unit_from_spec(remote, create_test_spec(), "ai")
+    process_tick(remote)
+    apply_delta(client_state, unit_refs, history_b.delta_since(ack, remote))
+    assert client_state == quantize_state(remote.model_dump(mode="json"))
+    worker_a.backend.close()
+    worker_b.backend.close()
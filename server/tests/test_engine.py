@@ -3,11 +3,13 @@
 
 movement, victory, tickの各モジュールが正しく動作することを確認する。
 """
+import random
 from uuid import uuid4
 
 import pytest
 
 from app.engine.movement import (
+    LaneIndex,
     calculate_distance,
     find_nearest_enemy,
     is_in_range,
@@ -18,7 +20,7 @@ from app.engine.movement import (
 from app.engine.tick import process_tick, spawn_unit_in_game
 from app.engine.victory import check_base_reached, determine_winner
 from app.schemas.game import GameState
-from app.schemas.unit import UnitInstance
+from app.schemas.unit import ROSTER_COMPACT_MIN, RuntimeUnit, UnitInstance, UnitRoster, UnitSpec
 
 
 def create_test_unit(side="player", pos=0.0, hp=10, atk=5, speed=1.0, range_val=2.0):
@@ -29,11 +31,13 @@ def create_test_unit(side="player", pos=0.0, hp=10, atk=5, speed=1.0, range_val=
         pos=pos,
         hp=hp,
         cooldown=0.0,
+        name="Test Unit",
         max_hp=hp,
         atk=atk,
         speed=speed,
         range=range_val,
-        atk_interval=2.0
+        atk_interval=2.0,
+        battle_sprite_url="/static/battle_sprites/placeholder.png"
     )
 
 
@@ -67,10 +71,38 @@ def test_find_nearest_enemy():
     assert nearest == enemy2
 
 
+def test_lane_index_matches_list_scan():
+    """LaneIndexはリスト走査と同じ敵を返す（同距離は先頭優先）"""
+    rng = random.Random(42)
+    for _ in range(200):
+        # 同位置・左右対称の同距離を多く発生させるため粗いグリッドに配置
+        enemies = [
+            create_test_unit(side="ai", pos=rng.randint(0, 40) * 0.5)
+            for _ in range(rng.randint(0, 12))
+        ]
+        index = LaneIndex(enemies)
+        for _ in range(10):
+            attacker = create_test_unit(
+                pos=rng.randint(0, 40) * 0.5,
+                range_val=rng.choice([1.0, 1.5, 2.0, 3.5, 7.0])
+            )
+            assert find_nearest_enemy(attacker, index) is find_nearest_enemy(attacker, enemies)
+
+
+def test_lane_index_tie_prefers_list_order():
+    """左右同距離の場合はリストで先の敵を選ぶ"""
+    attacker = create_test_unit(pos=5.0, range_val=3.0)
+    right = create_test_unit(side="ai", pos=7.0)
+    left = create_test_unit(side="ai", pos=3.0)
+
+    assert find_nearest_enemy(attacker, LaneIndex([right, left])) is right
+    assert find_nearest_enemy(attacker, LaneIndex([left, right])) is left
+
+
 def test_move_unit_player():
     """プレイヤーユニットの移動（右へ）"""
     unit = create_test_unit(side="player", pos=5.0, speed=1.0)
-    event = move_unit(unit, 0.2)  # 200msで0.2秒
+    event = move_unit(unit, [], 0.2)  # 200msで0.2秒
 
     assert unit.pos == 5.2
     assert event is not None
@@ -80,7 +112,7 @@ def test_move_unit_player():
 def test_move_unit_ai():
     """AIユニットの移動（左へ）"""
     unit = create_test_unit(side="ai", pos=15.0, speed=1.0)
-    event = move_unit(unit, 0.2)
+    event = move_unit(unit, [], 0.2)
 
     assert unit.pos == 14.8
     assert event is not None
@@ -89,11 +121,11 @@ def test_move_unit_ai():
 def test_move_unit_clamp():
     """位置クランプ（0-20の範囲）"""
     unit1 = create_test_unit(side="player", pos=19.9, speed=1.0)
-    move_unit(unit1, 0.2)
+    move_unit(unit1, [], 0.2)
     assert unit1.pos == 20.0  # 上限
 
     unit2 = create_test_unit(side="ai", pos=0.1, speed=1.0)
-    move_unit(unit2, 0.2)
+    move_unit(unit2, [], 0.2)
     assert unit2.pos == 0.0  # 下限
 
 
@@ -228,3 +260,112 @@ def test_spawn_unit_in_game():
     assert len(game_state.units) == 1
     assert event.type == "SPAWN"
     assert event.timestamp_ms == 1000
+
+
+def test_engine_event_converts_to_api_event():
+    """エンジンイベントはレスポンス時に従来と同じ形式のEventへ変換される"""
+    game_state = GameState(match_id=uuid4(), ai_base_hp=100)
+    unit = create_test_unit(side="player", pos=20.004)
+
+    _, events = check_base_reached(unit, game_state, 1000)
+    api_event = events[1].to_event()
+
+    assert api_event.type == "DEATH"
+    assert api_event.timestamp_ms == 1000
+    assert api_event.data == {
+        "instance_id": str(unit.instance_id),
+        "unit_spec_id": str(unit.unit_spec_id),
+        "side": "player",
+        "pos": 20.0,
+        "reason": "reached_base"
+    }
+    # 攻撃による死亡にはreasonが含まれない
+    target = create_test_unit(side="ai", hp=5)
+    death = try_attack(create_test_unit(), target, 1000)[2]
+    assert "reason" not in death.to_event().data
+
+
+def test_runtime_unit_shares_interned_stats():
+    """同じスペックから召喚したユニットはステータスを共有する"""
+    spec = UnitSpec(
+        name="Test Spec",
+        cost=3,
+        max_hp=10,
+        atk=5,
+        speed=1.0,
+        range=2.0,
+        atk_interval=2.0,
+        sprite_url="/static/sprites/placeholder.png",
+        battle_sprite_url="/static/battle_sprites/placeholder.png",
+        card_url="/static/cards/placeholder.png"
+    )
+
+    first = RuntimeUnit.from_spec(spec, "player", 0.0)
+    second = RuntimeUnit.from_spec(spec, "ai", 20.0)
+
+    assert first.stats is second.stats
+    assert first.instance_id != second.instance_id
+    assert (first.hp, first.atk, first.range) == (10, 5, 2.0)
+
+
+def test_game_state_units_roundtrip():
+    """GameState.unitsは内部ではRuntimeUnit、入出力はUnitInstanceの形式"""
+    instance = create_test_unit(side="ai", pos=12.5, hp=8)
+    game_state = GameState(match_id=uuid4(), units=[instance])
+
+    assert isinstance(game_state.units[0], RuntimeUnit)
+    assert game_state.model_dump()["units"] == [instance.model_dump()]
+
+    restored = GameState.model_validate_json(game_state.model_dump_json())
+    assert restored.model_dump() == game_state.model_dump()
+
+    copied = game_state.model_copy(deep=True)
+    copied.units[0].hp = 1
+    assert game_state.units[0].hp == 8
+    assert copied.units[0].stats is game_state.units[0].stats
+
+
+def test_unit_roster_keeps_spawn_order_per_side():
+    """除去しても召喚順が保たれ、陣営ごとのビューと一致する"""
+    units = [create_test_unit(side=side) for side in ["player", "ai"] * 50]
+    roster = UnitRoster(units)
+
+    for unit in units[::3]:
+        roster.discard(unit)
+    # 二重除去は無視される
+    assert roster.discard(units[0]) is False
+
+    alive = [u for i, u in enumerate(units) if i % 3 != 0]
+    assert list(roster) == alive
+    assert len(roster) == len(alive)
+    assert list(roster.side("player")) == [u for u in alive if u.side == "player"]
+    assert len(roster.side("ai")) == len([u for u in alive if u.side == "ai"])
+    assert units[0] not in roster and units[1] in roster
+
+
+def test_unit_roster_compacts_tombstones():
+    """墓標が溜まると追加時に詰め直される"""
+    units = [create_test_unit() for _ in range(ROSTER_COMPACT_MIN * 2)]
+    roster = UnitRoster(units)
+    for unit in units[:-1]:
+        roster.discard(unit)
+
+    newcomer = create_test_unit(side="ai")
+    roster.append(newcomer)
+
+    assert roster._tombstones == 0
+    assert list(roster) == [units[-1], newcomer]
+    assert list(roster.side("ai")) == [newcomer]
+
+
+def test_game_state_units_assignment_uses_roster():
+    """unitsへのリスト代入は要素をそのまま保持したUnitRosterになる"""
+    game_state = GameState(match_id=uuid4())
+    unit = create_test_unit(side="ai")
+
+    game_state.units = [unit]
+
+    assert isinstance(game_state.units, UnitRoster)
+    assert game_state.units[0] is unit
+    assert list(game_state.get_ai_units()) == [unit]
+    assert len(game_state.get_player_units()) == 0
@@ -0,0 +1,101 @@
+"""
+JSON高速パスのテスト
+
+api.fastjsonが組み立てたJSONが、response_modelのmodel_dump_json()とバイト単位で一致することを確認する。
+"""
+import copy
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+
+from app.api import fastjson
+from app.engine.delta import DeltaHistory
+from app.engine.events import to_api_events
+from app.engine.tick import process_tick, spawn_unit_from_spec
+from app.schemas.api import MatchSpawnResponse, MatchStartResponse, MatchTickResponse
+from app.schemas.game import GameState
+from app.schemas.unit import UnitSpec
+from benchmarks.scenarios import build_match, get_scenario
+
+
+def create_test_spec(name="Test Spec", speed=1.0, range_val=2.0):
+    """テスト用ユニットスペックを作成"""
+    return UnitSpec(
+        name=name,
+        cost=3,
+        max_hp=10,
+        atk=5,
+        speed=speed,
+        range=range_val,
+        atk_interval=2.0,
+        sprite_url="/static/sprites/placeholder.png",
+        battle_sprite_url="/static/battle_sprites/placeholder.png",
+        card_url="/static/cards/placeholder.png"
+    )
+
+
+@pytest.mark.parametrize("engine_backend", ["python", "numpy", "fixed"])
+def test_tick_response_matches_model_json(engine_backend):
+    """移動・攻撃・死亡・勝敗を通してtickレスポンスがmodel_dump_json()と一致する"""
+    game_state = build_match(get_scenario("10v10"), engine_backend=engine_backend)
+    game_state.ai_base_hp = 5
+
+    for _ in range(600):
+        events = process_tick(game_state)
+        expected = MatchTickResponse(
+            game_state=game_state, events=to_api_events(events), seq=7
+        ).model_dump_json().encode()
+        assert fastjson.encode_tick_response(game_state, events, 7) == expected
+        if game_state.is_finished():
+            break
+    assert game_state.is_finished()
+
+
+def test_delta_and_resync_responses_match_model_json():
+    """差分応答とunit_refsつきの全状態応答も一致する"""
+    game_state = build_match(get_scenario("10v10"))
+    history = DeltaHistory()
+    unit_refs = history.refs.table(game_state)
+    ack = history.record(game_state)
+
+    resync = fastjson.encode_tick_response(game_state, [], 3, unit_refs=unit_refs)
+    assert resync == MatchTickResponse(
+        game_state=game_state, seq=3, unit_refs=unit_refs
+    ).model_dump_json().encode()
+
+    spawn_unit_from_spec(game_state, create_test_spec(), "player")
+    events = process_tick(game_state)
+    delta = history.delta_since(ack, game_state)
+    assert delta["units"]["added"]
+    assert fastjson.encode_tick_response(None, events, 4, delta) == MatchTickResponse(
+        events=to_api_events(events), seq=4, delta=delta
+    ).model_dump_json().encode()
+
+
+def test_start_and_spawn_responses_match_model_json():
+    """開始・召喚レスポンスも一致する（非ASCIIの名前、タイムゾーンつきの日時を含む）"""
+    created_at = datetime(2025, 1, 2, 3, 4, 5, 600, tzinfo=timezone(timedelta(hours=9)))
+    game_state = GameState(match_id=uuid4(), player_deck_id=uuid4(), created_at=created_at)
+
+    assert fastjson.encode_start_response(game_state.match_id, game_state) == MatchStartResponse(
+        match_id=game_state.match_id, game_state=game_state
+    ).model_dump_json().encode()
+
+    event = spawn_unit_from_spec(game_state, create_test_spec(name="炎の騎士 \"改\"\n"), "player")
+    game_state.created_at = datetime.now(timezone.utc)
+    assert fastjson.encode_spawn_response(game_state, [event]) == MatchSpawnResponse(
+        game_state=game_state, events=[event.to_event()]
+    ).model_dump_json().encode()
+
+
+def test_cached_unit_parts_survive_copies():
+    """キャッシュを持ったユニットを複製しても、複製側の出力が正しい"""
+    for engine_backend in ("python", "fixed"):
+        game_state = build_match(get_scenario("10v10"), engine_backend=engine_backend)
+        process_tick(game_state)
+        fastjson.encode_game_state(game_state)
+
+        copied = copy.deepcopy(game_state)
+        process_tick(copied)
+        assert fastjson.encode_game_state(copied) == copied.model_dump_json().encode()
@@ -0,0 +1,129 @@
+"""
+固定小数点tick処理のテスト
+
+engine_backend="fixed" の位置・クールダウン・時間スキップ・状態ハッシュを確認する。
+"""
+from uuid import uuid4
+
+from app.engine.fixed import quiet_ticks_fixed, state_hash
+from app.engine.simulate import ScheduledSpawn, simulate
+from app.engine.tick import process_tick, spawn_unit_from_spec
+from app.schemas.game import GameState
+from app.schemas.unit import FixedUnit, UnitSpec
+
+
+def create_test_spec(cost=3, max_hp=10, atk=5, speed=1.0, range_val=2.0, atk_interval=2.0):
+    """テスト用ユニットスペックを作成"""
+    return UnitSpec(
+        name="Test Spec",
+        cost=cost,
+        max_hp=max_hp,
+        atk=atk,
+        speed=speed,
+        range=range_val,
+        atk_interval=atk_interval,
+        sprite_url="/static/sprites/placeholder.png",
+        battle_sprite_url="/static/battle_sprites/placeholder.png",
+        card_url="/static/cards/placeholder.png"
+    )
+
+
+def test_fixed_positions_are_integers():
+    """位置は整数で進み、APIには換算した値で出る"""
+    game_state = GameState(match_id=uuid4(), engine_backend="fixed")
+    spawn_unit_from_spec(game_state, create_test_spec(speed=1.3), "player")
+
+    for _ in range(3):
+        events = process_tick(game_state)
+
+    unit = game_state.units[0]
+    assert isinstance(unit, FixedUnit)
+    # 1.3マス/秒 × 200ms = 260/tick
+    assert unit.fpos == 780
+    assert unit.pos == 0.78
+    assert events[0].data["to_pos"] == 0.78
+    assert game_state.model_dump()["units"][0]["pos"] == 0.78
+
+
+def test_fixed_cooldown_uses_next_attack_tick():
+    """攻撃間隔はtick数に切り上げられ、その間は攻撃しない"""
+    game_state = GameState(match_id=uuid4(), engine_backend="fixed")
+    spawn_unit_from_spec(game_state, create_test_spec(max_hp=30, atk=1, atk_interval=1.1), "player")
+    spawn_unit_from_spec(game_state, create_test_spec(max_hp=30, atk=1, range_val=1.0), "ai")
+    game_state.units[0].pos = 10.0
+    game_state.units[1].pos = 11.0
+
+    attack_ticks = []
+    for tick in range(14):
+        events = process_tick(game_state)
+        if any(e.type == "ATTACK" and e.data["attacker_side"] == "player" for e in events):
+            attack_ticks.append(tick)
+
+    # 1.1秒 = 5.5tick → 6tickごと
+    assert attack_ticks == [0, 6, 12]
+    attacker = game_state.units[0]
+    assert attacker.ready_tick == 18
+    assert attacker.cooldown == 0.8
+
+
+def test_fixed_time_skip_matches_tick_by_tick():
+    """固定小数点の時間スキップはtick毎の処理と完全に一致する"""
+    specs = [
+        create_test_spec(cost=2, speed=0.37, range_val=1.0),
+        create_test_spec(cost=3, speed=1.13, range_val=4.5, atk_interval=3.3),
+        create_test_spec(cost=1, speed=2.0, range_val=2.0),
+    ]
+    schedule = [
+        ScheduledSpawn(time_ms=t, side=side, unit_spec=spec)
+        for t in (0, 4000, 9000, 20000)
+        for side, spec in (("player", specs[t % 3]), ("ai", specs[(t + 1) % 3]))
+    ]
+    skipped = GameState(match_id=uuid4(), engine_backend="fixed")
+    stepped = GameState(match_id=uuid4(), engine_backend="fixed")
+
+    skip_result = simulate(skipped, until_finished=True, spawn_schedule=schedule)
+    step_result = simulate(stepped, until_finished=True, spawn_schedule=schedule, time_skip=False)
+
+    assert skip_result.ticks_run == step_result.ticks_run
+    assert [(u.fpos, u.hp, u.ready_tick) for u in skipped.units] == [
+        (u.fpos, u.hp, u.ready_tick) for u in stepped.units
+    ]
+    assert skipped.model_dump(exclude={"units", "match_id", "created_at"}) == stepped.model_dump(
+        exclude={"units", "match_id", "created_at"}
+    )
+
+
+def test_fixed_quiet_ticks_is_exact():
+    """スキップ可能tick数の直後のtickで交戦が始まる"""
+    game_state = GameState(match_id=uuid4(), engine_backend="fixed")
+    spawn_unit_from_spec(game_state, create_test_spec(range_val=2.0), "player")
+    spawn_unit_from_spec(game_state, create_test_spec(range_val=2.0), "ai")
+
+    span = quiet_ticks_fixed(game_state)
+    for _ in range(span):
+        assert all(e.type == "MOVE" for e in process_tick(game_state))
+    player, ai = game_state.units
+
+    # 間隔20000、射程2000、接近速度400/tick → 45tick移動後に射程内
+    assert span == 44
+    assert ai.fpos - player.fpos == 2400
+    assert quiet_ticks_fixed(game_state) == 0
+
+
+def test_state_hash_is_deterministic():
+    """同じ操作をした状態は同じハッシュ、状態が変われば異なるハッシュになる"""
+    game_state = GameState(match_id=uuid4(), engine_backend="fixed")
+    spawn_unit_from_spec(game_state, create_test_spec(), "player")
+    spawn_unit_from_spec(game_state, create_test_spec(speed=0.5), "ai")
+    copied = game_state.model_copy(deep=True)
+
+    assert state_hash(copied) == state_hash(game_state)
+
+    for _ in range(30):
+        process_tick(game_state)
+        process_tick(copied)
+    assert state_hash(copied) == state_hash(game_state)
+
+    before = state_hash(game_state)
+    process_tick(game_state)
+    assert state_hash(game_state) != before
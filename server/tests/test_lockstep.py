@@ -0,0 +1,108 @@
+"""
+ロックステップ同期のテスト
+
+スナップショットとフレーム（入力）だけで進めたクライアント側の状態が、
+チェックポイントごとにサーバーの状態ハッシュと一致することを確認する。
+"""
+import json
+from uuid import uuid4
+
+import pytest
+
+from app.engine.lockstep import LockstepSession, apply_frame, spawn_input
+from app.engine.tick import process_tick, spawn_unit_from_spec
+from app.schemas.game import GameState
+from app.schemas.unit import UnitSpec
+
+
+def create_test_spec(speed=1.0, range_val=2.0, max_hp=10):
+    """テスト用ユニットスペックを作成"""
+    return UnitSpec(
+        name="Test Spec",
+        cost=3,
+        max_hp=max_hp,
+        atk=5,
+        speed=speed,
+        range=range_val,
+        atk_interval=2.0,
+        sprite_url="/static/sprites/placeholder.png",
+        battle_sprite_url="/static/battle_sprites/placeholder.png",
+        card_url="/static/cards/placeholder.png"
+    )
+
+
+def roundtrip(message):
+    """送信時と同じくJSONを経由させる"""
+    return json.loads(json.dumps(message))
+
+
+@pytest.mark.parametrize("engine_backend", ["python", "numpy", "fixed"])
+def test_client_replica_matches_server_hashes(engine_backend):
+    """召喚・戦闘・勝敗を通して、全チェックポイントでハッシュが一致する"""
+    game_state = GameState(
+        match_id=uuid4(),
+        engine_backend=engine_backend,
+        player_cost=20.0,
+        ai_cost=20.0,
+        ai_base_hp=20
+    )
+    session = LockstepSession(hash_interval=5)
+    snapshot = roundtrip(session.snapshot(game_state))
+    replica = GameState.model_validate(snapshot["game_state"])
+
+    specs = [
+        create_test_spec(speed=1.5), create_test_spec(range_val=5.0), create_test_spec(max_hp=30)
+    ]
+    checked = 0
+    for tick in range(600):
+        if tick % 20 == 3:
+            # AIは2回に1回だけ召喚するのでプレイヤーが押し切る
+            for side in ("player", "ai") if tick % 40 == 3 else ("player",):
+                event = spawn_unit_from_spec(game_state, specs[(tick + len(side)) % 3], side)
+                session.add_input(spawn_input(game_state, event))
+        process_tick(game_state)
+        frame = roundtrip(session.frame(game_state))
+
+        digest = apply_frame(replica, frame, snapshot["hash_interval"])
+        if digest is not None:
+            assert session.verify(frame["time_ms"], digest) is True
+            checked += 1
+        if game_state.is_finished():
+            break
+
+    assert game_state.is_finished() and replica.winner == game_state.winner
+    assert checked >= 5
+
+
+def test_mismatch_is_detected_and_resync_restores_state():
+    """ずれたクライアントは不一致と判定され、スナップショットから再開すれば一致する"""
+    game_state = GameState(match_id=uuid4(), engine_backend="fixed")
+    session = LockstepSession(hash_interval=2, history_size=2)
+    snapshot = roundtrip(session.snapshot(game_state))
+    replica = GameState.model_validate(snapshot["game_state"])
+
+    event = spawn_unit_from_spec(game_state, create_test_spec(), "player")
+    session.add_input(spawn_input(game_state, event))
+    process_tick(game_state)
+    apply_frame(replica, roundtrip(session.frame(game_state)), 2)
+
+    # クライアント側だけHPがずれる
+    replica.units[0].hp -= 1
+    process_tick(game_state)
+    digest = apply_frame(replica, roundtrip(session.frame(game_state)), 2)
+    assert session.verify(game_state.time_ms, digest) is False
+    assert session.resyncs == 1
+
+    # 送り直したスナップショットには適用済みの入力が含まれるので、溜まった入力は捨てる
+    event = spawn_unit_from_spec(game_state, create_test_spec(), "ai")
+    session.add_input(spawn_input(game_state, event))
+    replica = GameState.model_validate(roundtrip(session.snapshot(game_state))["game_state"])
+    for _ in range(4):
+        process_tick(game_state)
+        frame = roundtrip(session.frame(game_state))
+        assert frame["inputs"] == []
+        digest = apply_frame(replica, frame, 2)
+    assert session.verify(game_state.time_ms, digest) is True
+
+    # 保持数より古いチェックポイントは照合できない
+    assert session.verify(400, digest) is None
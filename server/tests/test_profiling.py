@@ -0,0 +1,91 @@
+"""
+tickプロファイリングのテスト
+
+有効時にフェーズ別の計測値が集計され、無効時は何も記録されないことを確認する。
+"""
+from uuid import uuid4
+
+import pytest
+
+from app.engine.profiling import PHASES, configure_tick_profiler, get_tick_profiler
+from app.engine.tick import process_tick, process_ticks, spawn_unit_from_spec
+from app.schemas.game import GameState
+from app.schemas.unit import UnitSpec
+
+
+def create_test_spec(range_val=2.0):
+    """テスト用ユニットスペックを作成"""
+    return UnitSpec(
+        name="Test Spec",
+        cost=3,
+        max_hp=10,
+        atk=5,
+        speed=1.0,
+        range=range_val,
+        atk_interval=2.0,
+        sprite_url="/static/sprites/placeholder.png",
+        battle_sprite_url="/static/battle_sprites/placeholder.png",
+        card_url="/static/cards/placeholder.png"
+    )
+
+
+def create_game_state(engine_backend="python"):
+    """両陣営に1体ずつ召喚したゲーム状態を作成"""
+    game_state = GameState(match_id=uuid4(), engine_backend=engine_backend)
+    spawn_unit_from_spec(game_state, create_test_spec(), "player")
+    spawn_unit_from_spec(game_state, create_test_spec(), "ai")
+    return game_state
+
+
+@pytest.fixture
+def profiler():
+    """計測を有効にし、テスト後に無効へ戻す"""
+    profiler = configure_tick_profiler(True)
+    profiler.reset()
+    yield profiler
+    configure_tick_profiler(False)
+    profiler.reset()
+
+
+@pytest.mark.parametrize("engine_backend", ["python", "numpy", "fixed"])
+def test_profiler_records_every_phase(profiler, engine_backend):
+    """各バックエンドでフェーズごとの時間・ユニット数・イベント数が集計される"""
+    game_state = create_game_state(engine_backend)
+    emitted = sum(len(process_tick(game_state)) for _ in range(10))
+
+    snapshot = profiler.snapshot()
+    assert snapshot["ticks"] == 10
+    assert snapshot["matches"] == 10
+    phases = snapshot["phases"]
+    assert list(phases) == list(PHASES)
+    assert sum(p["events"] for p in phases.values()) == emitted
+    # 10tick × 2体が移動する
+    assert phases["move"]["samples"] == 10
+    assert phases["move"]["units"] == 20
+    assert phases["move"]["events"] == 20
+    for name in ("cooldown", "move", "base_reach", "attack", "cost_recovery", "victory", "time"):
+        assert sum(phases[name]["histogram_us"].values()) == 10
+
+
+def test_profiler_batched_ticks_count_matches(profiler):
+    """一括処理は1サンプルで複数マッチとして記録される"""
+    states = [create_game_state() for _ in range(4)]
+    process_ticks(states)
+
+    snapshot = profiler.snapshot()
+    assert snapshot["ticks"] == 1
+    assert snapshot["matches"] == 4
+    assert snapshot["phases"]["move"]["units"] == 8
+
+
+def test_profiler_disabled_records_nothing():
+    """無効時は何も記録しない"""
+    profiler = get_tick_profiler()
+    profiler.reset()
+    assert not profiler.enabled
+
+    game_state = create_game_state()
+    for _ in range(5):
+        process_tick(game_state)
+
+    assert profiler.snapshot()["ticks"] == 0
@@ -0,0 +1,89 @@
+"""
+マッチのユニットロスターのテスト
+
+対戦開始時に両デッキのユニットスペックを1回のクエリで読み込み、以降の取得では
+DBに問い合わせないこと、ロスターのない状態（別ワーカー・復元後）では読み直すことを確認する。
+"""
+from uuid import uuid4
+
+from app.schemas.deck import Deck
+from app.schemas.game import GameState
+from app.schemas.unit import UnitSpec
+from app.storage import db
+from app.storage.codec import pack_state, unpack_state
+from app.storage.roster import attach_roster, ensure_roster, get_roster, load_roster
+
+
+def create_test_spec(name):
+    """テスト用ユニットスペックを作成"""
+    return UnitSpec(
+        name=name,
+        cost=3,
+        max_hp=10,
+        atk=5,
+        speed=1.0,
+        range=2.0,
+        atk_interval=2.0,
+        sprite_url="/static/sprites/placeholder.png",
+        battle_sprite_url="/static/battle_sprites/placeholder.png",
+        card_url="/static/cards/placeholder.png"
+    )
+
+
+def install_fake_db(monkeypatch, specs, decks):
+    """get_units_by_ids・get_deckを辞書から返す関数に差し替え、呼び出し回数を返す"""
+    calls = {"units": 0, "deck": 0}
+
+    async def get_units_by_ids(unit_ids):
+        calls["units"] += 1
+        return [specs[uid] for uid in unit_ids if uid in specs]
+
+    async def get_deck(deck_id):
+        calls["deck"] += 1
+        return decks.get(deck_id)
+
+    monkeypatch.setattr(db, "get_units_by_ids", get_units_by_ids)
+    monkeypatch.setattr(db, "get_deck", get_deck)
+    return calls
+
+
+async def test_roster_is_loaded_once(monkeypatch):
+    """両デッキを1回のクエリで読み込み、デッキの並び順で引ける"""
+    units = [create_test_spec(f"Unit {i}") for i in range(8)]
+    specs = {spec.id: spec for spec in units}
+    player_deck = Deck(name="Player", unit_spec_ids=[spec.id for spec in units[:5]])
+    ai_deck = Deck(name="AI", unit_spec_ids=[spec.id for spec in reversed(units[3:])])
+    calls = install_fake_db(monkeypatch, specs, {})
+
+    roster = await load_roster(player_deck, ai_deck)
+    assert calls == {"units": 1, "deck": 0}
+    assert roster.side("player") == units[:5]
+    assert roster.side("ai") == list(reversed(units[3:]))
+    assert roster.get(units[7].id) is units[7]
+    assert roster.get(uuid4()) is None
+
+    game_state = GameState(match_id=uuid4(), player_deck_id=player_deck.id, ai_deck_id=ai_deck.id)
+    attach_roster(game_state, roster)
+    for _ in range(10):
+        assert await ensure_roster(game_state) is roster
+    assert calls == {"units": 1, "deck": 0}
+
+
+async def test_roster_is_reloaded_for_decoded_state(monkeypatch):
+    """保存先から復元した状態にはロスターがないので、最初の取得で読み直して付け直す"""
+    units = [create_test_spec(f"Unit {i}") for i in range(5)]
+    deck = Deck(name="Shared", unit_spec_ids=[spec.id for spec in units])
+    calls = install_fake_db(monkeypatch, {spec.id: spec for spec in units}, {deck.id: deck})
+
+    game_state = GameState(match_id=uuid4(), player_deck_id=deck.id, ai_deck_id=deck.id)
+    attach_roster(game_state, await load_roster(deck, deck))
+    restored = unpack_state(pack_state(game_state))
+    assert get_roster(restored) is None
+
+    roster = await ensure_roster(restored)
+    assert roster.side("ai") == units
+    assert await ensure_roster(restored) is roster
+    assert calls == {"units": 2, "deck": 1}
+
+    # デッキが設定されていないマッチはロスターなし
+    assert await ensure_roster(GameState(match_id=uuid4())) is None
@@ -0,0 +1,171 @@
+"""
+サーバー側tickスケジューラのテスト
+
+一括処理の結果がマッチごとのprocess_tickと一致し、イベントが
+マッチごとにバッファされることを確認する。
+"""
+import asyncio
+import threading
+from uuid import uuid4
+
+from app.engine.commands import MatchCommandQueues
+from app.engine.scheduler import TickScheduler
+from app.engine.tick import process_tick, spawn_unit_from_spec
+from app.schemas.game import GameState
+from app.schemas.unit import UnitSpec
+from app.storage.backends import SharedMemorySessionBackend
+from app.storage.session import SessionManager
+
+
+def create_test_spec(speed=1.0, range_val=2.0):
+    """テスト用ユニットスペックを作成"""
+    return UnitSpec(
+        name="Test Spec",
+        cost=3,
+        max_hp=10,
+        atk=5,
+        speed=speed,
+        range=range_val,
+        atk_interval=2.0,
+        sprite_url="/static/sprites/placeholder.png",
+        battle_sprite_url="/static/battle_sprites/placeholder.png",
+        card_url="/static/cards/placeholder.png"
+    )
+
+
+def create_game_state(speed=1.0):
+    """両陣営に1体ずつ召喚したゲーム状態を作成"""
+    game_state = GameState(match_id=uuid4())
+    spawn_unit_from_spec(game_state, create_test_spec(speed=speed), "player")
+    spawn_unit_from_spec(game_state, create_test_spec(speed=speed), "ai")
+    return game_state
+
+
+async def test_step_buffers_events_per_match():
+    """バッチに分けて進めてもマッチごとのprocess_tickと同じイベントがバッファされる"""
+    session_manager = SessionManager()
+    states = [create_game_state(speed=0.5 + i * 0.3) for i in range(5)]
+    expected = [state.model_copy(deep=True) for state in states]
+    for state in states:
+        session_manager.create_match(state.match_id, state)
+    scheduler = TickScheduler(session_manager, batch_size=2)
+
+    for _ in range(3):
+        assert await scheduler.step() == 5
+
+    for state, reference in zip(states, expected):
+        reference_events = [e for _ in range(3) for e in process_tick(reference)]
+        assert scheduler.pending_ticks(state.match_id) == 3
+        assert scheduler.drain(state.match_id) == reference_events
+        assert scheduler.drain(state.match_id) == []
+        assert state.time_ms == reference.time_ms == 600
+
+
+async def test_finished_match_is_reported_once():
+    """勝敗が決まったマッチはコールバックが1回だけ呼ばれ、以降は進めない"""
+    session_manager = SessionManager()
+    game_state = GameState(match_id=uuid4(), ai_base_hp=1)
+    spawn_unit_from_spec(game_state, create_test_spec(speed=2.0), "player")
+    session_manager.create_match(game_state.match_id, game_state)
+    finished = []
+
+    async def on_finish(match_id, state):
+        finished.append((match_id, state.winner))
+
+    scheduler = TickScheduler(session_manager, on_finish=on_finish)
+    for _ in range(60):
+        await scheduler.step()
+
+    assert finished == [(game_state.match_id, "player")]
+    finished_at = game_state.time_ms
+    await scheduler.step()
+    assert game_state.time_ms == finished_at
+
+
+async def test_deleted_match_buffer_is_dropped():
+    """セッションから削除されたマッチのバッファは破棄される"""
+    session_manager = SessionManager()
+    game_state = create_game_state()
+    session_manager.create_match(game_state.match_id, game_state)
+    scheduler = TickScheduler(session_manager)
+
+    await scheduler.step()
+    session_manager.delete_match(game_state.match_id)
+    await scheduler.step()
+
+    assert scheduler.pending_ticks(game_state.match_id) == 0
+
+
+async def test_scheduler_runs_in_background():
+    """起動するとtick_msごとにマッチが進み、停止すると止まる"""
+    session_manager = SessionManager()
+    game_state = create_game_state()
+    session_manager.create_match(game_state.match_id, game_state)
+    scheduler = TickScheduler(session_manager, tick_ms=10)
+
+    await scheduler.start()
+    await asyncio.sleep(0.1)
+    await scheduler.stop()
+
+    assert not scheduler.running
+    assert scheduler.ticks >= 3
+    assert game_state.time_ms == scheduler.ticks * game_state.tick_ms
+
+
+async def test_shared_backend_is_read_off_loop(tmp_path):
+    """共有する保存先の全マッチはスレッドで読み出し、進めた状態は書き戻す"""
+    backend = SharedMemorySessionBackend(str(tmp_path / "sessions"), slots=16, slot_bytes=16 * 1024)
+    session_manager = SessionManager(backend=backend)
+    state = create_game_state()
+    session_manager.create_match(state.match_id, state)
+    readers = []
+    items = backend.items
+
+    def record_reader():
+        readers.append(threading.current_thread())
+        return items()
+
+    backend.items = record_reader
+    scheduler = TickScheduler(session_manager)
+    assert await scheduler.step() == 1
+
+    assert readers and threading.main_thread() not in readers
+    other = SharedMemorySessionBackend(backend.path)
+    assert other.get(state.match_id).time_ms == 200
+    other.close()
+    backend.close()
+
+
+async def test_busy_match_is_ticked_after_its_commands():
+    """コマンド実行中のマッチのtickはキューに積まれ、コマンドの後で実行される"""
+    session_manager = SessionManager()
+    queues = MatchCommandQueues()
+    busy, idle = create_game_state(), create_game_state()
+    for state in (busy, idle):
+        session_manager.create_match(state.match_id, state)
+    scheduler = TickScheduler(session_manager, command_queues=queues)
+    release = asyncio.Event()
+    log = []
+
+    async def spawn():
+        log.append(("spawn start", busy.time_ms))
+        await release.wait()  # DB書き込みなど
+        spawn_unit_from_spec(busy, create_test_spec(), "player")
+        log.append(("spawn done", busy.time_ms))
+
+    command = asyncio.create_task(queues.run(busy.match_id, spawn))
+    await asyncio.sleep(0)
+    assert await scheduler.step() == 2
+    assert await scheduler.step() == 2
+    assert idle.time_ms == 400
+    assert busy.time_ms == 0
+    assert (scheduler.deferred, scheduler.skipped) == (1, 1)
+
+    release.set()
+    await command
+    while queues.busy(busy.match_id):
+        await asyncio.sleep(0)
+    assert log == [("spawn start", 0), ("spawn done", 0)]
+    assert busy.time_ms == 200
+    assert scheduler.pending_ticks(busy.match_id) == 1
+    assert len(busy.units) == 3
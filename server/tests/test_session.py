@@ -0,0 +1,189 @@
+"""
+セッション管理のテスト
+
+期限切れのマッチだけがアクセスの古い順に削除され、アクセス時には時刻を取得しないこと、
+上限に達したときにアクセスの古いマッチを追い出すか拒否することを確認する。
+"""
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from app.schemas.game import GameState
+from app.storage import session as session_module
+from app.storage.session import SessionCapacityError, SessionManager
+
+
+def create_matches(manager, count):
+    """空のマッチをcount個作成"""
+    match_ids = [uuid4() for _ in range(count)]
+    for match_id in match_ids:
+        manager.create_match(match_id, GameState(match_id=match_id))
+    return match_ids
+
+
+def test_only_inactive_matches_are_removed():
+    """最後のアクセスからtimeout以上経ったマッチだけが削除される"""
+    manager = SessionManager()
+    manager.cleanup_inactive_matches(timeout_seconds=30, now=100.0)
+    old, touched, updated = create_matches(manager, 3)
+
+    manager.cleanup_inactive_matches(timeout_seconds=30, now=120.0)
+    assert manager.get_match(touched) is not None
+    manager.update_match(updated, manager.get_match(updated))
+    new = create_matches(manager, 1)[0]
+
+    assert manager.cleanup_inactive_matches(timeout_seconds=30, now=140.0) == 1
+    assert not manager.has_match(old)
+    assert manager.count_matches() == 3
+
+    assert manager.cleanup_inactive_matches(timeout_seconds=30, now=149.0) == 0
+    assert manager.cleanup_inactive_matches(timeout_seconds=30, now=150.0) == 3
+    assert not any(manager.has_match(mid) for mid in (touched, updated, new))
+
+
+def test_sweep_stops_at_first_active_match(monkeypatch):
+    """アクセス時には時刻を取得せず、掃除は期限切れのマッチだけを見る"""
+    manager = SessionManager()
+    manager.cleanup_inactive_matches(timeout_seconds=30, now=0.0)
+    expired = create_matches(manager, 5)
+    manager.cleanup_inactive_matches(timeout_seconds=30, now=20.0)
+    active = create_matches(manager, 1000)
+
+    def fail():
+        raise AssertionError("time.monotonic() must not be called on access")
+
+    monkeypatch.setattr(session_module.time, "monotonic", fail)
+    for match_id in active:
+        manager.get_match(match_id)
+        manager.update_match(match_id, manager.get_match(match_id))
+
+    visited = []
+    original_delete = manager.delete_match
+
+    def delete_match(match_id):
+        visited.append(match_id)
+        original_delete(match_id)
+
+    monkeypatch.setattr(manager, "delete_match", delete_match)
+    assert manager.cleanup_inactive_matches(timeout_seconds=30, now=35.0) == 5
+    assert visited == expired
+    assert manager.count_matches() == 1000
+
+
+async def test_background_expiry_task():
+    """バックグラウンドタスクが期限切れのマッチを削除する"""
+    manager = SessionManager()
+    match_id = create_matches(manager, 1)[0]
+
+    await manager.start_expiry(timeout_seconds=0.05, interval_seconds=0.02)
+    assert manager.expiry_running
+    await asyncio.sleep(0.2)
+    assert not manager.has_match(match_id)
+
+    await manager.stop_expiry()
+    assert not manager.expiry_running
+
+
+async def test_expiry_task_survives_errors(monkeypatch):
+    """掃除中に保存先のエラーが起きても掃除タスクは止まらない"""
+    manager = SessionManager()
+    match_id = create_matches(manager, 1)[0]
+    cleanup = manager.cleanup_inactive_matches
+    failures = [2]
+
+    def flaky_cleanup(timeout_seconds):
+        if failures[0]:
+            failures[0] -= 1
+            raise ConnectionError("session store unavailable")
+        return cleanup(timeout_seconds)
+
+    monkeypatch.setattr(manager, "cleanup_inactive_matches", flaky_cleanup)
+    await manager.start_expiry(timeout_seconds=0.05, interval_seconds=0.02)
+    await asyncio.sleep(0.2)
+    assert manager.expiry_running
+    assert not manager.has_match(match_id)
+    await manager.stop_expiry()
+
+
+def test_capacity_evicts_idle_matches_then_rejects():
+    """上限時はしばらくアクセスのないマッチを古い順に追い出し、なければ拒否する"""
+    manager = SessionManager(max_matches=3, evict_idle_seconds=10)
+    manager.cleanup_inactive_matches(timeout_seconds=60, now=0.0)
+    first, second = create_matches(manager, 2)
+    manager.cleanup_inactive_matches(timeout_seconds=60, now=5.0)
+    third = create_matches(manager, 1)[0]
+
+    # firstにアクセスしたので、最も古いのはsecond
+    manager.cleanup_inactive_matches(timeout_seconds=60, now=12.0)
+    manager.get_match(first)
+    fourth = create_matches(manager, 1)[0]
+    assert not manager.has_match(second)
+    assert all(manager.has_match(mid) for mid in (first, third, fourth))
+    assert manager.evicted == 1
+
+    # 残りはevict_idle_seconds以内にアクセスされているので追い出せない
+    with pytest.raises(SessionCapacityError):
+        create_matches(manager, 1)
+    assert manager.count_matches() == 3
+    assert manager.rejected == 1
+
+
+def test_memory_limit_uses_estimated_size():
+    """見積もりメモリ量の上限はユニット数と差分履歴を含めて判定される"""
+    from app.engine.delta import get_delta_history
+    from benchmarks.scenarios import build_match, get_scenario
+
+    small = GameState(match_id=uuid4())
+    large = build_match(get_scenario("100v100"))
+    base_size = large.estimate_size()
+    assert base_size > small.estimate_size() + 100 * 512
+    get_delta_history(large).record(large)
+    assert large.estimate_size() > base_size
+
+    manager = SessionManager(max_bytes=large.estimate_size() + small.estimate_size())
+    manager.create_match(large.match_id, large)
+    manager.create_match(small.match_id, small)
+    assert manager.estimate_bytes() == large.estimate_size() + small.estimate_size()
+
+    with pytest.raises(SessionCapacityError):
+        manager.create_match(uuid4(), GameState(match_id=uuid4()))
+
+    # 1つで上限を超えるマッチはそもそも受け付けない
+    with pytest.raises(SessionCapacityError, match="larger than"):
+        SessionManager(max_bytes=1024).create_match(small.match_id, small)
+
+
+def test_estimated_bytes_are_kept_as_running_total(monkeypatch):
+    """作成のたびに全マッチのサイズを数え直さず、インプレースの変更は掃除で反映する"""
+    from app.engine.delta import get_delta_history
+
+    manager = SessionManager(max_bytes=10 * 1024 * 1024)
+    states = [GameState(match_id=uuid4()) for _ in range(3)]
+    for state in states:
+        manager.create_match(state.match_id, state)
+    total = sum(state.estimate_size() for state in states)
+    assert manager.estimate_bytes() == total
+
+    measured = []
+    original = GameState.estimate_size
+
+    def measure(self):
+        measured.append(self)
+        return original(self)
+
+    monkeypatch.setattr(GameState, "estimate_size", measure)
+    new_state = GameState(match_id=uuid4())
+    manager.create_match(new_state.match_id, new_state)
+    assert measured and all(state is new_state for state in measured)  # 新しいマッチだけ
+
+    before = manager.estimate_bytes()
+    get_delta_history(states[0]).record(states[0])
+    assert manager.estimate_bytes() == before
+    manager.cleanup_inactive_matches(timeout_seconds=60)
+    current = manager.list_matches().values()
+    assert manager.estimate_bytes() == sum(state.estimate_size() for state in current)
+    assert manager.estimate_bytes() > before
+
+    manager.delete_match(states[1].match_id)
+    assert manager.backend.size_of(states[1].match_id) == 0
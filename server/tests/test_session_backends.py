@@ -0,0 +1,422 @@
+"""
+セッションの保存先のテスト
+
+GameStateのバイナリ表現から同じ状態が復元されること、共有メモリの保存先を
+複数のワーカー（プロセス）から読み書きできること、ネットワーク上のストアの
+アダプタがローカルの代替ストアで同じように動くことを確認する。
+"""
+import multiprocessing
+import time
+from uuid import uuid4
+
+import pytest
+
+from app.engine.fixed import state_hash
+from app.engine.tick import process_tick
+from app.schemas.game import GameState
+from app.engine.commands import MatchCommandQueues
+from app.engine.tick import spawn_unit_from_spec
+from app.storage.backends import (
+    CAS_WRITE_SCRIPT,
+    DELETE_SCRIPT,
+    KeyValueSessionBackend,
+    SessionCapacityError,
+    SessionConflictError,
+    SharedMemorySessionBackend
+)
+from app.storage.codec import pack_state, unpack_state
+from app.schemas.unit import UnitSpec
+from app.storage.session import SessionManager
+from benchmarks.scenarios import build_match, get_scenario
+
+
+class FakeKeyValueStore:
+    """redis-pyの同期クライアントの代わりに使う辞書ベースのストア"""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+        self.hashes = {}
+        self.sorted_sets = {}
+        self.calls = 0
+
+    def get(self, key):
+        self.calls += 1
+        return self.data.get(key)
+
+    def mget(self, keys):
+        self.calls += 1
+        return [self.data.get(key) for key in keys]
+
+    def exists(self, key):
+        self.calls += 1
+        return int(key in self.data)
+
+    def hget(self, key, field):
+        self.calls += 1
+        value = self.hashes.get(key, {}).get(field)
+        return None if value is None else str(value).encode()
+
+    def hlen(self, key):
+        self.calls += 1
+        return len(self.hashes.get(key, {}))
+
+    def hkeys(self, key):
+        self.calls += 1
+        return [field.encode() for field in self.hashes.get(key, {})]
+
+    def zrangebyscore(self, key, low, high):
+        self.calls += 1
+        assert low == "-inf" and high.startswith("(")
+        limit = float(high[1:])
+        members = sorted(self.sorted_sets.get(key, {}).items(), key=lambda item: item[1])
+        return [member.encode() for member, score in members if score < limit]
+
+    def register_script(self, source):
+        """ストア側のスクリプトを同じ動作のPython関数で代用する"""
+        return {CAS_WRITE_SCRIPT: self._cas_write, DELETE_SCRIPT: self._delete}[source]
+
+    def _cas_write(self, keys, args):
+        self.calls += 1
+        key, sizes, written, total = keys
+        expected, record, ex, member, written_at = args
+        if self.data.get(key, b"")[:16] != bytes(expected):
+            return 0
+        self.data[key] = bytes(record)
+        self.expiry[key] = ex or None
+        previous = self.hashes.setdefault(sizes, {}).get(member, 0)
+        self.hashes[sizes][member] = len(record)
+        self.data[total] = int(self.data.get(total, 0)) + len(record) - previous
+        self.sorted_sets.setdefault(written, {})[member] = float(written_at)
+        return 1
+
+    def _delete(self, keys, args):
+        self.calls += 1
+        key, sizes, written, total = keys
+        member = args[0]
+        self.data.pop(key, None)
+        previous = self.hashes.get(sizes, {}).pop(member, None)
+        if previous is not None:
+            self.data[total] = int(self.data[total]) - previous
+        self.sorted_sets.get(written, {}).pop(member, None)
+        return 1
+
+    def expire(self, key):
+        """有効期限切れを再現する（索引には残る）"""
+        self.data.pop(key, None)
+
+
+def create_spawn_spec():
+    """召喚用のユニットスペックを作成"""
+    return UnitSpec(
+        name="Spawned",
+        cost=1,
+        max_hp=10,
+        atk=5,
+        speed=1.0,
+        range=2.0,
+        atk_interval=2.0,
+        sprite_url="/static/sprites/placeholder.png",
+        battle_sprite_url="/static/battle_sprites/placeholder.png",
+        card_url="/static/cards/placeholder.png"
+    )
+
+
+@pytest.fixture
+def shm_path(tmp_path):
+    return str(tmp_path / "sessions")
+
+
+@pytest.mark.parametrize("backend", ["python", "fixed"])
+def test_codec_round_trip(backend):
+    """復元した状態は同じ内容で、同じようにtickが進む"""
+    state = build_match(get_scenario("100v100"), engine_backend=backend)
+    for _ in range(5):
+        process_tick(state)
+
+    restored = unpack_state(pack_state(state))
+    assert restored.model_dump() == state.model_dump()
+    assert state_hash(restored) == state_hash(state)
+
+    for _ in range(5):
+        assert process_tick(restored) == process_tick(state)
+    assert state_hash(restored) == state_hash(state)
+
+    # ステータスはマッチ内で1回だけ書くのでJSONよりずっと小さい
+    assert len(pack_state(state)) * 5 < len(state.model_dump_json())
+
+
+def test_shared_memory_is_visible_to_other_workers(shm_path):
+    """同じファイルを開いた別の保存先から読み書きでき、書き戻すまで変更は見えない"""
+    worker_a = SharedMemorySessionBackend(shm_path, slots=16, slot_bytes=32 * 1024)
+    worker_b = SharedMemorySessionBackend(shm_path)
+    assert worker_b.slots == 16
+
+    state = build_match(get_scenario("10v10"))
+    match_id = state.match_id
+    worker_a.put(match_id, state)
+    assert worker_a.get(match_id) is state  # 書き換えられていなければデコードしない
+
+    remote = worker_b.get(match_id)
+    assert remote is not state
+    assert remote.model_dump() == state.model_dump()
+
+    process_tick(remote)
+    assert worker_a.get(match_id).time_ms == 0
+    worker_b.put(match_id, remote)
+    assert worker_a.get(match_id).time_ms == remote.time_ms
+    assert worker_a.count() == 1
+    assert worker_a.estimate_bytes() == worker_a.size_of(match_id) > 0
+
+    worker_b.delete(match_id)
+    assert worker_a.get(match_id) is None
+    assert worker_a.ids() == []
+    assert worker_a.estimate_bytes() == 0
+
+
+def _write_from_child(path, state):
+    SharedMemorySessionBackend(path).put(state.match_id, state)
+
+
+def test_shared_memory_across_processes(shm_path):
+    """別プロセスが書き込んだ状態を読み出せる"""
+    backend = SharedMemorySessionBackend(shm_path, slots=16, slot_bytes=32 * 1024)
+    state = build_match(get_scenario("10v10"))
+
+    child = multiprocessing.get_context("fork").Process(
+        target=_write_from_child, args=(shm_path, state)
+    )
+    child.start()
+    child.join(timeout=10)
+    assert child.exitcode == 0
+
+    assert backend.ids() == [state.match_id]
+    assert backend.get(state.match_id).model_dump() == state.model_dump()
+
+
+def test_shared_memory_capacity(shm_path):
+    """スロットが埋まるか1スロットに収まらない場合はSessionCapacityError"""
+    backend = SharedMemorySessionBackend(shm_path, slots=4, slot_bytes=4096)
+    match_ids = [uuid4() for _ in range(4)]
+    for match_id in match_ids:
+        backend.put(match_id, GameState(match_id=match_id))
+    with pytest.raises(SessionCapacityError, match="full"):
+        backend.put(uuid4(), GameState(match_id=uuid4()))
+
+    # 削除したスロットは再利用され、残りのマッチは見つかり続ける
+    for match_id in match_ids[:2]:
+        backend.delete(match_id)
+    replacement = uuid4()
+    backend.put(replacement, GameState(match_id=replacement))
+    assert all(backend.contains(match_id) for match_id in match_ids[2:] + [replacement])
+    assert backend.count() == 3
+
+    large = build_match(get_scenario("100v100"))
+    with pytest.raises(SessionCapacityError, match="does not fit"):
+        backend.put(large.match_id, large)
+
+
+def test_key_value_backend_with_local_store():
+    """ネットワーク上のストアのアダプタ（ローカルの代替ストアで確認）"""
+    store = FakeKeyValueStore()
+    worker_a = KeyValueSessionBackend(store, ttl_seconds=60)
+    worker_b = KeyValueSessionBackend(store, ttl_seconds=60)
+
+    state = build_match(get_scenario("10v10"))
+    match_id = state.match_id
+    worker_a.put(match_id, state)
+    assert store.expiry[f"{worker_a.prefix}{match_id}"] == 60
+    assert worker_a.get(match_id) is state
+
+    remote = worker_b.get(match_id)
+    process_tick(remote)
+    worker_b.put(match_id, remote)
+    assert worker_a.get(match_id).model_dump() == remote.model_dump()
+
+    assert worker_a.ids() == [match_id]
+    assert worker_a.count() == 1
+    assert worker_a.estimate_bytes() == worker_a.size_of(match_id) > 0
+    worker_a.delete(match_id)
+    assert not worker_b.contains(match_id)
+    assert worker_b.get(match_id) is None
+
+
+def test_expiry_keeps_matches_used_by_other_workers(shm_path, monkeypatch):
+    """他のワーカーが書き込んでいるマッチは、このワーカーでアクセスがなくても削除しない"""
+    wall = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: wall[0])
+    worker_a = SessionManager(backend=SharedMemorySessionBackend(shm_path, slots=16))
+    worker_b = SessionManager(backend=SharedMemorySessionBackend(shm_path))
+    worker_a.cleanup_inactive_matches(timeout_seconds=30, now=0.0)
+    active, idle = GameState(match_id=uuid4()), GameState(match_id=uuid4())
+    worker_a.create_match(active.match_id, active)
+    worker_a.create_match(idle.match_id, idle)
+
+    # activeはworker_bが進めている
+    wall[0] = 1035.0
+    state = worker_b.get_match(active.match_id)
+    process_tick(state)
+    worker_b.update_match(active.match_id, state)
+
+    wall[0] = 1040.0
+    assert worker_a.cleanup_inactive_matches(timeout_seconds=30, now=40.0) == 1
+    assert worker_b.has_match(active.match_id)
+    assert not worker_b.has_match(idle.match_id)
+    assert worker_a.get_match(active.match_id).time_ms == state.time_ms
+
+
+@pytest.mark.parametrize("kind", ["shared", "redis"])
+def test_concurrent_writes_do_not_lose_updates(shm_path, kind):
+    """他のワーカーが書き換えた後の古い状態は書き込めず、読み直すと変更が残っている"""
+    if kind == "shared":
+        worker_a = SessionManager(backend=SharedMemorySessionBackend(shm_path, slots=16))
+        worker_b = SessionManager(backend=SharedMemorySessionBackend(shm_path))
+    else:
+        store = FakeKeyValueStore()
+        worker_a = SessionManager(backend=KeyValueSessionBackend(store))
+        worker_b = SessionManager(backend=KeyValueSessionBackend(store))
+    state = build_match(get_scenario("10v10"))
+    match_id = state.match_id
+    worker_a.create_match(match_id, state)
+    units = len(state.units)
+
+    # 両方のワーカーが同じ版を読み、worker_bが先に召喚を書き込む
+    ticking = worker_a.get_match(match_id)
+    spawning = worker_b.get_match(match_id)
+    spawn_unit_from_spec(spawning, create_spawn_spec(), "player")
+    worker_b.update_match(match_id, spawning)
+
+    process_tick(ticking)
+    with pytest.raises(SessionConflictError):
+        worker_a.update_match(match_id, ticking)
+
+    # 読み直した状態には召喚が残っていて、その上でtickを進めて書き込める
+    fresh = worker_a.get_match(match_id)
+    assert len(fresh.units) == units + 1
+    process_tick(fresh)
+    worker_a.update_match(match_id, fresh)
+    assert worker_b.get_match(match_id).time_ms == fresh.time_ms
+
+    # 既にあるマッチは作成できず、削除されたマッチには書き戻せない
+    with pytest.raises(SessionConflictError):
+        worker_b.create_match(match_id, GameState(match_id=match_id))
+    worker_b.delete_match(match_id)
+    with pytest.raises(SessionConflictError):
+        worker_a.update_match(match_id, fresh)
+
+
+async def test_command_is_retried_on_conflict(shm_path):
+    """書き込みが衝突したコマンドは読み直した状態でやり直される"""
+    worker_a = SessionManager(backend=SharedMemorySessionBackend(shm_path, slots=16))
+    worker_b = SessionManager(backend=SharedMemorySessionBackend(shm_path))
+    state = build_match(get_scenario("10v10"))
+    match_id = state.match_id
+    worker_a.create_match(match_id, state)
+    worker_a.get_match(match_id)
+    attempts = []
+
+    async def tick():
+        game_state = worker_a.get_match(match_id)
+        attempts.append(len(game_state.units))
+        if len(attempts) == 1:
+            # 読んだ直後に他のワーカーが召喚した
+            other = worker_b.get_match(match_id)
+            spawn_unit_from_spec(other, create_spawn_spec(), "player")
+            worker_b.update_match(match_id, other)
+        process_tick(game_state)
+        worker_a.update_match(match_id, game_state)
+        return game_state.time_ms
+
+    queues = MatchCommandQueues()
+    assert await queues.run(match_id, tick) == 200
+    assert attempts == [len(state.units), len(state.units) + 1]
+    assert queues.conflicts == 1
+    assert len(worker_b.get_match(match_id).units) == len(state.units) + 1
+
+
+def test_expiry_removes_matches_of_stopped_workers(shm_path, monkeypatch):
+    """作成したワーカーが終了したマッチも、書き込みが途絶えれば他のワーカーが削除する"""
+    wall = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: wall[0])
+    stopped = SessionManager(backend=SharedMemorySessionBackend(shm_path, slots=4))
+    orphans = [GameState(match_id=uuid4()) for _ in range(4)]
+    for state in orphans:
+        stopped.create_match(state.match_id, state)
+    stopped.backend.close()
+
+    # 再起動後のワーカーはこれらのマッチにアクセスしたことがない
+    restarted = SessionManager(backend=SharedMemorySessionBackend(shm_path))
+    restarted.cleanup_inactive_matches(timeout_seconds=30, now=0.0)
+    with pytest.raises(SessionCapacityError):
+        restarted.create_match(uuid4(), GameState(match_id=uuid4()))
+
+    # 1つはまだ他のワーカーが書き込んでいる
+    wall[0] = 1020.0
+    active = SessionManager(backend=SharedMemorySessionBackend(shm_path))
+    state = active.get_match(orphans[0].match_id)
+    process_tick(state)
+    active.update_match(state.match_id, state)
+
+    wall[0] = 1040.0
+    assert restarted.cleanup_inactive_matches(timeout_seconds=30, now=40.0) == 3
+    assert restarted.backend.ids() == [orphans[0].match_id]
+    fresh = GameState(match_id=uuid4())
+    restarted.create_match(fresh.match_id, fresh)
+
+
+def test_key_value_usage_is_read_from_index(monkeypatch):
+    """マッチ数と合計サイズは索引を1回読むだけで、全マッチはまとめて読み出す"""
+    wall = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: wall[0])
+    store = FakeKeyValueStore()
+    backend = KeyValueSessionBackend(store, ttl_seconds=60)
+    backend.read_batch_size = 4
+    states = [GameState(match_id=uuid4()) for _ in range(10)]
+    for state in states:
+        backend.put(state.match_id, state)
+    process_tick(states[0])
+    backend.put(states[0].match_id, states[0])
+
+    calls = store.calls
+    assert backend.count() == 10
+    assert backend.estimate_bytes() == sum(backend.size_of(state.match_id) for state in states)
+    assert store.calls == calls + 12
+
+    other = KeyValueSessionBackend(store)
+    other.read_batch_size = 4
+    calls = store.calls
+    assert set(other.items()) == {state.match_id for state in states}
+    assert store.calls == calls + 1 + 3  # 索引 + 4件ずつのMGET
+
+    # 有効期限で消えたレコードは索引に残るが、書き込みが古いので掃除で消える
+    store.expire(backend._key(states[1].match_id))
+    wall[0] = 1040.0
+    backend.put(states[2].match_id, states[2])
+    assert states[1].match_id not in backend.items()
+    manager = SessionManager(backend=backend)
+    assert manager.cleanup_inactive_matches(timeout_seconds=30, now=0.0) == 9
+    assert backend.ids() == [states[2].match_id]
+    assert backend.count() == 1
+    assert backend.estimate_bytes() == backend.size_of(states[2].match_id)
+
+
+def test_cache_drops_matches_deleted_by_other_workers(shm_path):
+    """他のワーカーが削除したマッチの状態は、全マッチの読み出しと掃除でキャッシュから捨てる"""
+    worker_a = SharedMemorySessionBackend(shm_path, slots=16)
+    manager_b = SessionManager(backend=SharedMemorySessionBackend(shm_path))
+    worker_b = manager_b.backend
+    states = [GameState(match_id=uuid4()) for _ in range(4)]
+    for state in states:
+        worker_a.put(state.match_id, state)
+    assert len(worker_b.items()) == 4
+    assert len(worker_b._cache) == 4
+
+    worker_a.delete(states[0].match_id)
+    assert set(worker_b.items()) == {state.match_id for state in states[1:]}
+    assert set(worker_b._cache) == {state.match_id for state in states[1:]}
+
+    worker_a.delete(states[1].match_id)
+    manager_b.cleanup_inactive_matches(timeout_seconds=30)
+    assert set(worker_b._cache) == {state.match_id for state in states[2:]}
+    worker_a.close()
+    worker_b.close()
@@ -0,0 +1,259 @@
+"""
+ヘッドレスシミュレーションのテスト
+
+simulate()のtick数制御・召喚予約・イベントログを確認する。
+"""
+import asyncio
+import threading
+from uuid import uuid4
+
+import pytest
+
+from app.engine.simulate import (
+    ScheduledSpawn,
+    adopt_state,
+    decode_event_log,
+    encode_event_log,
+    simulate
+)
+from app.engine.delta import get_delta_history
+from app.engine.tick import process_tick
+from app.engine.timeskip import advance_quiet_ticks, quiet_ticks
+from app.schemas.game import GameState
+from app.schemas.unit import UnitSpec
+
+
+def create_test_spec(cost=3, max_hp=10, atk=5, speed=1.0, range_val=2.0, atk_interval=2.0):
+    """テスト用ユニットスペックを作成"""
+    return UnitSpec(
+        name="Test Spec",
+        cost=cost,
+        max_hp=max_hp,
+        atk=atk,
+        speed=speed,
+        range=range_val,
+        atk_interval=atk_interval,
+        sprite_url="/static/sprites/placeholder.png",
+        battle_sprite_url="/static/battle_sprites/placeholder.png",
+        card_url="/static/cards/placeholder.png"
+    )
+
+
+def test_simulate_runs_requested_ticks():
+    """指定tick数だけ進める"""
+    game_state = GameState(match_id=uuid4())
+
+    result = simulate(game_state, ticks=25)
+
+    assert result.ticks_run == 25
+    assert game_state.time_ms == 25 * 200
+    assert result.events == []
+
+
+def test_simulate_requires_stop_condition():
+    """停止条件がない場合はエラー"""
+    with pytest.raises(ValueError):
+        simulate(GameState(match_id=uuid4()))
+
+
+def test_simulate_until_finished():
+    """勝敗が決まるまで進める"""
+    game_state = GameState(match_id=uuid4(), ai_base_hp=10)
+    attacker = create_test_spec(atk=10, speed=2.0)
+
+    result = simulate(
+        game_state,
+        until_finished=True,
+        spawn_schedule=[ScheduledSpawn(time_ms=0, side="player", unit_spec=attacker)]
+    )
+
+    assert game_state.winner == "player"
+    assert result.spawned == 1
+    # 速度2.0で0→20は約50tick（浮動小数点の累積誤差で1tick前後する）
+    assert 50 <= result.ticks_run <= 51
+
+
+def test_simulate_until_finished_is_capped():
+    """膠着状態でも上限tick数で止まる"""
+    result = simulate(GameState(match_id=uuid4()), until_finished=True, max_ticks=40)
+
+    assert result.ticks_run == 40
+    assert result.game_state.winner is None
+
+
+def test_simulate_ticks_are_capped():
+    """ticksが上限tick数を超えていても上限で止まる"""
+    result = simulate(GameState(match_id=uuid4()), ticks=1_000_000_000, max_ticks=40)
+
+    assert result.ticks_run == 40
+    assert result.game_state.time_ms == 40 * 200
+
+
+def test_scheduled_spawn_waits_for_cost():
+    """コスト不足の予約はコストが貯まるまで待つ"""
+    game_state = GameState(match_id=uuid4(), player_cost=0.0)
+    spec = create_test_spec(cost=3)
+
+    result = simulate(
+        game_state,
+        ticks=10,
+        spawn_schedule=[ScheduledSpawn(time_ms=0, side="player", unit_spec=spec)],
+        collect_events=True
+    )
+
+    spawn_events = [e for e in result.events if e.type == "SPAWN"]
+    assert len(spawn_events) == 1
+    # 0.6/tickで3.0貯まるのは5tick後
+    assert spawn_events[0].timestamp_ms == 5 * 200
+
+
+def test_simulate_matches_tick_by_tick():
+    """simulate()の結果はprocess_tickを繰り返した場合と同じ"""
+    spec = create_test_spec(cost=2, speed=1.5)
+    enemy = create_test_spec(cost=2, speed=0.8, range_val=3.0)
+    stepped = GameState(match_id=uuid4())
+    simulated = stepped.model_copy(deep=True)
+    schedule = [
+        ScheduledSpawn(time_ms=0, side="player", unit_spec=spec),
+        ScheduledSpawn(time_ms=0, side="ai", unit_spec=enemy),
+    ]
+
+    result = simulate(
+        simulated, ticks=120, spawn_schedule=schedule, collect_events=True, time_skip=False
+    )
+
+    first_tick = simulate(
+        stepped, ticks=1, spawn_schedule=schedule, collect_events=True, time_skip=False
+    )
+    expected = first_tick.events
+    for _ in range(119):
+        expected.extend(process_tick(stepped))
+
+    assert [(e.type, e.timestamp_ms) for e in result.events] == [
+        (e.type, e.timestamp_ms) for e in expected
+    ]
+    assert simulated.model_dump(exclude={"units"}) == stepped.model_dump(exclude={"units"})
+
+
+def test_time_skip_matches_tick_by_tick():
+    """アイドル区間のスキップ有無で最終状態が一致する"""
+    specs = [
+        create_test_spec(cost=2, speed=0.5, range_val=1.0),
+        create_test_spec(cost=3, speed=1.3, range_val=4.5, atk_interval=3.3),
+        create_test_spec(cost=1, speed=2.0, range_val=2.0),
+    ]
+    schedule = [
+        ScheduledSpawn(time_ms=t, side=side, unit_spec=spec)
+        for t in (0, 4000, 9000, 20000)
+        for side, spec in (("player", specs[t % 3]), ("ai", specs[(t + 1) % 3]))
+    ]
+    skipped = GameState(match_id=uuid4())
+    stepped = skipped.model_copy(deep=True)
+
+    skip_result = simulate(skipped, until_finished=True, spawn_schedule=schedule)
+    step_result = simulate(stepped, until_finished=True, spawn_schedule=schedule, time_skip=False)
+
+    assert skip_result.ticks_run == step_result.ticks_run
+    assert skipped.model_dump(exclude={"units"}) == stepped.model_dump(exclude={"units"})
+    assert [(u.pos, u.hp, u.cooldown) for u in skipped.units] == [
+        (u.pos, u.hp, u.cooldown) for u in stepped.units
+    ]
+
+
+def test_quiet_ticks_stops_before_engagement():
+    """射程に入る直前までしかスキップしない"""
+    game_state = GameState(match_id=uuid4())
+    simulate(
+        game_state,
+        ticks=1,
+        spawn_schedule=[
+            ScheduledSpawn(time_ms=0, side="player", unit_spec=create_test_spec(range_val=2.0)),
+            ScheduledSpawn(time_ms=0, side="ai", unit_spec=create_test_spec(range_val=2.0)),
+        ]
+    )
+
+    span = quiet_ticks(game_state, limit=1000)
+    advance_quiet_ticks(game_state, span)
+    player, ai = game_state.units
+
+    assert span > 0
+    assert ai.pos - player.pos > 2.0
+    assert quiet_ticks(game_state, limit=1000) <= 1
+
+
+def test_event_log_roundtrip():
+    """圧縮イベントログは元のイベントに復元できる"""
+    game_state = GameState(match_id=uuid4())
+    spec = create_test_spec()
+    result = simulate(
+        game_state,
+        ticks=30,
+        spawn_schedule=[ScheduledSpawn(time_ms=0, side="ai", unit_spec=spec)],
+        collect_events=True
+    )
+
+    decoded = decode_event_log(encode_event_log(result.events))
+
+    assert [e.model_dump(mode="json") for e in decoded] == [
+        e.to_event().model_dump(mode="json") for e in result.events
+    ]
+
+
+def test_adopt_state_keeps_session_object():
+    """コピーで進めた結果を反映すると、元のオブジェクトで進めた場合と同じ状態になる"""
+    spec = create_test_spec(speed=2.0)
+    schedule = [
+        ScheduledSpawn(time_ms=0, side="player", unit_spec=spec),
+        ScheduledSpawn(time_ms=400, side="ai", unit_spec=spec)
+    ]
+    game_state = GameState(match_id=uuid4())
+    reference = game_state.model_copy(deep=True)
+    history = get_delta_history(game_state)
+
+    copied = game_state.model_copy(deep=True)
+    simulate(copied, ticks=40, spawn_schedule=schedule)
+    adopt_state(game_state, copied)
+    simulate(reference, ticks=40, spawn_schedule=schedule)
+
+    assert game_state.model_dump() == reference.model_dump()
+    assert get_delta_history(game_state) is history
+    # 反映後もtick処理を続けられる
+    assert process_tick(game_state) == process_tick(reference)
+    assert game_state.model_dump() == reference.model_dump()
+
+
+async def test_committed_simulation_runs_off_loop(monkeypatch):
+    """commit=Trueのシミュレーションはスレッドで進め、その間もイベントループは動く"""
+    for name in ("PIXELLAB_API_KEY", "MISTRAL_API_KEY"):
+        monkeypatch.setenv(name, "test")
+    monkeypatch.setenv("DATABASE_URL", "postgresql://localhost/test")
+    from app.api import match as match_api
+    from app.schemas.api import MatchSimulateRequest
+    from app.storage.session import SessionManager
+
+    manager = SessionManager()
+    game_state = GameState(match_id=uuid4())
+    manager.create_match(game_state.match_id, game_state)
+    monkeypatch.setattr(match_api, "get_session_manager", lambda: manager)
+    threads = []
+    release = threading.Event()
+
+    def slow_simulate(state, **kwargs):
+        threads.append(threading.current_thread())
+        release.wait(timeout=5)
+        return simulate(state, **kwargs)
+
+    monkeypatch.setattr(match_api, "simulate", slow_simulate)
+    request = MatchSimulateRequest(match_id=game_state.match_id, ticks=10)
+    task = asyncio.create_task(match_api.simulate_in_match(request, game_state, []))
+    for _ in range(3):
+        await asyncio.sleep(0.01)  # シミュレーション中もほかのコルーチンが進む
+    assert not task.done()
+    assert game_state.time_ms == 0  # 途中の状態は見えない
+
+    release.set()
+    response = await task
+    assert threads and threading.main_thread() not in threads
+    assert response.ticks_run == 10
+    assert manager.get_match(game_state.match_id) is game_state
+    assert game_state.time_ms == 2000
@@ -0,0 +1,107 @@
+"""
+セッションのスナップショットのテスト
+
+書き出したマッチが別のSessionManagerに同じ状態で読み戻され、
+終了済み・古すぎるスナップショットは読み戻されないことを確認する。
+"""
+import asyncio
+import os
+import time
+from uuid import uuid4
+
+from app.engine.tick import process_tick
+from app.schemas.game import GameState
+from app.storage.backends import SharedMemorySessionBackend
+from app.storage.codec import pack_state
+from app.storage.session import SessionManager
+from app.storage.snapshots import SessionSnapshotter, read_snapshot, write_snapshot
+from benchmarks.scenarios import build_match, get_scenario
+
+
+def create_manager(count):
+    """進行中のマッチをcount個持つSessionManagerを作成"""
+    manager = SessionManager()
+    for seed in range(count):
+        state = build_match(get_scenario("10v10"), seed=seed)
+        process_tick(state)
+        manager.create_match(state.match_id, state)
+    return manager
+
+
+async def test_flush_and_restore(tmp_path):
+    """書き出したマッチが再起動後のSessionManagerに同じ状態で戻る"""
+    path = str(tmp_path / "snapshots" / "sessions.bin")
+    manager = create_manager(5)
+    finished = GameState(match_id=uuid4(), winner="player")
+    manager.create_match(finished.match_id, finished)
+
+    snapshotter = SessionSnapshotter(manager, path, batch_size=2)
+    assert await snapshotter.flush() == 5
+    assert not any(name.endswith(".tmp") for name in os.listdir(os.path.dirname(path)))
+
+    restarted = SessionManager()
+    assert SessionSnapshotter(restarted, path).restore(max_age_seconds=60) == 5
+    assert not restarted.has_match(finished.match_id)
+    for match_id, state in manager.list_matches().items():
+        if state.is_finished():
+            continue
+        restored = restarted.get_match(match_id)
+        assert restored.model_dump() == state.model_dump()
+        assert process_tick(restored) == process_tick(state)
+
+    # 既にあるマッチは上書きしない
+    assert SessionSnapshotter(restarted, path).restore() == 0
+
+
+def test_old_snapshot_is_ignored(tmp_path):
+    """max_age_secondsより古いスナップショットは読み戻さない"""
+    path = str(tmp_path / "sessions.bin")
+    state = build_match(get_scenario("10v10"))
+    write_snapshot(path, [pack_state(state)], written_at=time.time() - 600)
+
+    assert read_snapshot(path)[1][0].match_id == state.match_id
+    manager = SessionManager()
+    assert SessionSnapshotter(manager, path).restore(max_age_seconds=120) == 0
+    assert SessionSnapshotter(manager, path).restore() == 1
+    assert SessionSnapshotter(manager, str(tmp_path / "missing.bin")).restore() == 0
+
+
+async def test_periodic_snapshots_and_final_flush(tmp_path):
+    """定期的に書き出し、停止時には最新の状態を書き出す"""
+    path = str(tmp_path / "sessions.bin")
+    manager = create_manager(2)
+    snapshotter = SessionSnapshotter(manager, path, interval_seconds=0.02)
+
+    await snapshotter.start()
+    await asyncio.sleep(0.1)
+    assert snapshotter.snapshots >= 1
+
+    late = GameState(match_id=uuid4())
+    manager.create_match(late.match_id, late)
+    await snapshotter.stop()
+    assert not snapshotter.running
+    assert {state.match_id for state in read_snapshot(path)[1]} == set(manager.list_matches())
+
+
+async def test_shared_backend_payloads_are_not_reencoded(tmp_path, monkeypatch):
+    """共有する保存先のマッチは保存済みのバイト列をそのまま書き出す"""
+    path = str(tmp_path / "sessions.bin")
+    manager = SessionManager(backend=SharedMemorySessionBackend(str(tmp_path / "shm"), slots=16))
+    states = []
+    for seed in range(3):
+        state = build_match(get_scenario("10v10"), seed=seed)
+        process_tick(state)
+        manager.create_match(state.match_id, state)
+        states.append(state)
+
+    def fail(state):
+        raise AssertionError("re-encoded on the event loop")
+
+    monkeypatch.setattr("app.storage.snapshots.pack_state", fail)
+    assert await SessionSnapshotter(manager, path).flush() == 3
+
+    restarted = SessionManager()
+    assert SessionSnapshotter(restarted, path).restore() == 3
+    for state in states:
+        assert restarted.get_match(state.match_id).model_dump() == state.model_dump()
+    manager.backend.close()
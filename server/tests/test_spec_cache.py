@@ -0,0 +1,99 @@
+"""
+ユニットスペック・デッキのキャッシュのテスト
+
+件数上限で古いものから捨てること、書き込みで無効化されること、
+共有のバージョン番号で他のワーカーのキャッシュも捨てられることを確認する。
+"""
+from uuid import uuid4
+
+from app.storage.cache import CacheVersion, KeyValueCacheVersion, ObjectCache, SharedCacheVersion
+
+
+class FakeCounterStore:
+    """redis-pyの同期クライアントの代わりに使う get / incr だけのストア"""
+
+    def __init__(self):
+        self.data = {}
+        self.reads = 0
+
+    def get(self, key):
+        self.reads += 1
+        value = self.data.get(key)
+        return None if value is None else str(value).encode()
+
+    def incr(self, key):
+        self.data[key] = self.data.get(key, 0) + 1
+        return self.data[key]
+
+
+def test_lru_bound_and_invalidation():
+    """上限を超えたら最も使われていないものから捨て、書き込んだキーは捨てる"""
+    cache = ObjectCache(max_entries=2)
+    a, b, c = uuid4(), uuid4(), uuid4()
+    cache.put(("unit", a), "A", cache.generation)
+    cache.put(("unit", b), "B", cache.generation)
+    assert cache.get(("unit", a)) == "A"
+    cache.put(("unit", c), "C", cache.generation)
+
+    assert cache.get(("unit", b)) is None
+    found = cache.get_many([("unit", a), ("unit", b), ("unit", c)])
+    assert found == {("unit", a): "A", ("unit", c): "C"}
+    assert (cache.hits, cache.misses) == (3, 2)
+
+    cache.invalidate(("unit", a))
+    assert cache.get(("unit", a)) is None
+    assert cache.get(("unit", c)) == "C"  # 自分の書き込みでは他のキーは捨てない
+    assert cache.invalidations == 0
+
+
+def test_stale_read_is_not_cached():
+    """読み込み中に無効化された値は入れない"""
+    cache = ObjectCache()
+    key = ("deck", uuid4())
+    generation = cache.generation
+    cache.invalidate(key)  # DBを読んでいる間にupdate_deck
+    cache.put(key, "old deck", generation)
+    assert cache.get(key) is None
+
+    assert ObjectCache(max_entries=0, version=CacheVersion()).get(key) is None
+
+
+def test_shared_version_invalidates_other_workers(tmp_path):
+    """他のワーカーが書き込むと、こちらのキャッシュは次の読み込みで全体が捨てられる"""
+    path = str(tmp_path / "cache-version")
+    worker_a = ObjectCache(version=SharedCacheVersion(path))
+    worker_b = ObjectCache(version=SharedCacheVersion(path))
+    unit, other = ("unit", uuid4()), ("unit", uuid4())
+    worker_a.put(unit, "old", worker_a.generation)
+    worker_a.put(other, "other", worker_a.generation)
+    worker_b.put(unit, "old", worker_b.generation)
+
+    worker_b.invalidate(unit)  # worker_bがupdate_unit_images
+    assert worker_a.get(other) is None
+    assert worker_a.invalidations == 1
+    worker_a.put(other, "other", worker_a.generation)
+    assert worker_a.get(other) == "other"
+
+    worker_a.version.close()
+    worker_b.version.close()
+
+
+def test_key_value_version_is_polled(monkeypatch):
+    """ネットワーク上のストアのバージョンはcheck_interval秒ごとにしか読まない"""
+    store = FakeCounterStore()
+    clock = [0.0]
+    monkeypatch.setattr("app.storage.cache.time.monotonic", lambda: clock[0])
+    worker_a = ObjectCache(version=KeyValueCacheVersion(store, check_interval=1.0))
+    worker_b = ObjectCache(version=KeyValueCacheVersion(store, check_interval=1.0))
+    key = ("deck", uuid4())
+    worker_a.put(key, "old", worker_a.generation)
+
+    for _ in range(10):
+        assert worker_a.get(key) == "old"
+    reads = store.reads
+
+    worker_b.invalidate(key)
+    assert worker_a.get(key) == "old"  # 確認間隔の間は前回の値
+    clock[0] = 1.5
+    assert worker_a.get(key) is None
+    assert store.reads == reads + 1